@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""Graph benchmarks
+
+Run from the repository root:
+
+    python -m benchmarks.bench_graph
+"""
+import array
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from structures import csr_graph
+from structures.binary_heap import IndexedMinHeap
+from structures.centrality import betweenness_centrality, pagerank
+from structures.csr_graph import CSRGraphBuilder
+from structures.contraction_hierarchy import ContractionHierarchy
+from structures.distance_matrix import distance_matrix
+from structures.graph import INF, Graph, dijkstra_search
+
+
+def grid_graph(width, height, seed=0):
+    """Road-like undirected grid with random edge lengths"""
+    rnd = random.Random(seed)
+    g = Graph(directed=False)
+    for x in range(width):
+        for y in range(height):
+            v = g.add_vertex((x, y))
+            if x:
+                g.add_edge(g.vertices[(x - 1, y)], v,
+                           distance=rnd.randint(10, 100))
+            if y:
+                g.add_edge(g.vertices[(x, y - 1)], v,
+                           distance=rnd.randint(10, 100))
+    return g
+
+
+def queries_per_second(func, queries):
+    timer = time.perf_counter
+    start = timer()
+    for src, dst in queries:
+        func(src, dst)
+    return len(queries) / (timer() - start)
+
+
+def bench_contraction_hierarchy(width=80, height=80, n=200):
+    print('Point-to-point queries, {}x{} grid'.format(width, height))
+    g = grid_graph(width, height)
+    rnd = random.Random(1)
+    values = list(g.vertices)
+    queries = [(rnd.choice(values), rnd.choice(values)) for _ in range(n)]
+
+    start = time.perf_counter()
+    ch = ContractionHierarchy(g)
+    print('{:<28} {:8.3f}s, shortcuts={}'.format(
+        'preprocessing', time.perf_counter() - start, ch.shortcuts_count))
+
+    v = g.vertices
+    searches = (
+        ('dijkstra_search', lambda s, t: dijkstra_search(v[s])),
+        ('dijkstra_search target=',
+         lambda s, t: dijkstra_search(v[s], target=v[t])),
+        ('dijkstra_search bidirect.',
+         lambda s, t: dijkstra_search(v[s], target=v[t],
+                                      bidirectional=True)),
+        ('contraction hierarchy', ch.query),
+    )
+    for name, func in searches:
+        print('{:<28} {:10.1f} queries/s'.format(
+            name, queries_per_second(func, queries)))
+
+
+def bench_distance_matrix(width=60, height=60, sources=96, targets=500,
+                          workers=(1, 2, 4, 8)):
+    print('Distance matrix {}x{}, {}x{} grid'.format(
+        sources, targets, width, height))
+    g = grid_graph(width, height)
+    rnd = random.Random(2)
+    values = list(g.vertices)
+    src, dst = rnd.sample(values, sources), rnd.sample(values, targets)
+    for n in workers:
+        start = time.perf_counter()
+        distance_matrix(g, src, dst, workers=n)
+        print('{:<28} {:8.3f}s'.format(
+            'workers={}'.format(n), time.perf_counter() - start))
+
+
+def bench_bfs(n=200000, degree=8):
+    print('Multi-source BFS, random graph n={}, degree={}'.format(
+        n, degree))
+    rnd = random.Random(3)
+    edges = ((rnd.randrange(n), rnd.randrange(n))
+             for _ in range(n * degree // 2))
+    g = csr_graph.CSRGraph.from_edges(edges, directed=False,
+                                      vertices=range(n))
+    sources = rnd.sample(range(n), 4)
+    for name, direction_optimizing in (('top-down', False),
+                                       ('direction-optimizing', True)):
+        start = time.perf_counter()
+        csr_graph.bfs(g, sources, direction_optimizing=direction_optimizing)
+        print('{:<28} {:8.3f}s'.format(name, time.perf_counter() - start))
+
+
+def bench_graph_load(n=200000, degree=5):
+    print('Graph startup, n={}, edges={}'.format(n, n * degree))
+    rnd = random.Random(4)
+    struct = {i: [(rnd.randrange(n), rnd.randint(1, 100))
+                  for _ in range(degree)] for i in range(n)}
+    timer = time.perf_counter
+    start = timer()
+    g = Graph.build_graph(struct)
+    print('{:<28} {:8.3f}s'.format('build_graph', timer() - start))
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp_dir, 'graph.bin')
+        g.save(path)
+        start = timer()
+        loaded = Graph.load(path)
+        dijkstra_search(loaded.vertices[0], max_distance=50)
+        print('{:<28} {:8.3f}s'.format('load + first query',
+                                       timer() - start))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def bench_ingest(n=100000, edges=2000000):
+    print('Edge list ingest, n={}, edges={}'.format(n, edges))
+    rnd = random.Random(5)
+    tmp_dir = tempfile.mkdtemp()
+    timer = time.perf_counter
+    try:
+        path = os.path.join(tmp_dir, 'edges.tsv')
+        with open(path, 'w') as f:
+            for _ in range(edges):
+                f.write('{}\t{}\t{}\n'.format(
+                    rnd.randrange(n), rnd.randrange(n), rnd.randint(1, 99)))
+
+        for name, value_type in (('TSV, NumPy parser', int),
+                                 ('TSV, csv module', lambda x: int(x))):
+            builder = CSRGraphBuilder()
+            start = timer()
+            builder.add_edge_list(path, delimiter='\t',
+                                  value_type=value_type)
+            builder.build()
+            elapsed = timer() - start
+            print('{:<28} {:8.3f}s {:8.2f}M edges/s'.format(
+                name, elapsed, edges / elapsed / 1e6))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def bench_centrality(n=50000, degree=8, samples=16):
+    print('Centrality, random graph n={}, degree={}'.format(n, degree))
+    rnd = random.Random(6)
+    edges = ((rnd.randrange(n), rnd.randrange(n), rnd.randint(1, 99))
+             for _ in range(n * degree))
+    g = csr_graph.CSRGraph.from_edges(edges, vertices=range(n))
+
+    start = time.perf_counter()
+    pagerank(g)
+    print('{:<28} {:8.3f}s'.format('pagerank', time.perf_counter() - start))
+    for workers in (1, None):
+        start = time.perf_counter()
+        betweenness_centrality(g, samples=samples, seed=1, workers=workers)
+        print('{:<28} {:8.3f}s'.format(
+            'betweenness workers={}'.format(workers or os.cpu_count()),
+            time.perf_counter() - start))
+
+
+def indexed_heap_dijkstra(csr, src):
+    """csr_graph.dijkstra with a single heap entry per vertex"""
+    offsets, targets, weights = csr.offsets, csr.targets, csr.weights
+    dist = array.array('d', [INF]) * csr.size
+    parents = array.array('i', [-1]) * csr.size
+    dist[src] = 0
+    queue = IndexedMinHeap({src: 0})
+    while queue:
+        i, d = queue.extract_min()
+        for k in range(offsets[i], offsets[i + 1]):
+            j = targets[k]
+            nd = d + weights[k]
+            if nd < dist[j]:
+                if dist[j] == INF:
+                    queue.insert(j, nd)
+                else:
+                    queue.decrease_key(j, nd)
+                dist[j] = nd
+                parents[j] = i
+    return dist, parents
+
+
+def bench_dijkstra_heaps(width=150, height=150, n=10):
+    print('Dijkstra heaps, {}x{} grid, {} searches'.format(
+        width, height, n))
+    g = csr_graph.CSRGraph.from_graph(grid_graph(width, height))
+    sources = random.Random(7).sample(range(g.size), n)
+    for name, dijkstra in (('heapq, duplicate pushes', csr_graph.dijkstra),
+                           ('IndexedMinHeap', indexed_heap_dijkstra)):
+        start = time.perf_counter()
+        for src in sources:
+            dijkstra(g, src)
+        print('{:<28} {:8.3f}s'.format(name, time.perf_counter() - start))
+    assert all(csr_graph.dijkstra(g, src)[0] ==
+               indexed_heap_dijkstra(g, src)[0] for src in sources)
+
+
+if __name__ == '__main__':
+    bench_contraction_hierarchy()
+    bench_distance_matrix()
+    bench_bfs()
+    bench_graph_load()
+    bench_ingest()
+    bench_centrality()
+    bench_dijkstra_heaps()
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""Hash tables benchmarks
+
+Run from the repository root:
+
+    python -m benchmarks.bench_hash_table
+
+Garbage collector is disabled while measuring, so that its pauses don't hide
+the cost of resizing.
+"""
+import gc
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import numpy
+
+from structures.concurrent_hash_table import ConcurrentHashTable
+from structures.hash_table import (
+    LinearProbingHashTable, SeparateChainHashTable)
+from structures.persistent_hash_table import PersistentHashTable
+
+
+def percentile(sorted_values, p):
+    idx = min(int(len(sorted_values) * p / 100.0), len(sorted_values) - 1)
+    return sorted_values[idx]
+
+
+def put_latencies(table, n):
+    """Measure latency of every single put
+
+    :return: sorted list of latencies in microseconds
+    """
+    timer = time.perf_counter
+    latencies = []
+    for i in range(n):
+        start = timer()
+        table.put(i, i)
+        latencies.append((timer() - start) * 1e6)
+    latencies.sort()
+    return latencies
+
+
+def delete_latencies(table, n):
+    timer = time.perf_counter
+    latencies = []
+    for i in range(n):
+        start = timer()
+        table.delete(i)
+        latencies.append((timer() - start) * 1e6)
+    latencies.sort()
+    return latencies
+
+
+def report(name, latencies):
+    print('{:<28} p50={:8.2f}us p99={:8.2f}us p99.9={:9.2f}us '
+          'max={:10.2f}us total={:8.3f}s'.format(
+              name,
+              percentile(latencies, 50),
+              percentile(latencies, 99),
+              percentile(latencies, 99.9),
+              latencies[-1],
+              sum(latencies) / 1e6))
+
+
+def bench_resizing(n=1000000):
+    print('Separate chaining resizing tail latency, n={}'.format(n))
+    gc.disable()
+    try:
+        for incremental in (False, True):
+            name = 'incremental' if incremental else 'stop-the-world'
+            table = SeparateChainHashTable(incremental=incremental)
+            report(name + ' put', put_latencies(table, n))
+            report(name + ' delete', delete_latencies(table, n))
+            del table
+            gc.collect()
+    finally:
+        gc.enable()
+
+
+def bench_probe_length(m=2 ** 16):
+    print('Linear probing probe length, m={}'.format(m))
+    for load in (0.7, 0.8, 0.9):
+        for robin_hood in (False, True):
+            table = LinearProbingHashTable(
+                m=m, max_load=0.95, robin_hood=robin_hood)
+            n = int(m * load)
+            for i in range(n):
+                table.put(str(i), i)
+            lengths = table.probe_lengths()
+            timer = time.perf_counter
+            start = timer()
+            for i in range(n, 2 * n):
+                table.get(str(i))
+            miss = (timer() - start) / n * 1e6
+            print('{:<12} load={:.1f} mean={:6.2f} max={:5d} '
+                  'miss lookup={:6.2f}us'.format(
+                      'robin hood' if robin_hood else 'linear', load,
+                      sum(lengths) / len(lengths), max(lengths), miss))
+
+
+def bench_bulk_load(n=1000000):
+    print('Bulk load of {} integer keys'.format(n))
+    keys = numpy.arange(n, dtype=numpy.int64) * 7
+    values = numpy.arange(n, dtype=numpy.int64)
+    timer = time.perf_counter
+    for cls, kwargs in ((SeparateChainHashTable, {}),
+                        (LinearProbingHashTable, {}),
+                        (LinearProbingHashTable, {'robin_hood': True})):
+        name = cls.__name__ + (' (robin hood)' if kwargs else '')
+
+        table = cls(**kwargs)
+        start = timer()
+        for key, value in zip(keys.tolist(), values.tolist()):
+            table.put(key, value)
+        loop = timer() - start
+
+        table = cls(**kwargs)
+        start = timer()
+        table.put_many(keys, values)
+        batch = timer() - start
+
+        start = timer()
+        table.get_many(keys)
+        get = timer() - start
+        print('{:<40} put loop={:6.3f}s put_many={:6.3f}s ({:4.1f}x) '
+              'get_many={:6.3f}s'.format(name, loop, batch, loop / batch, get))
+
+
+def bench_persistent_startup(sizes=(1000, 10000, 100000)):
+    print('Persistent hash table startup')
+    timer = time.perf_counter
+    tmp_dir = tempfile.mkdtemp()
+    for n in sizes:
+        path = os.path.join(tmp_dir, 'table-{}.dat'.format(n))
+        with PersistentHashTable(path, m=4 * n) as table:
+            for i in range(n):
+                table.put(i, 'value-{}'.format(i))
+
+        start = timer()
+        table = PersistentHashTable(path, readonly=True)
+        opened = timer() - start
+        start = timer()
+        for i in range(0, n, 10):
+            table.get(i)
+        lookup = (timer() - start) / len(range(0, n, 10)) * 1e6
+        table.close()
+        print('n={:<8} file={:8.1f}KiB open={:8.1f}us get={:6.2f}us'.format(
+            n, os.path.getsize(path) / 1024.0, opened * 1e6, lookup))
+        os.remove(path)
+    os.rmdir(tmp_dir)
+
+
+def deep_sizeof(table):
+    """Approximate memory of the table containers (keys and values are
+    shared between the tables and not counted)"""
+    size = 0
+    for name in ('chains', '_keys', '_values', '_hashes', '_displacements'):
+        container = getattr(table, name, None)
+        if container is None:
+            continue
+        size += sys.getsizeof(container)
+        if name == 'chains':
+            for chain in container:
+                if chain:
+                    size += sys.getsizeof(chain)
+                    size += sum(sys.getsizeof(node) for node in chain)
+    return size
+
+
+def bench_frozen_lookup(n=200000):
+    print('Lookup throughput, n={}'.format(n))
+    keys = ['key-{}'.format(i) for i in range(n)]
+    timer = time.perf_counter
+
+    chained = SeparateChainHashTable()
+    chained.put_many(keys, range(n))
+    probing = LinearProbingHashTable()
+    probing.put_many(keys, range(n))
+    start = timer()
+    frozen = chained.freeze()
+    print('freeze: {:.3f}s'.format(timer() - start))
+
+    for name, table in (('separate chaining', chained),
+                        ('linear probing', probing),
+                        ('frozen (CHD)', frozen)):
+        start = timer()
+        for key in keys:
+            table.get(key)
+        elapsed = timer() - start
+        print('{:<20} {:8.0f} lookups/s memory={:8.1f}MiB'.format(
+            name, n / elapsed, deep_sizeof(table) / 2.0 ** 20))
+
+
+class GlobalLockHashTable(object):
+    """Baseline: a global lock around every operation"""
+
+    def __init__(self):
+        self._table = SeparateChainHashTable()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._table.get(key)
+
+    def put(self, key, value):
+        with self._lock:
+            return self._table.put(key, value)
+
+
+def run_mixed_workload(table, threads, ops, write_ratio, key_space):
+    def worker(seed):
+        rnd = random.Random(seed)
+        for _ in range(ops):
+            key = rnd.randrange(key_space)
+            if rnd.random() < write_ratio:
+                table.put(key, key)
+            else:
+                table.get(key)
+
+    workers = [threading.Thread(target=worker, args=(seed, ))
+               for seed in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return threads * ops / (time.perf_counter() - start)
+
+
+def bench_concurrent(threads=8, ops=50000, key_space=100000):
+    print('Concurrent throughput, threads={}'.format(threads))
+    for write_ratio in (0.01, 0.1, 0.5):
+        for name, cls in (('global lock', GlobalLockHashTable),
+                          ('lock striping', ConcurrentHashTable)):
+            table = cls()
+            for key in range(0, key_space, 2):
+                table.put(key, key)
+            throughput = run_mixed_workload(
+                table, threads, ops, write_ratio, key_space)
+            print('{:<14} writes={:4.0%} {:10.0f} ops/s'.format(
+                name, write_ratio, throughput))
+
+
+if __name__ == '__main__':
+    bench_resizing()
+    bench_probe_length()
+    bench_bulk_load()
+    bench_persistent_startup()
+    bench_frozen_lookup()
+    bench_concurrent()
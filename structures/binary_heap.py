@@ -2,9 +2,16 @@
 
 
 class BinaryHeap(object):
+    """Binary heap over a list
 
-    def __init__(self, values=None):
+    :param values: list used as the storage as is, it must be a heap
+    already, use heapify() to build a heap from any values
+    :param key: function: items are compared by key(item) if it's set
+    """
+
+    def __init__(self, values=None, key=None):
         self._storage = values or []
+        self.key = key
 
     @property
     def storage(self):
@@ -14,12 +21,24 @@ class BinaryHeap(object):
         raise NotImplementedError()
 
     @classmethod
-    def heapify(cls, values):
-        heap = cls()
-        for k in values:
-            heap.insert(k)
+    def heapify(cls, values, key=None):
+        """Build a heap in O(n): sift down every parent starting from the
+        last one (Floyd's method)
+
+        :param values: iterable of items
+        :param key: function: items are compared by key(item) if it's set
+        """
+        heap = cls(list(values), key=key)
+        heap._build()
         return heap
 
+    def _build(self):
+        for i in reversed(range(self.size // 2)):
+            self._sift_down(i)
+
+    def _sift_down(self, i):
+        raise NotImplementedError()
+
     def remove(self, k):
         raise NotImplementedError()
 
@@ -33,14 +52,14 @@ class BinaryHeap(object):
         return self.storage[i], self.storage[j]
 
     def get_parent(self, i):
-        """Formula: parent_id = (i - 1) / 2 and rounded to lower bound
+        """Formula: parent_id = (i - 1) // 2
 
         :param i:
         :return:
         """
         if i == 0:
             return 0, self.storage[0]
-        parent_id = int(round((i - 1) / 2))
+        parent_id = (i - 1) // 2
         return parent_id, self.storage[parent_id]
 
     @property
@@ -73,40 +92,53 @@ class MinHeap(BinaryHeap):
         self._sift_up(idx)
 
     def _sift_up(self, i):
-        if i == 0:
-            return None
-        value = self.storage[i]
-        parent_id, parent_val = self.get_parent(i)
-
-        if parent_val > value:
-            self.swap(parent_id, i)
-            self._sift_up(parent_id)
+        storage, key = self.storage, self.key
+        value = storage[i]
+        value_key = key(value) if key else value
+        # The element is moved into its place once, the parents move down
+        while i > 0:
+            parent_id = (i - 1) // 2
+            parent = storage[parent_id]
+            if not value_key < (key(parent) if key else parent):
+                break
+            storage[i] = parent
+            i = parent_id
+        storage[i] = value
 
     def _sift_down(self, i):
-        val = self.storage[i]
-        left_id, left_value = self.left_child(i)
-        right_id, right_value = self.right_child(i)
-
-        if left_value is None and right_value is None:
-            return None
-
-        if val > min(filter(None, [left_value, right_value])):
-            if left_value and right_value:
-                if left_value < right_value:
-                    self.swap(i, left_id)
-                    self._sift_down(left_id)
-                else:
-                    self.swap(i, right_id)
-                    self._sift_down(right_id)
-            elif left_value and right_value is None:
-                self.swap(i, left_id)
-                self._sift_down(left_id)
-            elif right_value and left_value is None:
-                self.swap(i, right_id)
-                self._sift_down(right_id)
+        storage, key, size = self.storage, self.key, self.size
+        value = storage[i]
+        value_key = key(value) if key else value
+        while True:
+            child_id = 2 * i + 1
+            if child_id >= size:
+                break
+            child = storage[child_id]
+            child_key = key(child) if key else child
+            if child_id + 1 < size:
+                right = storage[child_id + 1]
+                right_key = key(right) if key else right
+                if right_key < child_key:
+                    child_id += 1
+                    child, child_key = right, right_key
+            if not child_key < value_key:
+                break
+            storage[i] = child
+            i = child_id
+        storage[i] = value
 
     def remove(self, k):
-        pass
+        """Remove an element, ValueError if it's not in the heap. The element
+        is found by a linear scan, IndexedMinHeap removes in O(log n)
+
+        :param k: element
+        """
+        i = self.storage.index(k)
+        last = self.storage.pop()
+        if i < self.size:
+            self.storage[i] = last
+            self._sift_up(i)
+            self._sift_down(i)
 
     def extract_min(self):
         if self.size == 0:
@@ -138,11 +170,196 @@ class MinHeap(BinaryHeap):
 
         :return: bool
         """
+        key = self.key or (lambda value: value)
         for i in range(self.size):
             parent_id, parent_val = self.get_parent(i)
-            if parent_val > self.storage[i]:
+            if key(parent_val) > key(self.storage[i]):
                 return False
         return True
 
     def __repr__(self):
         return '{}({})'.format(self.__class__.__name__, self.storage)
+
+
+class IndexedMinHeap(BinaryHeap):
+    """Min heap of distinct hashable items with priorities
+
+    A position map (item -> index in the storage) makes the item lookup O(1),
+    so the priority of a queued item can be changed and any item can be
+    removed in O(log n), e.g. a Dijkstra search keeps a single entry per
+    vertex instead of pushing duplicates.
+
+    :param items: dict or iterable of (item, priority), the heap is built
+    bottom-up in O(n)
+    """
+
+    def __init__(self, items=None):
+        super().__init__()
+        self._priorities = dict(items or ())
+        self._positions = {}
+        self._storage.extend(self._priorities)
+        for i, item in enumerate(self._storage):
+            self._positions[item] = i
+        self._build()
+
+    @classmethod
+    def heapify(cls, items):
+        """Build a heap of (item, priority) in O(n)"""
+        return cls(items)
+
+    def swap(self, i, j):
+        result = super().swap(i, j)
+        self._positions[self.storage[i]] = i
+        self._positions[self.storage[j]] = j
+        return result
+
+    def insert(self, item, priority):
+        """Insert new item into the heap
+
+        :param item: hashable item, must not be in the heap
+        :param priority: comparable priority
+        """
+        if item in self._positions:
+            raise KeyError('Item {!r} is already in the heap'.format(item))
+        self._priorities[item] = priority
+        self._positions[item] = self.size
+        self.storage.append(item)
+        self._sift_up(self.size - 1)
+
+    def priority(self, item):
+        """Priority of the item, KeyError if it's not in the heap"""
+        return self._priorities[item]
+
+    def peek(self):
+        """Item with the min priority
+
+        :return: tuple: (item, priority) or None if the heap is empty
+        """
+        if not self.storage:
+            return None
+        item = self.storage[0]
+        return item, self._priorities[item]
+
+    def extract_min(self):
+        """Remove the item with the min priority
+
+        :return: tuple: (item, priority) or None if the heap is empty
+        """
+        if not self.storage:
+            return None
+        item = self.storage[0]
+        return item, self.remove(item)
+
+    def remove(self, item):
+        """Remove the item, KeyError if it's not in the heap
+
+        :return: priority of the item
+        """
+        i = self._positions.pop(item)
+        priority = self._priorities.pop(item)
+        last = self.storage.pop()
+        if i < self.size:
+            # The last item fills the hole, it may go either way
+            self.storage[i] = last
+            self._positions[last] = i
+            self._sift_up(i)
+            self._sift_down(self._positions[last])
+        return priority
+
+    def decrease_key(self, item, priority):
+        """Lower the priority of the item
+
+        :param item: item in the heap
+        :param priority: new priority, must not be greater than the current
+        """
+        if priority > self._priorities[item]:
+            raise ValueError(
+                'Wrong priority: {}. Must be <= {}'.format(
+                    priority, self._priorities[item]))
+        self._priorities[item] = priority
+        self._sift_up(self._positions[item])
+
+    def increase_key(self, item, priority):
+        """Raise the priority of the item
+
+        :param item: item in the heap
+        :param priority: new priority, must not be less than the current
+        """
+        if priority < self._priorities[item]:
+            raise ValueError(
+                'Wrong priority: {}. Must be >= {}'.format(
+                    priority, self._priorities[item]))
+        self._priorities[item] = priority
+        self._sift_down(self._positions[item])
+
+    def push(self, item, priority):
+        """Insert the item or change its priority either way"""
+        current = self._priorities.get(item)
+        if current is None:
+            self.insert(item, priority)
+        elif priority < current:
+            self.decrease_key(item, priority)
+        else:
+            self.increase_key(item, priority)
+
+    def contains(self, item):
+        return item in self._positions
+
+    def _sift_up(self, i):
+        storage, priorities = self.storage, self._priorities
+        item = storage[i]
+        priority = priorities[item]
+        # The item is moved into its place once, the parents move down
+        while i > 0:
+            parent_id = (i - 1) // 2
+            parent = storage[parent_id]
+            if priorities[parent] <= priority:
+                break
+            storage[i] = parent
+            self._positions[parent] = i
+            i = parent_id
+        storage[i] = item
+        self._positions[item] = i
+
+    def _sift_down(self, i):
+        storage, priorities = self.storage, self._priorities
+        size = self.size
+        item = storage[i]
+        priority = priorities[item]
+        while True:
+            child_id = 2 * i + 1
+            if child_id >= size:
+                break
+            if child_id + 1 < size and priorities[storage[child_id + 1]] < \
+                    priorities[storage[child_id]]:
+                child_id += 1
+            child = storage[child_id]
+            if priorities[child] >= priority:
+                break
+            storage[i] = child
+            self._positions[child] = i
+            i = child_id
+        storage[i] = item
+        self._positions[item] = i
+
+    def validate(self):
+        """Helper method to validate correctness of heap structure
+
+        :return: bool
+        """
+        for i, item in enumerate(self.storage):
+            parent = self.get_parent(i)[1]
+            if self._priorities[parent] > self._priorities[item] or \
+                    self._positions[item] != i:
+                return False
+        return len(self._positions) == len(self._priorities) == self.size
+
+    def __contains__(self, item):
+        return self.contains(item)
+
+    def __len__(self):
+        return self.size
+
+    def __repr__(self):
+        return '{}({})'.format(self.__class__.__name__, [
+            (item, self._priorities[item]) for item in self.storage])
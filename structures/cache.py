@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+"""Bounded cache built on top of SeparateChainHashTable
+
+The hash table maps a key to an entry, the entries are linked into doubly
+linked lists to find an eviction candidate in O(1):
+
+  - LRU: one list ordered by recency, a hit moves the entry to the front,
+    the tail is evicted
+  - LFU: one list per frequency (ordered by recency inside), a hit moves the
+    entry to the list of frequency + 1, the tail of the list with the lowest
+    frequency is evicted
+
+The cache is bounded by the number of entries and / or by the total size of
+the values in bytes. Entries may have a time to live, expired entries are
+removed lazily: when they are looked up or when they reach the eviction end
+of the list.
+
+Example:
+
+    @memoize(max_entries=1024)
+    def distance(s, t):
+        return levenshtein_distance(s, t)
+
+    distance('row', 'roar')
+    distance.cache.hits
+"""
+import functools
+import sys
+import time
+
+from structures.hash_table import AssociativeArray, SeparateChainHashTable
+
+
+LRU = 'lru'
+LFU = 'lfu'
+
+
+class _Entry(object):
+    __slots__ = ('key', 'value', 'size', 'expires', 'freq', 'prev', 'next')
+
+    def __init__(self, key=None, value=None, size=0, expires=None):
+        self.key = key
+        self.value = value
+        self.size = size
+        self.expires = expires
+        self.freq = 1
+        self.prev = self.next = self
+
+
+class _LinkedList(object):
+    """Circular doubly linked list with a sentinel root entry"""
+
+    def __init__(self):
+        self.root = _Entry()
+        self.length = 0
+
+    def push_front(self, entry):
+        root = self.root
+        entry.prev, entry.next = root, root.next
+        root.next.prev = entry
+        root.next = entry
+        self.length += 1
+
+    def remove(self, entry):
+        entry.prev.next = entry.next
+        entry.next.prev = entry.prev
+        entry.prev = entry.next = entry
+        self.length -= 1
+
+    def tail(self):
+        return None if self.length == 0 else self.root.prev
+
+
+class Cache(AssociativeArray):
+    """Bounded LRU / LFU cache with optional TTL
+
+    :param max_entries: int: max number of entries, unbounded if None
+    :param max_bytes: int: max total size of values, unbounded if None
+    :param policy: str: 'lru' or 'lfu'
+    :param ttl: float: default time to live in seconds, no expiration if None
+    :param sizeof: function: size of a value in bytes, sys.getsizeof
+    :param clock: function: current time in seconds, time.monotonic
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None, policy=LRU,
+                 ttl=None, sizeof=sys.getsizeof, clock=time.monotonic):
+        super().__init__()
+        if policy not in (LRU, LFU):
+            raise ValueError(
+                'Wrong policy: {}. Must be {!r} or {!r}'.format(
+                    policy, LRU, LFU))
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self.clock = clock
+
+        self._index = SeparateChainHashTable()
+        self._lists = {}  # frequency -> list, single list for LRU
+        self._min_freq = 1
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def size(self):
+        return self._index.size
+
+    @property
+    def bytes(self):
+        return self._bytes
+
+    def _list(self, freq):
+        if freq not in self._lists:
+            self._lists[freq] = _LinkedList()
+        return self._lists[freq]
+
+    def _link(self, entry):
+        freq = entry.freq if self.policy == LFU else 1
+        self._list(freq).push_front(entry)
+
+    def _unlink(self, entry):
+        freq = entry.freq if self.policy == LFU else 1
+        lst = self._lists[freq]
+        lst.remove(entry)
+        if lst.length == 0:
+            del self._lists[freq]
+
+    def _touch(self, entry):
+        """Register a hit: move the entry to the front of its list"""
+        self._unlink(entry)
+        if self.policy == LFU:
+            if entry.freq == self._min_freq and entry.freq not in self._lists:
+                self._min_freq += 1
+            entry.freq += 1
+        self._link(entry)
+
+    def _is_expired(self, entry):
+        return entry.expires is not None and entry.expires <= self.clock()
+
+    def _remove(self, entry):
+        self._unlink(entry)
+        self._index.delete(entry.key)
+        self._bytes -= entry.size
+
+    def get(self, key, default=None):
+        entry = self._index.get(key)
+        if entry is not None and self._is_expired(entry):
+            self._remove(entry)
+            self.expirations += 1
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        self._touch(entry)
+        return entry.value
+
+    def contains(self, key):
+        entry = self._index.get(key)
+        return entry is not None and not self._is_expired(entry)
+
+    def put(self, key, value, ttl=None):
+        """Put a value into the cache, evict entries if the cache is full
+
+        :param key: any hashable value
+        :param value: any value
+        :param ttl: float: time to live in seconds, cache ttl by default
+        :return: True if the key was in the cache
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires = None if ttl is None else self.clock() + ttl
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+
+        # An update replaces the entry, an LFU entry keeps its frequency
+        old = self._index.get(key)
+        if old is not None:
+            self._remove(old)
+        if self._never_fits(size):
+            # Don't flush the whole cache for nothing
+            return True if old is not None else None
+
+        self._evict(size)
+        entry = _Entry(key, value, size, expires)
+        if old is not None and self.policy == LFU:
+            entry.freq = old.freq + 1
+        self._index.put(key, entry)
+        self._bytes += size
+        self._link(entry)
+        self._min_freq = min(self._min_freq, entry.freq)
+        return True if old is not None else None
+
+    def delete(self, key):
+        entry = self._index.get(key)
+        if entry is None:
+            return False
+        self._remove(entry)
+        return True
+
+    def _entries(self):
+        """Non-expired entries in the order of the index. Iteration doesn't
+        count as a hit and doesn't change the eviction order, it raises
+        RuntimeError if the cache gets a new key or loses one meanwhile"""
+        now = self.clock()
+        for key, entry, hash_code in self._index._iter_entries():
+            if entry.expires is None or entry.expires > now:
+                yield key, entry.value, hash_code
+
+    def _never_fits(self, size):
+        """Check if an entry of the given size can't fit into the empty
+        cache"""
+        return (self.max_entries is not None and self.max_entries < 1) \
+            or (self.max_bytes is not None and size > self.max_bytes)
+
+    def _is_full(self, size):
+        """Check if there is no room for a new entry of the given size"""
+        return (self.max_entries is not None
+                and self.size + 1 > self.max_entries) \
+            or (self.max_bytes is not None
+                and self._bytes + size > self.max_bytes)
+
+    def _evict(self, size):
+        """Evict entries to make room for a new entry of the given size"""
+        while self.size and self._is_full(size):
+            if self.policy == LFU:
+                if self._min_freq not in self._lists:
+                    self._min_freq = min(self._lists)
+                victim = self._lists[self._min_freq].tail()
+            else:
+                victim = self._lists[1].tail()
+
+            if self._is_expired(victim):
+                self.expirations += 1
+            else:
+                self.evictions += 1
+            self._remove(victim)
+
+    def clear(self):
+        self._index = SeparateChainHashTable()
+        self._lists = {}
+        self._min_freq = 1
+        self._bytes = 0
+
+    def stats(self):
+        """Cache counters
+
+        :return: dict
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'size': self.size,
+            'bytes': self._bytes,
+        }
+
+    def __repr__(self):
+        return '%s(policy=%s, size=%d, hits=%d, misses=%d)' % (
+            self.__class__.__name__, self.policy, self.size, self.hits,
+            self.misses)
+
+
+def _make_key(args, kwargs):
+    if kwargs:
+        return args + (_KWARGS_MARK, ) + tuple(sorted(kwargs.items()))
+    return args
+
+
+_KWARGS_MARK = object()
+_MISSING = object()
+
+
+def memoize(max_entries=1024, max_bytes=None, policy=LRU, ttl=None):
+    """Memoizing decorator backed by Cache. Arguments must be hashable.
+
+    The cache is available as the `cache` attribute of the decorated function
+
+    :param max_entries: int: max number of cached results
+    :param max_bytes: int: max total size of cached results
+    :param policy: str: 'lru' or 'lfu'
+    :param ttl: float: time to live of a result in seconds
+    """
+    def decorator(func):
+        cache = Cache(max_entries=max_entries, max_bytes=max_bytes,
+                      policy=policy, ttl=ttl)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = _make_key(args, kwargs)
+            result = cache.get(key, _MISSING)
+            if result is _MISSING:
+                result = func(*args, **kwargs)
+                cache.put(key, result)
+            return result
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
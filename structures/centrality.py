@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""Vertex ranking: PageRank and betweenness centrality
+
+Both work on the CSR arrays of a graph, a Graph is converted once.
+
+PageRank is computed by NumPy power iterations: every step spreads the
+ranks over the out edges with a single bincount over the edge targets, the
+rank of the dangling vertices (no out edges) is spread evenly over all the
+vertices.
+
+Betweenness is computed by the Brandes algorithm, a Dijkstra search from
+every source followed by the dependency accumulation in reverse order. An
+approximation runs it from a random sample of sources only and scales the
+result. Sources are split into chunks for a process pool, workers attach to
+the graph in shared memory like the distance matrix ones, and send back
+partial sums. Before Python 3.8 there's no shared memory, the sources are
+processed in the calling process.
+
+Example:
+    ranks = pagerank(graph, damping=0.85)
+    scores = betweenness_centrality(graph, samples=256, workers=8)
+"""
+import array
+import heapq
+import multiprocessing
+import os
+import random
+import warnings
+
+from structures.csr_graph import CSRGraph
+from structures.distance_matrix import _Snapshot, shared_memory
+from structures.graph import INF, Graph
+from structures.hash_table import numpy
+
+
+def _to_csr(graph):
+    return CSRGraph.from_graph(graph) if isinstance(graph, Graph) else graph
+
+
+def pagerank(graph, damping=0.85, tol=1e-6, max_iter=100):
+    """PageRank of the graph vertices, edge distances are ignored
+
+    :param graph: Graph or CSRGraph
+    :param damping: float: probability to follow an edge, 0 < damping < 1
+    :param tol: float: the iterations stop when the sum of rank changes is
+    less than size * tol
+    :param max_iter: int: max number of iterations, a RuntimeWarning is
+    issued if they don't converge
+    :return: dict: vertex value -> rank, ranks sum up to 1
+    """
+    if numpy is None:
+        raise ImportError('NumPy is required to compute PageRank')
+    if not 0 < damping < 1:
+        raise ValueError(
+            'Wrong damping value: {}. Must be in (0, 1)'.format(damping))
+    csr = _to_csr(graph)
+    n = csr.size
+    if n == 0:
+        return {}
+
+    out_degree = numpy.diff(numpy.frombuffer(csr.offsets, dtype=numpy.int32))
+    sources = numpy.repeat(numpy.arange(n), out_degree)
+    targets = numpy.frombuffer(csr.targets, dtype=numpy.int32)
+    dangling = out_degree == 0
+    inverse_degree = numpy.zeros(n)
+    inverse_degree[~dangling] = 1.0 / out_degree[~dangling]
+
+    rank = numpy.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        spread = numpy.bincount(targets, weights=(rank * inverse_degree)[
+            sources], minlength=n)
+        new_rank = damping * (spread + rank[dangling].sum() / n) + \
+            (1 - damping) / n
+        error = numpy.abs(new_rank - rank).sum()
+        rank = new_rank
+        if error < n * tol:
+            break
+    else:
+        warnings.warn('PageRank did not converge in {} iterations'.format(
+            max_iter), RuntimeWarning)
+    return dict(zip(csr.values, rank.tolist()))
+
+
+def _accumulate(offsets, targets, weights, sources, betweenness):
+    """Brandes dependencies of the sources added to the betweenness"""
+    push, pop = heapq.heappush, heapq.heappop
+    for s in sources:
+        distances, sigma, predecessors = {s: 0}, {s: 1}, {s: []}
+        settled, order = set(), []
+        queue = [(0, s)]
+        while queue:
+            d, v = pop(queue)
+            if v in settled:
+                continue
+            settled.add(v)
+            order.append(v)
+            sigma_v = sigma[v]
+            for k in range(offsets[v], offsets[v + 1]):
+                w = targets[k]
+                nd = d + weights[k]
+                old = distances.get(w, INF)
+                if nd < old:
+                    distances[w] = nd
+                    sigma[w] = sigma_v
+                    predecessors[w] = [v]
+                    push(queue, (nd, w))
+                elif nd == old and w not in settled:
+                    sigma[w] += sigma_v
+                    predecessors[w].append(v)
+
+        delta = dict.fromkeys(order, 0.0)
+        for w in reversed(order):
+            coefficient = (1 + delta[w]) / sigma[w]
+            for v in predecessors[w]:
+                delta[v] += sigma[v] * coefficient
+            if w != s:
+                betweenness[w] += delta[w]
+    return betweenness
+
+
+_worker_state = {}
+
+
+def _init_worker(snapshot_args):
+    _worker_state['snapshot'] = _Snapshot.attach(*snapshot_args)
+
+
+def _partial_betweenness(sources):
+    snapshot = _worker_state['snapshot']
+    return _accumulate(snapshot.offsets, snapshot.targets, snapshot.weights,
+                       sources, array.array('d', [0]) * snapshot.size)
+
+
+def betweenness_centrality(graph, samples=None, normalized=True, seed=None,
+                           workers=1, chunk_size=None, context=None):
+    """Betweenness centrality, exact or approximated from sampled sources
+
+    :param graph: Graph or CSRGraph
+    :param samples: int: number of random sources, all the vertices if None
+    :param normalized: bool: divide by the number of vertex pairs
+    (size - 1) * (size - 2)
+    :param seed: random seed of the sampling
+    :param workers: int: number of worker processes, os.cpu_count() if None.
+    No processes are started if it's 1 or before Python 3.8
+    :param chunk_size: int: sources per task, a few tasks per worker if None
+    :param context: multiprocessing context, the default one if None
+    :return: dict: vertex value -> betweenness
+    """
+    csr = _to_csr(graph)
+    n = csr.size
+    if samples is None or samples >= n:
+        sources = list(range(n))
+    elif samples < 1:
+        raise ValueError(
+            'Wrong samples value: {}. Must be >= 1'.format(samples))
+    else:
+        sources = random.Random(seed).sample(range(n), samples)
+
+    workers = workers or os.cpu_count() or 1
+    if shared_memory is None:
+        workers = 1
+    betweenness = array.array('d', [0]) * n
+    if workers == 1:
+        _accumulate(csr.offsets, csr.targets, csr.weights, sources,
+                    betweenness)
+    elif sources:
+        if chunk_size is None:
+            chunk_size = max(len(sources) // (workers * 4), 1)
+        chunks = [sources[i:i + chunk_size]
+                  for i in range(0, len(sources), chunk_size)]
+        snapshot = _Snapshot.create(csr)
+        try:
+            context = context or multiprocessing.get_context()
+            with context.Pool(workers, initializer=_init_worker,
+                              initargs=(snapshot.args(),)) as pool:
+                for partial in pool.imap_unordered(_partial_betweenness,
+                                                   chunks):
+                    for i, value in enumerate(partial):
+                        betweenness[i] += value
+        finally:
+            snapshot.close()
+            snapshot.shm.unlink()
+
+    # Every pair is counted in both directions in an undirected graph
+    scale = 1.0 if csr.is_directed else 0.5
+    if normalized:
+        scale = 1.0 / ((n - 1) * (n - 2)) if n > 2 else 0.0
+    if sources:
+        scale *= n / len(sources)
+    return {value: b * scale for value, b in zip(csr.values, betweenness)}
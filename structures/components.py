@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""Connected components of a Graph or a CSRGraph
+
+Vertices are identified by ids: positions in graph.vertices for a Graph (it's
+converted to a CSRGraph first) or CSRGraph ids. Every function makes a single
+linear pass and returns a component id of every vertex plus the component
+sizes. There is no recursion, so any graph size and depth is fine.
+
+    * strongly_connected_components: directed graphs, Tarjan's algorithm with
+      an explicit stack
+    * connected_components: undirected graphs (weakly connected components of
+      directed ones) with union-find
+"""
+import array
+
+from structures.csr_graph import CSRGraph
+from structures.disjoint_set import UnionFind
+from structures.graph import Graph
+
+
+def _as_csr(graph):
+    return CSRGraph.from_graph(graph) if isinstance(graph, Graph) else graph
+
+
+def strongly_connected_components(graph):
+    """Tarjan's strongly connected components algorithm
+
+    Components are numbered in reverse topological order of the condensed
+    graph: no edge leads from a component to one with a higher id.
+
+    :param graph: directed Graph or CSRGraph
+    :return: tuple: (array('i') of component ids, list of component sizes)
+    """
+    csr = _as_csr(graph)
+    n = csr.size
+    offsets, targets = csr.offsets, csr.targets
+    index = array.array('i', [-1]) * n  # discovery order
+    low = array.array('i', [0]) * n  # lowest index reachable
+    component = array.array('i', [-1]) * n
+    on_stack = bytearray(n)
+    stack = []
+    sizes = []
+    counter = 0
+
+    for root in range(n):
+        if index[root] >= 0:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        # Explicit call stack of (vertex, next edge to scan)
+        calls = [(root, offsets[root])]
+        while calls:
+            v, k = calls[-1]
+            if k < offsets[v + 1]:
+                calls[-1] = (v, k + 1)
+                w = targets[k]
+                if index[w] < 0:
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = 1
+                    calls.append((w, offsets[w]))
+                elif on_stack[w] and index[w] < low[v]:
+                    low[v] = index[w]
+                continue
+
+            calls.pop()
+            if calls:
+                u = calls[-1][0]
+                if low[v] < low[u]:
+                    low[u] = low[v]
+            if low[v] == index[v]:
+                # v is the root of a component: pop it off the stack
+                c, size = len(sizes), 0
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = 0
+                    component[w] = c
+                    size += 1
+                    if w == v:
+                        break
+                sizes.append(size)
+
+    return component, sizes
+
+
+def connected_components(graph):
+    """Connected components with union-find, edge directions are ignored
+
+    Components are numbered in order of their first vertex.
+
+    :param graph: Graph or CSRGraph
+    :return: tuple: (array('i') of component ids, list of component sizes)
+    """
+    csr = _as_csr(graph)
+    n = csr.size
+    offsets, targets = csr.offsets, csr.targets
+    sets = UnionFind(n)
+    for v in range(n):
+        for k in range(offsets[v], offsets[v + 1]):
+            sets.union(v, targets[k])
+
+    component = array.array('i', [-1]) * n
+    ids = {}
+    sizes = []
+    for v in range(n):
+        root = sets.find(v)
+        if root not in ids:
+            ids[root] = len(sizes)
+            sizes.append(sets.size(root))
+        component[v] = ids[root]
+    return component, sizes
+
+
+def components(graph):
+    """Strongly connected components of a directed graph, connected ones of
+    an undirected graph
+
+    :param graph: Graph or CSRGraph
+    :return: tuple: (array('i') of component ids, list of component sizes)
+    """
+    if graph.is_directed:
+        return strongly_connected_components(graph)
+    return connected_components(graph)
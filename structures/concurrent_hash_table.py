@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""Thread-safe separate chaining hash table with lock striping
+
+The table is split into stripes (segments) by the hash code of a key, every
+stripe is a small separate chaining hash table guarded by its own lock:
+
+    stripe = hash_code % S
+    chain  = (hash_code // S) % M_stripe
+
+Writers lock only the stripe of the key, so writers of different stripes
+don't wait for each other.
+
+Readers don't take any lock. Every stripe keeps its chains array and its
+size M together in one tuple, which is replaced as a whole on resize. Every
+chain is a tuple too, writers never modify chains in place: they build a new
+chain and replace the reference in the chains array, which is atomic. So a
+reader always sees a consistent chain of a consistent table.
+
+Resizing is done stripe by stripe: the stripe which crossed the load factor
+bounds builds a new chains array aside while holding its own lock, then swaps
+the snapshot. Readers keep reading the old snapshot meanwhile and never
+block, writers of other stripes aren't affected and a single resize rehashes
+only 1/S of the entries.
+
+Iteration over keys, values and items doesn't take any lock either, it walks
+the current snapshots of the stripes and doesn't detect concurrent writes.
+"""
+import threading
+
+from structures.hash_table import AssociativeArray, Node
+
+
+class _Stripe(object):
+    __slots__ = ('lock', 'table', 'size')
+
+    def __init__(self, m):
+        self.lock = threading.Lock()
+        self.table = ([None] * m, m)  # (chains, M) snapshot
+        self.size = 0
+
+
+class ConcurrentHashTable(AssociativeArray):
+    """Lock-striped concurrent variant of SeparateChainHashTable
+
+    :param stripes: int: number of stripes (locks)
+    :param m: int: initial number of chains in total
+    """
+
+    def __init__(self, stripes=16, m=97, max_load=2.0, min_load=0.125):
+        # AssociativeArray.__init__ isn't called: the size and M are kept
+        # per stripe
+        if not 0 <= min_load < max_load / 2:
+            raise ValueError(
+                'Wrong load factor bounds: min_load={}, max_load={}. '
+                'Must be 0 <= min_load < max_load / 2'.format(
+                    min_load, max_load))
+        self.max_load = max_load
+        self.min_load = min_load
+        self._stripe_m = max(-(-m // stripes), 1)
+        self._stripes = [_Stripe(self._stripe_m) for _ in range(stripes)]
+
+    @property
+    def m(self):
+        return sum(stripe.table[1] for stripe in self._stripes)
+
+    @property
+    def size(self):
+        return sum(stripe.size for stripe in self._stripes)
+
+    def _locate(self, key):
+        hash_code = self.hash_code(key)
+        stripes = len(self._stripes)
+        return self._stripes[hash_code % stripes], hash_code // stripes
+
+    def get(self, key):
+        stripe, code = self._locate(key)
+        chains, m = stripe.table
+        chain = chains[code % m]
+        if chain is not None:
+            for node in chain:
+                if node.key == key:
+                    return node.value
+        return None
+
+    def put(self, key, value):
+        stripe, code = self._locate(key)
+        with stripe.lock:
+            chains, m = stripe.table
+            i = code % m
+            chain = chains[i]
+            if chain is not None:
+                for node in chain:
+                    if node.key == key:
+                        node.value = value
+                        return True  # True indicates that the key was found
+
+            # Copy-on-write: the chain tuple is replaced, never modified
+            node = Node(key, value, code)
+            self._set_chain(stripe, i, (node,) + (chain or ()))
+            stripe.size += 1
+            if stripe.size > self.max_load * m:
+                self._resize(stripe, 2 * m)
+        return None
+
+    def delete(self, key):
+        """Remove the key from its chain
+
+        :param key:
+        :return: bool: True if the key was found
+        """
+        stripe, code = self._locate(key)
+        with stripe.lock:
+            chains, m = stripe.table
+            i = code % m
+            chain = chains[i] or ()
+            new_chain = tuple(node for node in chain if node.key != key)
+            if len(new_chain) == len(chain):
+                return False
+
+            self._set_chain(stripe, i, new_chain or None)
+            stripe.size -= 1
+            if stripe.size < self.min_load * m and m > self._stripe_m:
+                self._resize(stripe, max(m // 2, self._stripe_m))
+        return True
+
+    @staticmethod
+    def _set_chain(stripe, i, chain):
+        # A list item assignment is atomic, readers see either the old or
+        # the new chain
+        stripe.table[0][i] = chain
+
+    def _resize(self, stripe, new_m):
+        """Rehash a single stripe, must be called with the stripe lock held.
+        Nodes keep their hash codes, so hash() isn't called again"""
+        chains = [None] * new_m
+        for chain in stripe.table[0]:
+            for node in chain or ():
+                i = node.hash % new_m
+                chains[i] = (node,) + (chains[i] or ())
+        stripe.table = (chains, new_m)
+
+    def _entries(self):
+        stripes = len(self._stripes)
+        for s, stripe in enumerate(self._stripes):
+            for chain in stripe.table[0]:
+                for node in chain or ():
+                    yield node.key, node.value, node.hash * stripes + s
+
+    def _iter_entries(self):
+        """Weakly consistent iteration: it never raises and never blocks
+        writers, entries put or deleted meanwhile may be seen or not"""
+        return self._entries()
+
+    def __repr__(self):
+        return '%s(stripes=%d, size=%d)' % (
+            self.__class__.__name__, len(self._stripes), self.size)
@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""Contraction hierarchies: shortest path queries on a rarely changing graph
+
+Preprocessing contracts the vertices one by one, from the least important to
+the most important one. Contracting a vertex v removes it from the remaining
+graph; for every pair of its neighbors u -> v -> w a shortcut u -> w of the
+same length is added, unless a witness path u ... w not longer than it
+exists without v. The contraction order is the vertex rank.
+
+A query runs a bidirectional Dijkstra search where both sides go only
+upwards, to the vertices of higher rank: the forward search over the
+upward edges from the source and the backward search over the reversed
+downward edges from the target. The shortest path is the best vertex
+reached by both sides, shortcuts of the path are unpacked recursively to the
+original edges. Both searches settle only a few hundred vertices even on big
+road graphs.
+
+Example:
+    ch = ContractionHierarchy(graph)
+    ch.save('roads.ch')
+    ch = ContractionHierarchy.load('roads.ch')
+    distance, path = ch.query('A', 'D')
+    path.get_path('A', 'D')
+"""
+import array
+import heapq
+import pickle
+
+from structures.csr_graph import CSRGraph, CSRPath
+from structures.graph import INF, Graph
+
+
+class ContractionHierarchy(object):
+    """Contraction hierarchy index over a Graph or a CSRGraph
+
+    :param graph: Graph or CSRGraph
+    :param witness_limit: int: max vertices settled by a witness search, a
+    shortcut is added if no witness is found within the limit
+    """
+
+    MAGIC = b'CHI1'
+
+    def __init__(self, graph, witness_limit=64):
+        if isinstance(graph, Graph):
+            graph = CSRGraph.from_graph(graph)
+        self.graph = graph
+        self.witness_limit = witness_limit
+        self._middle = {}  # (u, w) -> contracted vertex of a shortcut
+        self._build()
+
+    @property
+    def shortcuts_count(self):
+        return len(self._middle)
+
+    def _build(self):
+        n = self.graph.size
+        out_edges = [{} for _ in range(n)]
+        in_edges = [{} for _ in range(n)]
+        for u in range(n):
+            for w, distance in self.graph.neighbors(u):
+                if u != w and distance < out_edges[u].get(w, INF):
+                    out_edges[u][w] = in_edges[w][u] = distance
+
+        # Upward and reversed downward edges of the final hierarchy
+        self._up = [[] for _ in range(n)]
+        self._down = [[] for _ in range(n)]
+        self.rank = array.array('i', [-1]) * n
+        contracted_neighbors = [0] * n
+
+        queue = [(self._priority(v, out_edges, in_edges, 0), v)
+                 for v in range(n)]
+        heapq.heapify(queue)
+        rank = 0
+        while queue:
+            _, v = heapq.heappop(queue)
+            # Lazy update: priorities change as neighbors get contracted
+            priority = self._priority(v, out_edges, in_edges,
+                                      contracted_neighbors[v])
+            if queue and priority > queue[0][0]:
+                heapq.heappush(queue, (priority, v))
+                continue
+
+            self.rank[v] = rank
+            rank += 1
+            for u in set(in_edges[v]) | set(out_edges[v]):
+                contracted_neighbors[u] += 1
+            self._contract(v, out_edges, in_edges)
+
+        self._up = self._to_arrays(self._up)
+        self._down = self._to_arrays(self._down)
+
+    def _priority(self, v, out_edges, in_edges, contracted_neighbors):
+        """Edge difference plus the number of contracted neighbors, which
+        spreads the contraction evenly over the graph"""
+        shortcuts = len(self._shortcuts(v, out_edges, in_edges))
+        removed = len(out_edges[v]) + len(in_edges[v])
+        return shortcuts - removed + contracted_neighbors
+
+    def _shortcuts(self, v, out_edges, in_edges):
+        """Shortcuts needed to contract the vertex v
+
+        :return: list of (u, w, distance)
+        """
+        shortcuts = []
+        targets = out_edges[v]
+        for u, d_uv in in_edges[v].items():
+            if not targets or (len(targets) == 1 and u in targets):
+                continue
+            limit = d_uv + max(targets.values())
+            witness = self._witness_search(u, v, limit, out_edges)
+            for w, d_vw in targets.items():
+                if w != u and witness.get(w, INF) > d_uv + d_vw:
+                    shortcuts.append((u, w, d_uv + d_vw))
+        return shortcuts
+
+    def _witness_search(self, src, skip, limit, out_edges):
+        """Local Dijkstra search in the remaining graph without the vertex
+        being contracted
+
+        :return: dict: vertex -> distance
+        """
+        distances = {src: 0}
+        settled = 0
+        queue = [(0, src)]
+        while queue and settled < self.witness_limit:
+            d, u = heapq.heappop(queue)
+            if d > distances[u]:
+                continue
+            if d > limit:
+                break
+            settled += 1
+            for w, distance in out_edges[u].items():
+                nd = d + distance
+                if w != skip and nd < distances.get(w, INF):
+                    distances[w] = nd
+                    heapq.heappush(queue, (nd, w))
+        return distances
+
+    def _contract(self, v, out_edges, in_edges):
+        for u, w, distance in self._shortcuts(v, out_edges, in_edges):
+            if distance < out_edges[u].get(w, INF):
+                out_edges[u][w] = in_edges[w][u] = distance
+                self._middle[(u, w)] = v
+
+        # The remaining vertices get higher ranks than v: its out edges go
+        # upwards, its in edges are downward ones and the backward search
+        # follows them reversed
+        for w, distance in out_edges[v].items():
+            self._up[v].append((w, distance))
+            del in_edges[w][v]
+        for u, distance in in_edges[v].items():
+            self._down[v].append((u, distance))
+            del out_edges[u][v]
+        out_edges[v] = {}
+        in_edges[v] = {}
+
+    @staticmethod
+    def _to_arrays(adjacency):
+        offsets = array.array('i', [0])
+        targets = array.array('i')
+        weights = array.array('d')
+        for edges in adjacency:
+            for w, distance in edges:
+                targets.append(w)
+                weights.append(distance)
+            offsets.append(len(targets))
+        return offsets, targets, weights
+
+    def _search_step(self, queue, distances, parents, edges, other, best):
+        d, u = heapq.heappop(queue)
+        if d > distances[u]:
+            return best
+        if u in other and d + other[u] < best[0]:
+            best = (d + other[u], u)
+        offsets, targets, weights = edges
+        for k in range(offsets[u], offsets[u + 1]):
+            w = targets[k]
+            nd = d + weights[k]
+            if nd < distances.get(w, INF):
+                distances[w] = nd
+                parents[w] = u
+                heapq.heappush(queue, (nd, w))
+        return best
+
+    def _query(self, src, dst):
+        forward, backward = {src: 0}, {dst: 0}
+        forward_parents, backward_parents = {src: None}, {dst: None}
+        forward_queue, backward_queue = [(0, src)], [(0, dst)]
+        best = (INF, None)
+        while forward_queue or backward_queue:
+            # Upward searches can't stop when they meet first: the meeting
+            # vertex is the best one only when both frontiers exceed it
+            if forward_queue and forward_queue[0][0] >= best[0]:
+                forward_queue = []
+            if backward_queue and backward_queue[0][0] >= best[0]:
+                backward_queue = []
+            if forward_queue:
+                best = self._search_step(forward_queue, forward,
+                                         forward_parents, self._up,
+                                         backward, best)
+            if backward_queue:
+                best = self._search_step(backward_queue, backward,
+                                         backward_parents, self._down,
+                                         forward, best)
+        return best, forward_parents, backward_parents
+
+    def distance(self, src_value, dst_value):
+        """Shortest path distance
+
+        :param src_value: src vertex value
+        :param dst_value: dst vertex value
+        :return: float: inf if dst isn't reachable
+        """
+        index = self.graph.index
+        (distance, _), _, _ = self._query(index[src_value],
+                                          index[dst_value])
+        return distance
+
+    def query(self, src_value, dst_value):
+        """Shortest path query
+
+        :param src_value: src vertex value
+        :param dst_value: dst vertex value
+        :return: tuple: (distance, CSRPath), the distance is inf if dst
+        isn't reachable
+        """
+        index = self.graph.index
+        src, dst = index[src_value], index[dst_value]
+        (distance, meeting), forward, backward = self._query(src, dst)
+        parents = {src: None}
+        if meeting is not None:
+            hierarchy_path = [meeting]
+            while hierarchy_path[0] != src:
+                hierarchy_path.insert(0, forward[hierarchy_path[0]])
+            while hierarchy_path[-1] != dst:
+                hierarchy_path.append(backward[hierarchy_path[-1]])
+
+            # Zero length cycles may occur on an unpacked shortest path,
+            # they're cut off to keep one predecessor per vertex
+            path, positions = [], {}
+            for u in self._unpack(hierarchy_path):
+                if u in positions:
+                    for w in path[positions[u] + 1:]:
+                        del positions[w]
+                    del path[positions[u] + 1:]
+                else:
+                    positions[u] = len(path)
+                    path.append(u)
+            for u, w in zip(path, path[1:]):
+                parents[w] = u
+        return distance, CSRPath(self.graph, parents)
+
+    def _unpack(self, hierarchy_path):
+        """Replace shortcuts with the original edges"""
+        path = [hierarchy_path[0]]
+        stack = list(zip(hierarchy_path[1:], hierarchy_path[:-1]))[::-1]
+        while stack:
+            w, u = stack.pop()
+            middle = self._middle.get((u, w))
+            if middle is None:
+                path.append(w)
+            else:
+                stack.append((w, middle))
+                stack.append((middle, u))
+        return path
+
+    def save(self, path):
+        """Save the index to a file
+
+        :param path: str: file path
+        """
+        with open(path, 'wb') as f:
+            f.write(self.MAGIC)
+            pickle.dump({
+                'graph': (self.graph.values, self.graph.offsets,
+                          self.graph.targets, self.graph.weights,
+                          self.graph.is_directed),
+                'rank': self.rank,
+                'up': self._up,
+                'down': self._down,
+                'middle': self._middle,
+                'witness_limit': self.witness_limit,
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        """Load an index saved with save()
+
+        :param path: str: file path
+        :return: ContractionHierarchy
+        """
+        with open(path, 'rb') as f:
+            magic = f.read(len(cls.MAGIC))
+            if magic != cls.MAGIC:
+                raise ValueError('Wrong contraction hierarchy file, bad '
+                                 'magic {!r}'.format(magic))
+            state = pickle.load(f)
+        ch = cls.__new__(cls)
+        ch.graph = CSRGraph(*state['graph'])
+        ch.rank = state['rank']
+        ch._up = state['up']
+        ch._down = state['down']
+        ch._middle = state['middle']
+        ch.witness_limit = state['witness_limit']
+        return ch
+
+    def __repr__(self):
+        return '%s(size=%d, shortcuts=%d)' % (
+            self.__class__.__name__, self.graph.size, self.shortcuts_count)
@@ -0,0 +1,707 @@
+# -*- coding: utf-8 -*-
+"""Compressed sparse row (CSR) graph representation
+
+Vertices are numbered 0 .. N - 1 and the edges are kept in three flat
+arrays instead of a Vertex object per vertex and a list of tuples per edge:
+
+    offsets = [0, 2, 3, 3, ...]       # N + 1 int32
+    targets = [1, 2, 2, ...]          # E int32 neighbor ids
+    weights = [7.0, 3.0, 1.0, ...]    # E floats
+
+Neighbors of the vertex i are targets[offsets[i]:offsets[i + 1]] with the
+corresponding weights. An edge takes 12 bytes with float64 weights and 8 bytes
+with float32 ones (weight_type='f'), compared to hundreds of bytes of Python
+objects in Graph. Vertex values are kept in a list with a value -> id index.
+
+Graph functions (bfs, dijkstra_search, ...) accept a vertex of a CSRGraph
+(see CSRGraph.vertex) as well and run on the arrays directly.
+"""
+import array
+import csv
+import heapq
+import itertools
+import warnings
+
+from structures import graph
+from structures.graph import INF, Graph
+from structures.hash_table import numpy
+
+
+class CSRVertex(object):
+    """Lightweight vertex view of a CSRGraph: created on demand, it holds
+    only the graph and the vertex id"""
+
+    __slots__ = ('csr', 'id')
+
+    def __init__(self, csr, vertex_id):
+        self.csr = csr
+        self.id = vertex_id
+
+    @property
+    def value(self):
+        return self.csr.values[self.id]
+
+    def get_neighbors(self, values_list=False):
+        csr = self.csr
+        if values_list:
+            return [(csr.values[j], w) for j, w in csr.neighbors(self.id)]
+        return [(CSRVertex(csr, j), w) for j, w in csr.neighbors(self.id)]
+
+    def __eq__(self, other):
+        return isinstance(other, CSRVertex) \
+            and self.csr is other.csr and self.id == other.id
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __lt__(self, other):
+        return self.id < other.id
+
+    def __repr__(self):
+        return "%s('%s', neighbors=%d)" % (
+            self.__class__.__name__, self.value, self.csr.degree(self.id))
+
+
+class CSRGraph(object):
+    """Array-backed immutable graph
+
+    :param values: list of vertex values, the index is the vertex id
+    :param offsets: array('i') of N + 1 edge offsets
+    :param targets: array('i') of E neighbor ids
+    :param weights: array of E weights
+    :param directed: bool
+    """
+
+    def __init__(self, values, offsets, targets, weights, directed=True,
+                 index=None):
+        self.values = values
+        if index is None:
+            index = {value: i for i, value in enumerate(values)}
+        self.index = index
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self._directed = directed
+        self._reverse = None
+
+    @property
+    def is_directed(self):
+        return self._directed
+
+    @property
+    def version(self):
+        # The graph is immutable, see Graph.version
+        return 0
+
+    @property
+    def size(self):
+        return len(self.values)
+
+    @property
+    def edges_count(self):
+        """Number of stored edges, undirected edges are stored twice"""
+        return len(self.targets)
+
+    @property
+    def nbytes(self):
+        """Memory taken by the edge arrays"""
+        return sum(a.itemsize * len(a)
+                   for a in (self.offsets, self.targets, self.weights))
+
+    @classmethod
+    def from_edges(cls, edges, directed=True, vertices=(), weight_type='d'):
+        """Build a graph from an edge list, see CSRGraphBuilder
+
+        :param edges: iterable of (src, dst) or (src, dst, distance) tuples
+        :param directed: bool: undirected edges are stored in both directions
+        :param vertices: iterable of vertex values to add, e.g. isolated ones
+        :param weight_type: str: 'd' (float64) or 'f' (float32) weights
+        :return: CSRGraph
+        """
+        builder = CSRGraphBuilder(directed=directed, weight_type=weight_type)
+        builder.add_vertices(vertices)
+        builder.add_edges(edges)
+        return builder.build()
+
+    @classmethod
+    def _from_arrays(cls, values, sources, targets, weights, directed):
+        """Sort the edges by the source vertex"""
+        offsets = _source_offsets(len(values), sources)
+        return cls(values, offsets, _counting_sort(offsets, sources, targets),
+                   _counting_sort(offsets, sources, weights), directed)
+
+    @classmethod
+    def build_graph(cls, dict_struct, directed=True, weight_type='d'):
+        """Build graph from dictionary, see Graph.build_graph"""
+        return cls.from_edges(Graph.iter_dict_edges(dict_struct),
+                              directed=directed, vertices=dict_struct,
+                              weight_type=weight_type)
+
+    @classmethod
+    def from_graph(cls, graph, weight_type='d'):
+        """Convert Graph to CSRGraph. Edges are taken as they're stored, so
+        undirected edges are not doubled again
+
+        :param graph: Graph
+        :return: CSRGraph
+        """
+        values = list(graph.vertices)
+        index = {value: i for i, value in enumerate(values)}
+        offsets = array.array('i', [0])
+        targets = array.array('i')
+        weights = array.array(weight_type)
+        for vertex in graph.vertices.values():
+            for neighbor, distance in vertex.get_neighbors():
+                targets.append(index[neighbor.value])
+                weights.append(distance)
+            offsets.append(len(targets))
+        return cls(values, offsets, targets, weights, graph.is_directed)
+
+    def save(self, path):
+        """Save the graph to a file, it's loaded with Graph.load"""
+        from structures.graph_file import save_graph
+        save_graph(self, path)
+
+    def to_graph(self):
+        g = Graph(directed=True)
+        vertices = [g.add_vertex(value) for value in self.values]
+        for i, vertex in enumerate(vertices):
+            for j, distance in self.neighbors(i):
+                g.add_edge(vertex, vertices[j], distance=distance)
+        g._directed = self.is_directed
+        return g
+
+    def reverse(self):
+        """Graph with every edge reversed, for backward searches. It's built
+        once and cached, an undirected graph is its own reverse
+
+        :return: CSRGraph
+        """
+        if not self.is_directed:
+            return self
+        if self._reverse is None:
+            sources = array.array('i')
+            for i in range(self.size):
+                sources.extend(array.array('i', [i]) * self.degree(i))
+            self._reverse = self._from_arrays(
+                self.values, self.targets, sources, self.weights, True)
+            self._reverse._reverse = self
+        return self._reverse
+
+    def id_of(self, value):
+        return self.index[value]
+
+    def vertex(self, value):
+        """Vertex view by value, to pass it to the graph functions
+
+        :param value: vertex value
+        :return: CSRVertex
+        """
+        return CSRVertex(self, self.index[value])
+
+    def neighbors(self, i):
+        """Neighbors of the vertex i
+
+        :param i: int: vertex id
+        :return: iterator of (neighbor id, distance)
+        """
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return zip(self.targets[start:end], self.weights[start:end])
+
+    def degree(self, i):
+        return self.offsets[i + 1] - self.offsets[i]
+
+    def as_dict(self):
+        return {
+            value: [(self.values[j], w) for j, w in self.neighbors(i)]
+            for i, value in enumerate(self.values)
+        }
+
+    def __contains__(self, item):
+        if isinstance(item, CSRVertex):
+            return item.csr is self
+        return item in self.index
+
+    def __iter__(self):
+        return (CSRVertex(self, i) for i in range(self.size))
+
+    def __len__(self):
+        return self.size
+
+    def __repr__(self):
+        return "%s(directed=%s, size=%d, edges=%d)" % (
+            self.__class__.__name__, self.is_directed, self.size,
+            self.edges_count)
+
+
+def _source_offsets(n, sources):
+    """CSR offsets from an array of edge sources"""
+    offsets = array.array('i', [0]) * (n + 1)
+    for i in sources:
+        offsets[i + 1] += 1
+    for i in range(n):
+        offsets[i + 1] += offsets[i]
+    return offsets
+
+
+def _counting_sort(offsets, sources, items):
+    """Copy of the edge items sorted by the edge source, the order of the
+    edges of every vertex is kept"""
+    position = offsets[:-1]
+    result = array.array(items.typecode, [0]) * len(items)
+    for i, item in zip(sources, items):
+        k = position[i]
+        result[k] = item
+        position[i] = k + 1
+    return result
+
+
+def _sort_order(n, sources):
+    """Vectorized _source_offsets and the stable order of the edges sorted
+    by the source"""
+    sources = numpy.frombuffer(sources, dtype=numpy.int32)
+    offsets = array.array('i', [0]) * (n + 1)
+    numpy.cumsum(numpy.bincount(sources, minlength=n),
+                 out=numpy.frombuffer(offsets, dtype=numpy.int32)[1:])
+    return offsets, numpy.argsort(sources, kind='stable')
+
+
+def _take(items, order):
+    """Vectorized _counting_sort, items are reordered by the sort order"""
+    result = array.array(items.typecode, [0]) * len(items)
+    numpy.take(numpy.frombuffer(items, dtype=items.typecode), order,
+               out=numpy.frombuffer(result, dtype=items.typecode))
+    return result
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class CSRGraphBuilder(object):
+    """Streaming CSRGraph builder
+
+    Edges are consumed in chunks from any iterator or from an edge list
+    file, vertex values are interned to ids as they come and the edges are
+    appended to flat arrays, so the input is never held in memory as a
+    whole. build() sorts the edges into the CSR layout.
+
+    Peak memory is about the final graph plus one int32 per edge (the
+    sources) and one copy of the array being sorted.
+
+    Example:
+        builder = CSRGraphBuilder(directed=False, progress=print)
+        builder.add_edge_list('roads.tsv', delimiter='\t',
+                              value_type=int)
+        graph = builder.build()
+
+    :param directed: bool: undirected edges are stored in both directions
+    :param weight_type: str: 'd' (float64) or 'f' (float32) weights
+    :param progress: function: called with the number of consumed edges
+    every progress_every edges
+    :param progress_every: int
+    """
+
+    def __init__(self, directed=True, weight_type='d', progress=None,
+                 progress_every=1000000):
+        self.directed = directed
+        self.values = []
+        self.index = {}
+        self.edges_count = 0  # consumed edges
+        self.progress = progress
+        self.progress_every = progress_every
+        self._next_report = progress_every
+        self._sources = array.array('i')
+        self._targets = array.array('i')
+        self._weights = array.array(weight_type)
+
+    def intern(self, value):
+        """Vertex id of the value, a new vertex is added if it's new
+
+        :param value: vertex value
+        :return: int: vertex id
+        """
+        vertex_id = self.index.get(value)
+        if vertex_id is None:
+            vertex_id = self.index[value] = len(self.values)
+            self.values.append(value)
+        return vertex_id
+
+    def add_vertices(self, values):
+        for value in values:
+            self.intern(value)
+
+    def add_edge(self, src, dst, distance=1):
+        self.add_edges([(src, dst, distance)])
+
+    def add_edges(self, edges, chunk_size=65536):
+        """Add edges from an iterable
+
+        :param edges: iterable of (src, dst) or (src, dst, distance) tuples
+        :param chunk_size: int: edges consumed at once
+        """
+        for chunk in _chunks(edges, chunk_size):
+            self._add_chunk(chunk)
+
+    def _add_chunk(self, chunk):
+        index_get, intern = self.index.get, self.intern
+        add_source = self._sources.append
+        add_target = self._targets.append
+        add_weight = self._weights.append
+        directed = self.directed
+        for edge in chunk:
+            if len(edge) == 2:
+                (src, dst), distance = edge, 1
+            else:
+                src, dst, distance = edge
+            if distance < 0:
+                raise ValueError(
+                    'Wrong distance value: {}. Must be >= 0'.format(distance))
+            i = index_get(src)
+            if i is None:
+                i = intern(src)
+            j = index_get(dst)
+            if j is None:
+                j = intern(dst)
+            add_source(i)
+            add_target(j)
+            add_weight(distance)
+            if not directed:
+                add_source(j)
+                add_target(i)
+                add_weight(distance)
+
+        self._report(len(chunk))
+
+    def _report(self, count):
+        self.edges_count += count
+        if self.progress is not None \
+                and self.edges_count >= self._next_report:
+            self.progress(self.edges_count)
+            while self._next_report <= self.edges_count:
+                self._next_report += self.progress_every
+
+    def add_edge_list(self, f, delimiter=',', value_type=str, comment='#',
+                      chunk_size=65536):
+        """Add edges from a CSV / TSV file of src, dst[, distance] rows.
+        Empty rows and rows starting with the comment prefix are skipped.
+
+        Numeric vertex values (value_type int or float) are parsed and
+        interned in vectorized chunks if NumPy is installed.
+
+        :param f: str: file path or a text file object
+        :param delimiter: str: ',' for CSV, '\t' for TSV
+        :param value_type: function: vertex value from a string, e.g. int
+        :param comment: str: comment prefix
+        :param chunk_size: int: rows consumed at once
+        """
+        if isinstance(f, str):
+            with open(f, newline='') as fp:
+                return self.add_edge_list(fp, delimiter, value_type, comment,
+                                          chunk_size)
+
+        def parse(row):
+            if len(row) == 2:
+                return value_type(row[0]), value_type(row[1]), 1
+            return value_type(row[0]), value_type(row[1]), float(row[2])
+
+        if numpy is not None and value_type in (int, float):
+            # The first row tells the number of columns
+            for line in f:
+                row = next(csv.reader([line], delimiter=delimiter), None)
+                if row and not (comment and row[0].startswith(comment)):
+                    self._add_chunk([parse(row)])
+                    return self._add_numeric_edge_list(
+                        f, delimiter, value_type, comment, chunk_size,
+                        columns=len(row))
+            return
+
+        def edges():
+            for row in csv.reader(f, delimiter=delimiter):
+                if not row or (comment and row[0].startswith(comment)):
+                    continue
+                yield parse(row)
+
+        self.add_edges(edges(), chunk_size=chunk_size)
+
+    def _add_numeric_edge_list(self, f, delimiter, value_type, comment,
+                               chunk_size, columns):
+        value_dtype = numpy.int64 if value_type is int else numpy.float64
+        fields = [('src', value_dtype), ('dst', value_dtype)]
+        if columns > 2:
+            fields.append(('distance', numpy.float64))
+
+        # Sorted known values and their ids, to intern a chunk with a
+        # vectorized search: only new values go through the index dict
+        known = [(value, i) for value, i in self.index.items()
+                 if isinstance(value, (int, float))]
+        known.sort()
+        self._known_values = numpy.array([v for v, _ in known],
+                                         dtype=value_dtype)
+        self._known_ids = numpy.array([i for _, i in known],
+                                      dtype=numpy.int32)
+        while True:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')  # empty input at the end
+                chunk = numpy.loadtxt(
+                    f, dtype=fields, delimiter=delimiter, comments=comment,
+                    usecols=range(len(fields)), max_rows=chunk_size, ndmin=1)
+            if not len(chunk):
+                break
+            self._add_numeric_chunk(chunk, value_type)
+        del self._known_values, self._known_ids
+
+    def _add_numeric_chunk(self, chunk, value_type):
+        ends = numpy.stack([chunk['src'], chunk['dst']], axis=1).ravel()
+        if 'distance' in chunk.dtype.names:
+            distances = chunk['distance']
+            if (distances < 0).any():
+                raise ValueError(
+                    'Wrong distance value: {}. Must be >= 0'.format(
+                        distances[distances < 0][0]))
+        else:
+            distances = numpy.ones(len(chunk))
+
+        unique, first, inverse = numpy.unique(
+            ends, return_index=True, return_inverse=True)
+        known, known_ids = self._known_values, self._known_ids
+        k = numpy.searchsorted(known, unique)
+        found = k < len(known)
+        found[found] = known[k[found]] == unique[found]
+        ids = numpy.empty(len(unique), dtype=numpy.int32)
+        ids[found] = known_ids[k[found]]
+
+        # New values are interned in the order of their first appearance
+        new = numpy.flatnonzero(~found)
+        new = new[numpy.argsort(first[new], kind='stable')]
+        intern = self.intern
+        for j in new.tolist():
+            ids[j] = intern(value_type(unique[j]))
+        if len(new):
+            values = numpy.concatenate([known, unique[new]])
+            order = numpy.argsort(values, kind='stable')
+            self._known_values = values[order]
+            self._known_ids = numpy.concatenate([known_ids, ids[new]])[order]
+        pairs = ids[inverse.ravel()].reshape(-1, 2)
+
+        if self.directed:
+            sources, targets = pairs[:, 0], pairs[:, 1]
+        else:
+            sources, targets = pairs.ravel(), pairs[:, ::-1].ravel()
+            distances = numpy.repeat(distances, 2)
+        self._sources.frombytes(sources.astype(numpy.int32).tobytes())
+        self._targets.frombytes(targets.astype(numpy.int32).tobytes())
+        self._weights.frombytes(distances.astype(
+            numpy.dtype(self._weights.typecode)).tobytes())
+        self._report(len(chunk))
+
+    def build(self):
+        """Sort the edges into a CSRGraph, the builder can't be used
+        afterwards
+
+        :return: CSRGraph
+        """
+        sources, targets, weights = \
+            self._sources, self._targets, self._weights
+        self._sources = self._targets = self._weights = None
+        n = len(self.values)
+        if numpy is not None and len(sources):
+            offsets, order = _sort_order(n, sources)
+            del sources
+            targets = _take(targets, order)
+            weights = _take(weights, order)
+        else:
+            offsets = _source_offsets(n, sources)
+            # One array at a time, the unsorted one is freed right away
+            targets = _counting_sort(offsets, sources, targets)
+            weights = _counting_sort(offsets, sources, weights)
+            del sources
+        return CSRGraph(self.values, offsets, targets, weights,
+                        self.directed, index=self.index)
+
+    def __repr__(self):
+        return '%s(vertices=%d, edges=%d)' % (
+            self.__class__.__name__, len(self.values), self.edges_count)
+
+
+class CSRPath(object):
+    """Path helper over predecessors: an array of ids with -1 for the
+    unreachable vertices or a dict. The same interface as graph.Path"""
+
+    def __init__(self, csr, parents):
+        self._csr = csr
+        self._parents = parents
+
+    def get_path(self, src_value, dst_value):
+        """Expand vertices path
+
+        :param src_value: src vertex value
+        :param dst_value: dst vertex value
+        :return: list of vertices
+        """
+        csr = self._csr
+        src, i = csr.index[src_value], csr.index[dst_value]
+        path = [i]
+        while i != src:
+            i = self._parents[i]
+            if i is None or i < 0:
+                raise KeyError(dst_value)
+            path.append(i)
+        return [CSRVertex(csr, i) for i in reversed(path)]
+
+    def __repr__(self):
+        return "%s(of=%s)" % (self.__class__.__name__, self._csr)
+
+
+def bfs(csr, sources, max_depth=None, direction_optimizing=True,
+        alpha=14, beta=24):
+    """Level-synchronous multi-source breadth-first search over the arrays
+
+    Every level is expanded as a whole. A top-down step scans the edges of
+    the frontier vertices. When the frontier has more edges than 1 / alpha
+    of the edges of the unvisited vertices, bottom-up steps are taken
+    instead: every unvisited vertex scans its incoming edges and stops at
+    the first parent in the frontier. On low-diameter graphs the few middle
+    levels hold most of the vertices, and bottom-up steps skip most of
+    their edges. Top-down steps are resumed when the frontier shrinks below
+    1 / beta of the vertices (Beamer et al. "Direction-optimizing
+    breadth-first search").
+
+    :param csr: CSRGraph
+    :param sources: list of source vertex ids
+    :param max_depth: int: vertices further than max_depth hops are not
+    visited
+    :param direction_optimizing: bool: allow bottom-up steps
+    :return: tuple: (array('i') of hop distances, array('i') of parents),
+    -1 for unreachable vertices, a source is its own parent
+    """
+    n = csr.size
+    offsets, targets = csr.offsets, csr.targets
+    hops = array.array('i', [-1]) * n
+    parents = array.array('i', [-1]) * n
+    frontier = []
+    for src in sources:
+        if hops[src] < 0:
+            hops[src] = 0
+            parents[src] = src
+            frontier.append(src)
+
+    frontier_edges = sum(offsets[i + 1] - offsets[i] for i in frontier)
+    unvisited_edges = len(targets) - frontier_edges
+    bottom_up = False
+    depth = 0
+    while frontier and (max_depth is None or depth < max_depth):
+        depth += 1
+        if direction_optimizing:
+            if not bottom_up:
+                bottom_up = frontier_edges > unvisited_edges / alpha
+            else:
+                bottom_up = len(frontier) >= n / beta
+
+        if bottom_up:
+            frontier = _bottom_up_step(csr.reverse(), frontier, hops,
+                                       parents, depth)
+        else:
+            next_frontier = []
+            for i in frontier:
+                for k in range(offsets[i], offsets[i + 1]):
+                    j = targets[k]
+                    if hops[j] < 0:
+                        hops[j] = depth
+                        parents[j] = i
+                        next_frontier.append(j)
+            frontier = next_frontier
+        frontier_edges = sum(offsets[i + 1] - offsets[i] for i in frontier)
+        unvisited_edges -= frontier_edges
+    return hops, parents
+
+
+def _bottom_up_step(reverse, frontier, hops, parents, depth):
+    in_offsets, in_targets = reverse.offsets, reverse.targets
+    in_frontier = bytearray(len(hops))
+    for i in frontier:
+        in_frontier[i] = 1
+
+    next_frontier = []
+    for j in range(len(hops)):
+        if hops[j] >= 0:
+            continue
+        for k in range(in_offsets[j], in_offsets[j + 1]):
+            i = in_targets[k]
+            if in_frontier[i]:
+                hops[j] = depth
+                parents[j] = i
+                next_frontier.append(j)
+                break
+    return next_frontier
+
+
+def dijkstra(csr, src, target=None, max_distance=None):
+    """Dijkstra search over the arrays, stale heap entries are skipped
+
+    :param csr: CSRGraph
+    :param src: int: source vertex id
+    :param target: int: vertex id to stop at
+    :param max_distance: max distance of a settled vertex
+    :return: tuple: (array('d') of distances, array('i') of predecessors),
+    inf / -1 for unreachable vertices
+    """
+    offsets, targets, weights = csr.offsets, csr.targets, csr.weights
+    dist = array.array('d', [INF]) * csr.size
+    parents = array.array('i', [-1]) * csr.size
+    done = bytearray(csr.size)
+    dist[src] = 0
+    queue = [(0, src)]
+    while queue:
+        d, i = heapq.heappop(queue)
+        if done[i]:
+            continue
+        if max_distance is not None and d > max_distance:
+            break
+        done[i] = 1
+        if i == target:
+            break
+        for k in range(offsets[i], offsets[i + 1]):
+            j = targets[k]
+            nd = d + weights[k]
+            if nd < dist[j]:
+                dist[j] = nd
+                parents[j] = i
+                heapq.heappush(queue, (nd, j))
+    return dist, parents
+
+
+def dijkstra_search(vertex, target=None, max_distance=None,
+                    bidirectional=False):
+    """graph.dijkstra_search for a CSRVertex
+
+    A full search keeps its state in arrays of the graph size, bounded ones
+    in dicts of the touched vertices only: allocating arrays for the whole
+    graph would cost more than a point-to-point query on a big graph.
+    """
+    csr = vertex.csr
+    src = vertex.id
+    dst = None if target is None else target.id
+    if bidirectional:
+        weights, path = graph._bidirectional_dijkstra(
+            src, dst, csr.neighbors, csr.reverse().neighbors,
+            max_distance=max_distance)
+    elif target is not None or max_distance is not None:
+        weights, path = graph._dijkstra(
+            src, csr.neighbors, target=dst, max_distance=max_distance)
+    else:
+        dist, parents = dijkstra(csr, src)
+        distances = {csr.values[i]: d for i, d in enumerate(dist)
+                     if d != INF}
+        return distances, CSRPath(csr, parents)
+
+    distances = {csr.values[i]: d for i, d in weights.items()}
+    return distances, CSRPath(csr, path)
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""Directed acyclic graphs: topological order and linear time paths
+
+A Graph is converted to a CSRGraph first, vertices are identified by
+positions in graph.vertices. The topological order is found by Kahn's
+algorithm: vertices without incoming edges are taken first, then the
+vertices whose predecessors are all taken. If some vertices are never
+taken the graph has a cycle, it's found among them and reported with
+CycleError.
+
+Path lengths from a source are computed by a single pass over the order,
+every edge is relaxed once, so no heap is needed. The same pass with max
+instead of min gives the longest (critical) paths.
+
+Example:
+    order = topological_sort(graph)
+    for batch in topological_levels(graph):
+        run_concurrently(batch)
+    length, tasks = critical_path(graph)
+"""
+import array
+import operator
+
+from structures.csr_graph import CSRGraph, CSRPath
+from structures.graph import Graph, Path
+
+
+class CycleError(ValueError):
+    """The graph isn't acyclic
+
+    :param cycle: list of vertex values, each one has an edge to the next
+    one and the last one to the first one
+    """
+
+    def __init__(self, cycle):
+        super().__init__('Graph has a cycle: {}'.format(
+            ' -> '.join(repr(value) for value in cycle + cycle[:1])))
+        self.cycle = cycle
+
+
+def _as_csr(graph):
+    if not graph.is_directed:
+        raise ValueError('Wrong graph: {!r}. Must be directed'.format(graph))
+    return CSRGraph.from_graph(graph) if isinstance(graph, Graph) else graph
+
+
+def _order(csr):
+    """Kahn's algorithm
+
+    :return: array('i') of vertex ids in topological order
+    """
+    n = csr.size
+    offsets, targets = csr.offsets, csr.targets
+    indegree = array.array('i', [0]) * n
+    for w in targets:
+        indegree[w] += 1
+
+    order = array.array('i', (v for v in range(n) if not indegree[v]))
+    i = 0
+    while i < len(order):
+        v = order[i]
+        i += 1
+        for k in range(offsets[v], offsets[v + 1]):
+            w = targets[k]
+            indegree[w] -= 1
+            if not indegree[w]:
+                order.append(w)
+
+    if len(order) < n:
+        raise CycleError([csr.values[v] for v in _cycle(csr, indegree)])
+    return order
+
+
+def _cycle(csr, indegree):
+    """A cycle among the vertices left by Kahn's algorithm: each of them
+    has a predecessor left too, so a walk over predecessors ends up in a
+    cycle"""
+    reverse = csr.reverse()
+    v = next(v for v in range(csr.size) if indegree[v])
+    walk, positions = [], {}
+    while v not in positions:
+        positions[v] = len(walk)
+        walk.append(v)
+        v = next(u for u, _ in reverse.neighbors(v) if indegree[u])
+    return walk[positions[v]:][::-1]
+
+
+def topological_sort(graph):
+    """Topological order: every edge goes from an earlier vertex to a later
+    one
+
+    :param graph: directed Graph or CSRGraph
+    :return: list of vertex values
+    :raise CycleError: if the graph has a cycle
+    """
+    csr = _as_csr(graph)
+    return [csr.values[v] for v in _order(csr)]
+
+
+def topological_levels(graph):
+    """Schedule of parallel batches: every vertex is in the batch right after
+    the last batch of its predecessors, so vertices of a batch don't depend on
+    each other and all their dependencies are in the earlier batches
+
+    :param graph: directed Graph or CSRGraph
+    :return: list of lists of vertex values
+    :raise CycleError: if the graph has a cycle
+    """
+    csr = _as_csr(graph)
+    offsets, targets = csr.offsets, csr.targets
+    level = array.array('i', [0]) * csr.size
+    levels = []
+    for v in _order(csr):
+        if level[v] == len(levels):
+            levels.append([])
+        levels[level[v]].append(csr.values[v])
+        for k in range(offsets[v], offsets[v + 1]):
+            w = targets[k]
+            if level[w] <= level[v]:
+                level[w] = level[v] + 1
+    return levels
+
+
+def _paths(csr, order, sources, better):
+    """Relax the edges in topological order
+
+    :return: tuple: (dict: id -> distance, dict: id -> predecessor) of the
+    reachable vertices
+    """
+    offsets, targets, weights = csr.offsets, csr.targets, csr.weights
+    distances = {v: 0 for v in sources}
+    parents = {v: None for v in sources}
+    for v in order:
+        d = distances.get(v)
+        if d is None:
+            continue
+        for k in range(offsets[v], offsets[v + 1]):
+            w = targets[k]
+            nd = d + weights[k]
+            if w not in distances or better(nd, distances[w]):
+                distances[w] = nd
+                parents[w] = v
+    return distances, parents
+
+
+def _result(graph, csr, distances, parents):
+    values = csr.values
+    result = {values[v]: d for v, d in distances.items()}
+    if not isinstance(graph, Graph):
+        return result, CSRPath(csr, parents)
+    vertices = list(graph.vertices.values())
+    return result, Path(path_dict={
+        vertices[v]: None if p is None else vertices[p]
+        for v, p in parents.items()})
+
+
+def dag_shortest_paths(graph, src_value):
+    """Single source shortest paths in O(V + E)
+
+    :param graph: directed acyclic Graph or CSRGraph
+    :param src_value: src vertex value
+    :return: tuple: (dict: vertex value -> distance, Path) of the vertices
+    reachable from src, like dijkstra_search
+    :raise CycleError: if the graph has a cycle
+    """
+    csr = _as_csr(graph)
+    order = _order(csr)
+    distances, parents = _paths(csr, order, [csr.index[src_value]],
+                                operator.lt)
+    return _result(graph, csr, distances, parents)
+
+
+def dag_longest_paths(graph, src_value):
+    """Single source longest paths in O(V + E)
+
+    :param graph: directed acyclic Graph or CSRGraph
+    :param src_value: src vertex value
+    :return: tuple: (dict: vertex value -> distance, Path) of the vertices
+    reachable from src
+    :raise CycleError: if the graph has a cycle
+    """
+    csr = _as_csr(graph)
+    order = _order(csr)
+    distances, parents = _paths(csr, order, [csr.index[src_value]],
+                                operator.gt)
+    return _result(graph, csr, distances, parents)
+
+
+def critical_path(graph):
+    """The longest path of the graph, e.g. the chain of tasks which defines
+    the duration of a project when edge distances are task durations
+
+    :param graph: directed acyclic Graph or CSRGraph
+    :return: tuple: (length, list of vertex values), (0, []) for an empty
+    graph
+    :raise CycleError: if the graph has a cycle
+    """
+    csr = _as_csr(graph)
+    if not csr.size:
+        return 0, []
+    order = _order(csr)
+    # Every vertex is a source: a path may start anywhere
+    distances, parents = _paths(csr, order, order, operator.gt)
+    v = max(order, key=distances.get)
+    length, path = distances[v], [v]
+    while parents[v] is not None:
+        v = parents[v]
+        path.append(v)
+    return length, [csr.values[v] for v in reversed(path)]
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""Many-to-many shortest path distances computed by a process pool
+
+The graph is converted to CSR arrays once and copied into a single shared
+memory block. Workers attach to the block and read the arrays through
+memoryviews, so the graph isn't pickled per task and isn't copied per
+worker. Every task is a chunk of sources, for each of them the worker runs
+an array-based Dijkstra search and sends back only the row of distances to
+the targets. Rows are streamed to the caller as soon as they're ready.
+
+The shared memory block needs Python 3.8+ (multiprocessing.shared_memory),
+on older versions everything is computed in the calling process.
+
+Example:
+    matrix = distance_matrix(graph, depots, customers, workers=8)
+
+    for i, row in iter_distance_rows(graph, depots, customers):
+        save_row(depots[i], row)
+"""
+import array
+import multiprocessing
+import os
+
+from structures import csr_graph
+from structures.csr_graph import CSRGraph
+from structures.graph import Graph
+from structures.hash_table import numpy
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # pragma: no cover
+    shared_memory = None  # Python < 3.8, no process pool
+
+
+class _Snapshot(object):
+    """CSR arrays of a graph in a shared memory block
+
+    Block layout: offsets (N + 1 int32), targets (E int32), weights
+    (E floats of the graph weights type)
+    """
+
+    def __init__(self, shm, size, edges, weight_type):
+        self.shm = shm
+        self.size = size
+        view = shm.buf
+        targets_start = (size + 1) * 4
+        weights_start = targets_start + edges * 4
+        weights_end = weights_start + edges * array.array(
+            weight_type).itemsize
+        self.offsets = view[:targets_start].cast('i')
+        self.targets = view[targets_start:weights_start].cast('i')
+        self.weights = view[weights_start:weights_end].cast(weight_type)
+
+    @classmethod
+    def create(cls, csr):
+        arrays = (csr.offsets, csr.targets, csr.weights)
+        nbytes = sum(a.itemsize * len(a) for a in arrays)
+        shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+        position = 0
+        for a in arrays:
+            data = a.tobytes()
+            shm.buf[position:position + len(data)] = data
+            position += len(data)
+        return cls(shm, csr.size, csr.edges_count, csr.weights.typecode)
+
+    def args(self):
+        """Arguments to attach to the snapshot from another process"""
+        return (self.shm.name, self.size, len(self.targets),
+                self.weights.format)
+
+    @classmethod
+    def attach(cls, name, size, edges, weight_type):
+        return cls(shared_memory.SharedMemory(name=name), size, edges,
+                   weight_type)
+
+    def close(self):
+        # Views must be released before the block is closed
+        for view in (self.offsets, self.targets, self.weights):
+            view.release()
+        self.shm.close()
+
+
+_worker_state = {}
+
+
+def _init_worker(snapshot_args, target_ids):
+    _worker_state['snapshot'] = _Snapshot.attach(*snapshot_args)
+    _worker_state['targets'] = target_ids
+
+
+def _rows(chunk, snapshot=None, target_ids=None):
+    """Distance rows of a chunk of (row index, source id)
+
+    :return: list of (row index, array('d') row)
+    """
+    if snapshot is None:
+        snapshot = _worker_state['snapshot']
+        target_ids = _worker_state['targets']
+    rows = []
+    for i, src in chunk:
+        dist, _ = csr_graph.dijkstra(snapshot, src)
+        rows.append((i, array.array('d', [dist[t] for t in target_ids])))
+    return rows
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def iter_distance_rows(graph, sources, targets, workers=None,
+                       chunk_size=None, context=None):
+    """Stream rows of the distance matrix in the order they're computed
+
+    :param graph: Graph or CSRGraph
+    :param sources: list of source vertex values
+    :param targets: list of target vertex values
+    :param workers: int: number of worker processes, os.cpu_count() if None.
+    No processes are started if it's 1 or before Python 3.8
+    :param chunk_size: int: sources per task, a few tasks per worker if None
+    :param context: multiprocessing context, the default one if None
+    :return: generator of (source index, array('d') of distances to the
+    targets, inf for the unreachable ones)
+    """
+    csr = CSRGraph.from_graph(graph) if isinstance(graph, Graph) else graph
+    sources, target_ids = list(sources), [csr.id_of(t) for t in targets]
+    tasks = [(i, csr.id_of(value)) for i, value in enumerate(sources)]
+    workers = workers or os.cpu_count() or 1
+    if shared_memory is None:
+        workers = 1
+    if chunk_size is None:
+        chunk_size = max(len(tasks) // (workers * 4), 1)
+
+    if workers == 1:
+        for chunk in _chunks(tasks, chunk_size):
+            for row in _rows(chunk, csr, target_ids):
+                yield row
+        return
+
+    snapshot = _Snapshot.create(csr)
+    try:
+        context = context or multiprocessing.get_context()
+        with context.Pool(workers, initializer=_init_worker,
+                          initargs=(snapshot.args(), target_ids)) as pool:
+            for rows in pool.imap_unordered(
+                    _rows, _chunks(tasks, chunk_size)):
+                for row in rows:
+                    yield row
+    finally:
+        snapshot.close()
+        snapshot.shm.unlink()
+
+
+def distance_matrix(graph, sources, targets, workers=None, chunk_size=None,
+                    context=None):
+    """Shortest path distances between every source and every target
+
+    :param graph: Graph or CSRGraph
+    :param sources: list of source vertex values
+    :param targets: list of target vertex values
+    :param workers: int: number of worker processes, os.cpu_count() if None,
+    see iter_distance_rows
+    :param chunk_size: int: sources per task
+    :param context: multiprocessing context, the default one if None
+    :return: NumPy float64 matrix of shape (len(sources), len(targets)), inf
+    for unreachable targets
+    """
+    if numpy is None:
+        raise ImportError('NumPy is required to build a distance matrix, '
+                          'use iter_distance_rows instead')
+    sources, targets = list(sources), list(targets)
+    matrix = numpy.empty((len(sources), len(targets)), dtype=numpy.float64)
+    for i, row in iter_distance_rows(graph, sources, targets, workers=workers,
+                                     chunk_size=chunk_size, context=context):
+        matrix[i] = numpy.frombuffer(row, dtype=numpy.float64)
+    return matrix
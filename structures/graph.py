@@ -1,30 +1,41 @@
 # -*- coding: utf-8 -*-
 import collections
 import heapq
+import itertools
+import math
+import operator
 
 
-def find_path(graph, start, end, path=None):
-    """
+INF = float('inf')
+
+
+def find_path(graph, start, end):
+    """Find a path with an iterative depth-first search, neighbors are tried
+    in their order
 
     :param graph: dict
     :param start: str: key
     :param end:   str: key
-    :param path:  list
-    :return:
+    :return: list of keys from start to end or None if there is no path
     """
-    if path is None:
-        path = [start]
-    path.append(start)
-
-    if start == end:
-        return path
-
-    if start not in graph:
-        return None
-
-    for vertex in graph[start]:
-        if vertex not in path:
-            return find_path(graph, vertex, end, path)
+    parents = {}
+    stack = [(start, None)]
+    while stack:
+        vertex, parent = stack.pop()
+        if vertex in parents:
+            continue
+        parents[vertex] = parent
+
+        if vertex == end:
+            path = [vertex]
+            while parents[path[-1]] is not None:
+                path.append(parents[path[-1]])
+            return path[::-1]
+
+        # Reversed, so that the first neighbor is tried first
+        for neighbor in reversed(graph.get(vertex) or ()):
+            if neighbor not in parents:
+                stack.append((neighbor, vertex))
 
     return None
 
@@ -36,6 +47,7 @@ class Vertex(object):
         self.weight = weight
         self.is_visited = False
         self._neighbors = []
+        self._graph = None  # set by Graph.add_vertex
 
     def mark_as_visited(self):
         self.is_visited = True
@@ -62,21 +74,92 @@ class Vertex(object):
             self.__class__.__name__, self.value, len(self._neighbors))
 
 
-def bfs(start_vertex):
-    """Breadth-first search implementation"""
+def bfs(start_vertex, max_depth=None):
+    """Breadth-first search implementation. Visited vertices are kept per
+    call, the graph isn't modified
+
+    :param start_vertex: Vertex or CSRVertex
+    :param max_depth: int: vertices further than max_depth hops are not
+    visited
+    :return: dict: vertex value -> hop distance of the visited vertices
+    """
+    if _is_csr_vertex(start_vertex):
+        from structures import csr_graph
+        csr = start_vertex.csr
+        hops, _ = csr_graph.bfs(csr, [start_vertex.id], max_depth=max_depth)
+        return {csr.values[i]: h for i, h in enumerate(hops) if h >= 0}
 
+    hops = {start_vertex: 0}
     queue = collections.deque()
-    start_vertex.mark_as_visited()
     queue.appendleft(start_vertex)
 
     while len(queue):
         vertex = queue.pop()
-        for v in vertex.get_neighbors():
-            if not v.is_visited:
-                # TODO: calculate distance
-                v.mark_as_visited()
+        next_hop = hops[vertex] + 1
+        if max_depth is not None and next_hop > max_depth:
+            continue
+        for v, _ in vertex.get_neighbors():
+            if v not in hops:
+                hops[v] = next_hop
                 queue.appendleft(v)
 
+    return {vertex.value: hop for vertex, hop in hops.items()}
+
+
+def multi_source_bfs(graph, sources, max_depth=None,
+                     direction_optimizing=True):
+    """Level-synchronous breadth-first search from many sources at once,
+    every vertex gets the hop distance to its nearest source
+
+    Vertices are identified by ids: positions in graph.vertices for a Graph
+    (it's converted to a CSRGraph first) or CSRGraph ids.
+
+    :param graph: Graph or CSRGraph
+    :param sources: iterable of source vertex values
+    :param max_depth: int: vertices further than max_depth hops are not
+    visited
+    :param direction_optimizing: bool: switch to bottom-up steps when the
+    frontier is large, see csr_graph.bfs
+    :return: tuple: (array('i') of hop distances, array('i') of parent ids),
+    -1 for the unreachable vertices, a source is its own parent
+    """
+    from structures import csr_graph
+    if isinstance(graph, Graph):
+        graph = csr_graph.CSRGraph.from_graph(graph)
+    return csr_graph.bfs(graph, [graph.id_of(value) for value in sources],
+                         max_depth=max_depth,
+                         direction_optimizing=direction_optimizing)
+
+
+# Bound to the vertex class at call time, unlike Vertex.get_neighbors
+_get_neighbors = operator.methodcaller('get_neighbors')
+
+
+def _reverse_adjacency(vertices):
+    """Reversed edges of the vertices reachable from the given ones, for
+    backward searches. Vertices don't store their predecessors, the map is
+    built by a single pass when it's needed, see Graph.in_neighbors
+
+    :param vertices: iterable of start vertices
+    :return: dict: vertex -> list of (predecessor, distance)
+    """
+    reverse = {}
+    stack = list(vertices)
+    seen = set(stack)
+    while stack:
+        vertex = stack.pop()
+        for neighbor, distance in vertex.get_neighbors():
+            reverse.setdefault(neighbor, []).append((vertex, distance))
+            if neighbor not in seen:
+                seen.add(neighbor)
+                stack.append(neighbor)
+    return reverse
+
+
+def _is_csr_vertex(vertex):
+    # Duck typing instead of isinstance, csr_graph module imports this one
+    return hasattr(vertex, 'csr')
+
 
 class Graph(object):
 
@@ -85,6 +168,13 @@ class Graph(object):
     def __init__(self, directed=True):
         self.vertices = {}
         self._directed = directed
+        self._version = 0
+        self._reverse = None  # (version, dict: vertex -> in-neighbors)
+
+    @property
+    def version(self):
+        """Modification counter: it changes on every new vertex or edge"""
+        return self._version
 
     @property
     def is_directed(self):
@@ -99,7 +189,9 @@ class Graph(object):
             return self.vertices[value]
 
         vertex = Vertex(value=value)
+        vertex._graph = self
         self.vertices[vertex.value] = vertex
+        self._version += 1
         return vertex
 
     def add_edge(self, v1, v2, distance=1):
@@ -116,6 +208,23 @@ class Graph(object):
         v1.link(v2, distance=distance)
         if not self.is_directed:
             v2.link(v1, distance=distance)
+        self._version += 1
+
+    def in_neighbors(self, vertex):
+        """Vertices linked to the given one, for backward searches. The
+        reversed edges of the whole graph are collected on the first call and
+        kept until the graph changes; edges linked by Vertex.link directly
+        instead of add_edge aren't noticed
+
+        :param vertex: Vertex of this graph
+        :return: list of (vertex, distance)
+        """
+        if not self.is_directed:
+            return vertex.get_neighbors()
+        if self._reverse is None or self._reverse[0] != self._version:
+            self._reverse = (self._version,
+                             _reverse_adjacency(self.vertices.values()))
+        return self._reverse[1].get(vertex, ())
 
     @property
     def size(self):
@@ -137,23 +246,55 @@ class Graph(object):
             - as string - value with default distance
         """
         g = Graph(directed=directed)
-        for value, edges in dict_struct.items():
-            new_vertex = g.add_vertex(value)
-            if edges:
-                for edge in edges:
-                    if isinstance(edge, (list, tuple, set)):
-                        new_vertex_val, distance = edge
-                    elif isinstance(edge, str):
-                        new_vertex_val = edge
-                        distance = 1
-                    else:
-                        raise ValueError(
-                            "Wrong edge format: {}. Must be str or tuple "
-                            "('A', 1)".format(edge))
-                    v2 = g.add_vertex(new_vertex_val)
-                    g.add_edge(v1=new_vertex, v2=v2, distance=distance)
+        for value in dict_struct:
+            g.add_vertex(value)
+        for src, dst, distance in Graph.iter_dict_edges(dict_struct):
+            g.add_edge(v1=g.vertices[src], v2=g.add_vertex(dst),
+                       distance=distance)
         return g
 
+    @staticmethod
+    def iter_dict_edges(dict_struct):
+        """Iterate over edges of a dictionary in the build_graph format
+
+        :param dict_struct: dict
+        :return: generator of (src value, dst value, distance) tuples
+        """
+        for value, edges in dict_struct.items():
+            if not edges:
+                continue
+            for edge in edges:
+                if isinstance(edge, (list, tuple, set)):
+                    new_vertex_val, distance = edge
+                elif isinstance(edge, str):
+                    new_vertex_val = edge
+                    distance = 1
+                else:
+                    raise ValueError(
+                        "Wrong edge format: {}. Must be str or tuple "
+                        "('A', 1)".format(edge))
+                yield value, new_vertex_val, distance
+
+    def save(self, path):
+        """Save the graph to a compact binary file, see graph_file module
+
+        :param path: str: file path
+        """
+        from structures.graph_file import save_graph
+        save_graph(self, path)
+
+    @staticmethod
+    def load(path, mmap=True):
+        """Load a graph saved with save(). Nothing is parsed up front:
+        vertices are created when they're touched
+
+        :param path: str: file path
+        :param mmap: bool: map the file, otherwise read it into memory
+        :return: MappedGraph
+        """
+        from structures.graph_file import MappedGraph
+        return MappedGraph(path, mmap=mmap)
+
     def as_dict(self):
         return {
             k: v.get_neighbors(values_list=True)
@@ -191,7 +332,7 @@ class Path(object):
         :param dst_value: dst vertex value
         :return: list of vertices
         """
-        vertex = self._path_dict[self._idx[dst_value]]
+        vertex = self._idx[dst_value]
         path = [vertex]
 
         # collect path list in backward order
@@ -199,60 +340,431 @@ class Path(object):
             vertex = self._path_dict[vertex]
             path.append(vertex)
 
-        # Reverse the path list and append destination vertex
-        path = path[::-1]
-        path.append(self._idx[dst_value])
-        return path
+        return path[::-1]
 
     def __repr__(self):
         return "%s(of=%s)" % (self.__class__.__name__, self._idx.keys())
 
 
-def dijkstra_search(vertex_1):
+def dijkstra_search(vertex_1, target=None, max_distance=None,
+                    bidirectional=False):
     """Dijkstra - Shortest Path Problem for Weighted Graphs
 
     Main idea is similar like in BFS but priority queue (heap) is used for
-    vertices neighbors list
+    vertices neighbors list. Visited vertices and distances are kept per
+    call, the graph isn't modified, so searches may run concurrently.
+
+    :param vertex_1: start point, Vertex or CSRVertex
+    :param target: end point: the search stops as soon as its distance is
+    known. Only the vertices settled by then are returned
+    :param max_distance: vertices further than max_distance are not reached
+    :param bidirectional: bool: search from both ends until the searches
+    meet, target is required. Vertices settled by the backward search are
+    returned only if they're on the path. The reversed edges are kept by
+    the graph once built, see Graph.in_neighbors and CSRGraph.reverse
+    :return: tuple: (dict: vertex value -> distance, Path)
+    """
+    if bidirectional and target is None:
+        raise ValueError('Target is required for the bidirectional search')
+
+    if _is_csr_vertex(vertex_1):
+        from structures import csr_graph
+        return csr_graph.dijkstra_search(
+            vertex_1, target=target, max_distance=max_distance,
+            bidirectional=bidirectional)
+
+    if bidirectional:
+        graph = vertex_1._graph
+        if graph is not None:
+            backward = graph.in_neighbors
+        else:
+            # A vertex without a graph: predecessors which aren't reachable
+            # from vertex_1 can't be on a path from it, so the reversed
+            # edges of its part are enough
+            reverse = _reverse_adjacency([vertex_1])
+            backward = lambda vertex: reverse.get(vertex, ())
+        weights, path = _bidirectional_dijkstra(
+            vertex_1, target, _get_neighbors, backward,
+            max_distance=max_distance)
+    else:
+        weights, path = _dijkstra(
+            vertex_1, _get_neighbors, target=target,
+            max_distance=max_distance)
+    distances = {vertex.value: weight for vertex, weight in weights.items()}
+    return distances, Path(path_dict=path)
+
+
+def _dijkstra(src, neighbors, target=None, max_distance=None):
+    """Dijkstra search over any vertices, heap entries which were pushed
+    before a shorter distance was found (stale ones) are skipped
 
-    :param vertex_1: start point
+    :param src: start vertex, any hashable
+    :param neighbors: function: vertex -> iterable of (vertex, distance)
+    :param target: vertex to stop at
+    :param max_distance: max distance of a settled vertex
+    :return: tuple: (dict: vertex -> distance, dict: vertex -> predecessor)
+    of the settled vertices
     """
+    weights = {src: 0}
+    path = {src: None}
+    settled = {}
+    counter = itertools.count()  # tie breaker, vertices aren't comparable
+    queue = [(0, next(counter), src)]
+
+    while queue:
+        weight, _, vertex = heapq.heappop(queue)
+        if vertex in settled:
+            continue
+        if max_distance is not None and weight > max_distance:
+            break
+        settled[vertex] = weight
+        if vertex == target:
+            break
+
+        for neighbor, dst in neighbors(vertex):
+            new_weight = weight + dst
+            if neighbor not in settled \
+                    and new_weight < weights.get(neighbor, INF):
+                weights[neighbor] = new_weight
+                path[neighbor] = vertex
+                heapq.heappush(queue, (new_weight, next(counter), neighbor))
+
+    return settled, {vertex: path[vertex] for vertex in settled}
+
+
+def _bidirectional_dijkstra(src, dst, forward, backward, max_distance=None):
+    """Bidirectional Dijkstra search: the side with the closer frontier
+    makes the next step, the search stops when the frontiers together are
+    not closer than the best path found via an edge between the sides
+
+    :param src: start vertex
+    :param dst: end vertex
+    :param forward: function: vertex -> iterable of (successor, distance)
+    :param backward: function: vertex -> iterable of (predecessor, distance)
+    :param max_distance: max path length
+    :return: tuple: (dict: vertex -> distance, dict: vertex -> predecessor)
+    of the vertices settled by the forward search and of the path
+    """
+    neighbors = (forward, backward)
+    weights = ({src: 0}, {dst: 0})
+    parents = ({src: None}, {dst: None})
+    settled = ({}, {})
+    counter = itertools.count()
+    queues = ([(0, next(counter), src)], [(0, next(counter), dst)])
+    limit = INF if max_distance is None else max_distance
+    best, meeting = (0, src) if src == dst else (INF, None)
+
+    while queues[0] and queues[1]:
+        top = queues[0][0][0], queues[1][0][0]
+        if top[0] + top[1] >= best or top[0] + top[1] > limit:
+            break
+        side = 0 if top[0] <= top[1] else 1
+        weight, _, vertex = heapq.heappop(queues[side])
+        if vertex in settled[side]:
+            continue
+        settled[side][vertex] = weight
+
+        side_weights, other_weights = weights[side], weights[1 - side]
+        for neighbor, distance in neighbors[side](vertex):
+            new_weight = weight + distance
+            if neighbor not in settled[side] \
+                    and new_weight < side_weights.get(neighbor, INF):
+                side_weights[neighbor] = new_weight
+                parents[side][neighbor] = vertex
+                heapq.heappush(
+                    queues[side], (new_weight, next(counter), neighbor))
+            if neighbor in other_weights and neighbor in side_weights:
+                candidate = side_weights[neighbor] + other_weights[neighbor]
+                if candidate < best:
+                    best, meeting = candidate, neighbor
+
+    result = dict(settled[0])
+    path = {vertex: parents[0][vertex] for vertex in settled[0]}
+    if meeting is None or best > limit:
+        return result, path
+
+    # Forward half of the path, its prefixes are shortest paths too
+    vertex = meeting
+    while vertex is not None:
+        result[vertex] = weights[0][vertex]
+        path[vertex] = parents[0][vertex]
+        vertex = parents[0][vertex]
+    # Backward half: predecessors are the other way round
+    vertex = meeting
+    while vertex != dst:
+        successor = parents[1][vertex]
+        path[successor] = vertex
+        result[successor] = best - weights[1][successor]
+        vertex = successor
+    return result, path
+
+
+class _Adapter(object):
+    """Uniform access to a Graph or a CSRGraph for the search functions:
+    searches run over keys, which are Vertex objects or CSR vertex ids"""
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.is_csr = not isinstance(graph, Graph)
+        if self.is_csr:
+            from structures.csr_graph import CSRVertex
+            self._csr_vertex = CSRVertex
+            self.neighbors = graph.neighbors
+        else:
+            self.neighbors = _get_neighbors
+
+    def key(self, value):
+        if self.is_csr:
+            return self.graph.index[value]
+        return self.graph.vertices[value]
+
+    def value(self, key):
+        return self.graph.values[key] if self.is_csr else key.value
+
+    def vertex(self, key):
+        return self._csr_vertex(self.graph, key) if self.is_csr else key
+
+    def backward(self, key):
+        if self.is_csr:
+            return self.graph.reverse().neighbors(key)
+        return self.graph.in_neighbors(key)
+
+    def keys(self):
+        if self.is_csr:
+            return range(self.graph.size)
+        return self.graph.vertices.values()
+
+    def path(self, parents):
+        if self.is_csr:
+            from structures.csr_graph import CSRPath
+            return CSRPath(self.graph, parents)
+        return Path(path_dict=parents)
+
+    def result(self, weights, parents):
+        """dijkstra_search-like result of a search over keys"""
+        distances = {self.value(key): weight
+                     for key, weight in weights.items()}
+        return distances, self.path(parents)
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def coordinates(vertex):
+    """Coordinates of a vertex: its weight if it's set, otherwise its value,
+    e.g. Graph().add_vertex((x, y))
+
+    :param vertex: Vertex or CSRVertex
+    :return: tuple
+    """
+    weight = getattr(vertex, 'weight', None)
+    return vertex.value if weight is None else weight
 
-    queue = []
-    vertex_1.weight = 0
 
-    # Push distance and vertex
-    heapq.heappush(queue, (0, vertex_1))
+def euclidean_distance(vertex_1, vertex_2):
+    """Euclidean distance between vertices coordinates (x, y, ...). It's an
+    admissible A* heuristic if no edge is shorter than it"""
+    return math.sqrt(sum((a - b) ** 2 for a, b in zip(
+        coordinates(vertex_1), coordinates(vertex_2))))
 
-    path = {vertex_1: None}
-    distances = {vertex_1.value: 0}
-    weights = {vertex_1: 0}
 
-    while len(queue):
-        current_weight, current_v = heapq.heappop(queue)
+def haversine_distance(vertex_1, vertex_2):
+    """Great-circle distance in kilometers between vertices coordinates
+    (latitude, longitude) in degrees. It's an admissible A* heuristic if
+    edge distances are in kilometers along the surface"""
+    lat_1, lon_1 = map(math.radians, coordinates(vertex_1))
+    lat_2, lon_2 = map(math.radians, coordinates(vertex_2))
+    a = math.sin((lat_2 - lat_1) / 2) ** 2 + math.cos(lat_1) \
+        * math.cos(lat_2) * math.sin((lon_2 - lon_1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
 
-        with current_v as current_v:
-            for neighbor, dst in current_v.get_neighbors():
-                if neighbor.is_visited:
-                    continue
 
-                if neighbor not in weights:
-                    weights[neighbor] = weights[current_v] + dst
+class LandmarkHeuristic(object):
+    """ALT (A*, landmarks, triangle inequality) heuristic
 
-                # Save predecessor if not presented
-                if neighbor not in path:
-                    path[neighbor] = current_v
+    Distances from and to a few landmark vertices L are precomputed with
+    Dijkstra, then by the triangle inequality
 
-                # Find a path shorter than previous
-                if weights[current_v] + dst < weights[neighbor]:
-                    weights[neighbor] = weights[current_v] + dst
-                    # Update predecessor
-                    path[neighbor] = current_v
+        d(v, t) >= d(L, t) - d(L, v)  and  d(v, t) >= d(v, L) - d(t, L)
 
-                # Update distance
-                distances[neighbor.value] = weights[neighbor]
-                heapq.heappush(queue, (weights[neighbor], neighbor))
+    the best of these bounds is the heuristic. Landmarks at the periphery of
+    the graph give the tightest bounds, they're picked greedily as the
+    farthest vertices from the already picked ones.
 
-    return distances, Path(path_dict=path)
+    :param graph: Graph or CSRGraph
+    :param landmarks: list of landmark vertex values, picked if None
+    :param count: int: number of landmarks to pick
+    """
+
+    def __init__(self, graph, landmarks=None, count=4):
+        self._adapter = adapter = _Adapter(graph)
+        if landmarks is None:
+            landmarks = self._pick_landmarks(count)
+        self.landmarks = list(landmarks)
+        self._from = []  # dicts: vertex value -> d(L, v)
+        self._to = []  # dicts: vertex value -> d(v, L)
+        for value in self.landmarks:
+            key = adapter.key(value)
+            self._from.append(self._distances(key, adapter.neighbors))
+            if graph.is_directed:
+                self._to.append(self._distances(key, adapter.backward))
+            else:
+                self._to.append(self._from[-1])
+
+    def _distances(self, key, neighbors):
+        weights, _ = _dijkstra(key, neighbors)
+        return {self._adapter.value(k): w for k, w in weights.items()}
+
+    def _pick_landmarks(self, count):
+        adapter = self._adapter
+        keys = iter(adapter.keys())
+        start = next(keys, None)
+        if start is None:
+            return []
+        landmarks, total = [], {}
+        for _ in range(count):
+            weights, _ = _dijkstra(start, adapter.neighbors)
+            for key, weight in weights.items():
+                total[key] = total.get(key, 0) + weight
+            start = max((k for k in total if k not in landmarks),
+                        key=total.get, default=None)
+            if start is None:
+                break
+            landmarks.append(start)
+        return [adapter.value(key) for key in landmarks]
+
+    def __call__(self, vertex, target):
+        v, t = vertex.value, target.value
+        bound = 0
+        for d_from, d_to in zip(self._from, self._to):
+            if v in d_from and t in d_from:
+                bound = max(bound, d_from[t] - d_from[v])
+            if v in d_to and t in d_to:
+                bound = max(bound, d_to[v] - d_to[t])
+        return bound
+
+    def __repr__(self):
+        return "%s(landmarks=%s)" % (self.__class__.__name__, self.landmarks)
+
+
+def astar_search(graph, src, dst, heuristic=euclidean_distance):
+    """A* - goal directed shortest path search
+
+    Dijkstra search ordered by distance + heuristic(vertex, dst): vertices
+    in the direction of the target are settled first. The heuristic must
+    not overestimate the remaining distance and must be consistent, e.g.
+    euclidean_distance, haversine_distance or LandmarkHeuristic
+
+    :param graph: Graph or CSRGraph
+    :param src: src vertex value
+    :param dst: dst vertex value
+    :param heuristic: function: (vertex, target vertex) -> lower bound of
+    the distance between them
+    :return: tuple: (dict: vertex value -> distance of settled vertices,
+    Path)
+    """
+    adapter = _Adapter(graph)
+    source, target = adapter.key(src), adapter.key(dst)
+    target_vertex = adapter.vertex(target)
+    estimates = {}
+
+    def estimate(key):
+        if key not in estimates:
+            estimates[key] = heuristic(adapter.vertex(key), target_vertex)
+        return estimates[key]
+
+    weights = {source: 0}
+    path = {source: None}
+    settled = {}
+    counter = itertools.count()
+    queue = [(estimate(source), next(counter), 0, source)]
+
+    while queue:
+        _, _, weight, key = heapq.heappop(queue)
+        if key in settled:
+            continue
+        settled[key] = weight
+        if key == target:
+            break
+
+        for neighbor, distance in adapter.neighbors(key):
+            new_weight = weight + distance
+            if neighbor not in settled \
+                    and new_weight < weights.get(neighbor, INF):
+                weights[neighbor] = new_weight
+                path[neighbor] = key
+                heapq.heappush(queue, (new_weight + estimate(neighbor),
+                                       next(counter), new_weight, neighbor))
+
+    return adapter.result(settled, {key: path[key] for key in settled})
+
+
+def k_shortest_paths(graph, src, dst, k):
+    """Yen's algorithm: k shortest loopless paths, e.g. route alternatives
+
+    The next path deviates from one of the found ones at some spur vertex:
+    its root (the prefix up to the spur vertex) is kept, and the rest is
+    the shortest path from the spur vertex which avoids the root vertices
+    and the edges the found paths with the same root take next. The best
+    of these candidates is the next shortest path.
+
+    :param graph: Graph or CSRGraph
+    :param src: src vertex value
+    :param dst: dst vertex value
+    :param k: int: max number of paths
+    :return: list of (distance, list of vertices), shortest first
+    """
+    adapter = _Adapter(graph)
+    source, target = adapter.key(src), adapter.key(dst)
+
+    def edge_distance(u, v):
+        return min(d for w, d in adapter.neighbors(u) if w == v)
+
+    def shortest(spur, removed_vertices, removed_edges):
+        def neighbors(u):
+            return [(v, d) for v, d in adapter.neighbors(u)
+                    if v not in removed_vertices
+                    and (u, v) not in removed_edges]
+        settled, parents = _dijkstra(spur, neighbors, target=target)
+        if target not in settled:
+            return None, None
+        path = [target]
+        while path[-1] != spur:
+            path.append(parents[path[-1]])
+        return settled[target], path[::-1]
+
+    distance, path = shortest(source, set(), set())
+    if path is None or k < 1:
+        return []
+    found = [(distance, path)]
+    candidates = []
+    seen = {tuple(path)}
+    counter = itertools.count()
+
+    while len(found) < k:
+        _, previous = found[-1]
+        root_distance = 0
+        for i, spur in enumerate(previous[:-1]):
+            root = previous[:i + 1]
+            removed_edges = {(p[i], p[i + 1]) for _, p in found
+                             if p[:i + 1] == root}
+            spur_distance, spur_path = shortest(
+                spur, set(root[:-1]), removed_edges)
+            if spur_path is not None:
+                path = root[:-1] + spur_path
+                if tuple(path) not in seen:
+                    seen.add(tuple(path))
+                    heapq.heappush(candidates, (
+                        root_distance + spur_distance, next(counter), path))
+            root_distance += edge_distance(spur, previous[i + 1])
+
+        if not candidates:
+            break
+        distance, _, path = heapq.heappop(candidates)
+        found.append((distance, path))
+
+    return [(distance, [adapter.vertex(key) for key in path])
+            for distance, path in found]
 
 
 if __name__ == '__main__':
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""Compact binary graph file, loaded without parsing
+
+File layout (native byte order, every section is 8 bytes aligned):
+
+    +--------------------------------------------------------------+
+    | header: magic, directed, N, E, M, weights type code          |
+    +--------------------------------------------------------------+
+    | offsets: N + 1 int32, CSR edge offsets                       |
+    | targets: E int32 neighbor ids                                |
+    | weights: E floats                                            |
+    +--------------------------------------------------------------+
+    | value offsets: N + 1 uint64 offsets into the values blob     |
+    | value slots: M int32 vertex ids, linear probing by the       |
+    |              stable hash of the value, -1 = empty slot       |
+    | values blob: encoded vertex values                           |
+    +--------------------------------------------------------------+
+
+Loading maps the file and casts the sections to memoryviews, nothing is
+decoded up front. The value slots make a hash index stored in the file, so
+looking a vertex up by value doesn't need a dict built at load time. Vertex
+objects are created on first access and their neighbors are read from the
+arrays on first get_neighbors() call, so a query touches only the vertices
+it visits.
+
+Vertex values must be int, float, str, bytes or tuples of them: the index
+is built on stable_hash64, which gives equal values equal codes in any
+process, and a lookup compares the decoded values, so 1.0 finds the vertex
+1. Values of exact str, bytes and int types are encoded like the persistent
+hash table keys, the others are pickled and come back with their types.
+
+Example:
+    graph.save('roads.graph')
+    with Graph.load('roads.graph') as g:
+        distances, path = dijkstra_search(g.vertices['A'])
+"""
+import array
+import collections.abc
+import mmap as mmap_module
+import pickle
+import struct
+
+from structures.graph import Graph, Vertex
+from structures.hash_table import decode_key, encode_key, stable_hash64
+
+
+MAGIC = b'DSGRAPH2'
+HEADER = struct.Struct('=8sQQQQ8s')
+
+
+def encode_value(value):
+    if type(value) in (str, bytes, int):
+        return encode_key(value)
+    return b'p' + pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def decode_value(data):
+    if data[:1] == b'p':
+        return pickle.loads(data[1:])
+    return decode_key(data)
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def _layout(n, e, m, weight_type):
+    """Section (start, end) positions"""
+    sizes = ((n + 1) * 4, e * 4, e * array.array(weight_type).itemsize,
+             (n + 1) * 8, m * 4)
+    position = _align(HEADER.size)
+    sections = []
+    for size in sizes:
+        sections.append((position, position + size))
+        position = _align(position + size)
+    return sections, position
+
+
+def save_graph(graph, path):
+    """Save Graph or CSRGraph to a file
+
+    :param graph: Graph or CSRGraph
+    :param path: str: file path
+    :raise TypeError: if a vertex value isn't int, float, str, bytes or a
+    tuple of them
+    """
+    from structures.csr_graph import CSRGraph
+    csr = CSRGraph.from_graph(graph) if isinstance(graph, Graph) else graph
+    n, e = csr.size, csr.edges_count
+    m = 1
+    while m < 2 * n:
+        m *= 2
+
+    value_offsets = array.array('Q', [0])
+    slots = array.array('i', [-1]) * m
+    blob = bytearray()
+    for i, value in enumerate(csr.values):
+        data = encode_value(value)
+        blob += data
+        value_offsets.append(len(blob))
+        j = stable_hash64(value) & (m - 1)
+        while slots[j] >= 0:
+            j = (j + 1) & (m - 1)
+        slots[j] = i
+
+    weight_type = csr.weights.typecode
+    sections, blob_start = _layout(n, e, m, weight_type)
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, csr.is_directed, n, e, m,
+                            weight_type.encode('ascii')))
+        arrays = (csr.offsets, csr.targets, csr.weights, value_offsets, slots)
+        for (start, _), a in zip(sections, arrays):
+            f.write(b'\0' * (start - f.tell()))
+            a.tofile(f)
+        f.write(b'\0' * (blob_start - f.tell()))
+        f.write(blob)
+
+
+class MappedVertex(Vertex):
+    """Vertex of a MappedGraph, neighbors are read from the file on first
+    access"""
+
+    def __init__(self, graph, vertex_id, value):
+        super().__init__(value)
+        self._graph = graph
+        self._id = vertex_id
+        self._loaded = False
+
+    def _load(self):
+        if not self._loaded:
+            self._loaded = True
+            self._neighbors[:0] = self._graph._read_neighbors(self._id)
+
+    def link(self, vertex, distance=1):
+        self._load()
+        super().link(vertex, distance)
+
+    def get_neighbors(self, values_list=False):
+        self._load()
+        return super().get_neighbors(values_list)
+
+
+class _MappedVertices(collections.abc.MutableMapping):
+    """Vertex value -> vertex mapping, vertices of the file are created on
+    first access, new vertices are kept in memory"""
+
+    def __init__(self, graph):
+        self._graph = graph
+        self._new = {}
+
+    def __getitem__(self, value):
+        vertex_id = self._graph._id_of(value)
+        if vertex_id is None:
+            return self._new[value]
+        return self._graph._vertex(vertex_id)
+
+    def __setitem__(self, value, vertex):
+        if value in self:
+            raise KeyError('Vertex {!r} already exists'.format(value))
+        self._new[value] = vertex
+
+    def __delitem__(self, value):
+        raise TypeError('Vertices of a mapped graph can not be deleted')
+
+    def __contains__(self, value):
+        return self._graph._id_of(value) is not None or value in self._new
+
+    def __iter__(self):
+        for i in range(self._graph._n):
+            yield self._graph._value(i)
+        for value in self._new:
+            yield value
+
+    def __len__(self):
+        return self._graph._n + len(self._new)
+
+
+class MappedGraph(Graph):
+    """Graph loaded from a file saved by Graph.save
+
+    It's a regular Graph: new vertices and edges are added in memory, the
+    file is never modified.
+
+    :param path: str: file path
+    :param mmap: bool: map the file, otherwise read it into memory
+    """
+
+    def __init__(self, path, mmap=True):
+        super().__init__()
+        self.path = path
+        self._mmap = mmap
+        with open(path, 'rb') as f:
+            if mmap:
+                self._buffer = mmap_module.mmap(
+                    f.fileno(), 0, access=mmap_module.ACCESS_READ)
+            else:
+                self._buffer = f.read()
+
+        magic, directed, n, e, m, weight_type = \
+            HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC:
+            raise ValueError('Wrong graph file: {}, bad magic {!r}'.format(
+                path, magic))
+        self._directed = bool(directed)
+        self._n, self._m = n, m
+        weight_type = weight_type.rstrip(b'\0').decode('ascii')
+
+        self._view = view = memoryview(self._buffer)
+        sections, blob_start = _layout(n, e, m, weight_type)
+        types = ('i', 'i', weight_type, 'Q', 'i')
+        (self._offsets, self._targets, self._weights, self._value_offsets,
+         self._slots) = [view[start:end].cast(t)
+                         for (start, end), t in zip(sections, types)]
+        self._blob = view[blob_start:]
+        self._cache = {}  # vertex id -> MappedVertex
+        self.vertices = _MappedVertices(self)
+
+    def _encoded(self, vertex_id):
+        start, end = self._value_offsets[vertex_id:vertex_id + 2]
+        return self._blob[start:end]
+
+    def _value(self, vertex_id):
+        vertex = self._cache.get(vertex_id)
+        if vertex is not None:
+            return vertex.value
+        return decode_value(bytes(self._encoded(vertex_id)))
+
+    def _id_of(self, value):
+        """Vertex id by value from the file hash index, None if not found"""
+        try:
+            hash_code = stable_hash64(value)
+        except TypeError:
+            return None
+        mask = self._m - 1
+        j = hash_code & mask
+        while self._slots[j] >= 0:
+            vertex_id = self._slots[j]
+            if self._value(vertex_id) == value:
+                return vertex_id
+            j = (j + 1) & mask
+        return None
+
+    def _vertex(self, vertex_id):
+        vertex = self._cache.get(vertex_id)
+        if vertex is None:
+            vertex = self._cache[vertex_id] = MappedVertex(
+                self, vertex_id, self._value(vertex_id))
+        return vertex
+
+    def _read_neighbors(self, vertex_id):
+        start, end = self._offsets[vertex_id:vertex_id + 2]
+        return [(self._vertex(j), w) for j, w in zip(
+            self._targets[start:end], self._weights[start:end])]
+
+    def close(self):
+        """Release the file. Vertices created so far keep their values and
+        loaded neighbors, nothing else can be read from the file"""
+        if self._view is None:
+            return
+        for view in (self._offsets, self._targets, self._weights,
+                     self._value_offsets, self._slots, self._blob,
+                     self._view):
+            view.release()
+        self._view = None
+        if self._mmap:
+            self._buffer.close()
+        self._buffer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __iter__(self):
+        return iter(self.vertices.values())
+
+    def __repr__(self):
+        return "%s('%s', directed=%s, size=%d)" % (
+            self.__class__.__name__, self.path, self.is_directed, self.size)
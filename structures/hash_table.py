@@ -46,15 +46,135 @@ Dynamic resizing:
     * requires monotonic keys
 
 """
+import array
+import contextlib
+import gc
+import hashlib
+import sys
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
 
 
 NULL = object()
 
+MASK64 = 0xffffffffffffffff
+
+
+def mix64(x):
+    """MurmurHash3 64-bit finalizer, a bijection mixing all the bits"""
+    x = ((x ^ (x >> 33)) * 0xff51afd7ed558ccd) & MASK64
+    x = ((x ^ (x >> 33)) * 0xc4ceb9fe1a85ec53) & MASK64
+    return x ^ (x >> 33)
+
+
+def mix64_array(x):
+    """Vectorized mix64 over a NumPy uint64 array (overflow wraps around)"""
+    x = (x ^ (x >> numpy.uint64(33))) * numpy.uint64(0xff51afd7ed558ccd)
+    x = (x ^ (x >> numpy.uint64(33))) * numpy.uint64(0xc4ceb9fe1a85ec53)
+    return x ^ (x >> numpy.uint64(33))
+
+
+def encode_key(key):
+    """Canonical encoding of a key: equal keys are encoded to equal bytes
+
+    :param key: str, bytes or int
+    :return: bytes
+    """
+    if isinstance(key, str):
+        return b's' + key.encode('utf-8')
+    elif isinstance(key, bytes):
+        return b'b' + key
+    elif isinstance(key, int):
+        return b'i' + str(int(key)).encode('ascii')
+    raise TypeError(
+        'Wrong key type: {}. Must be str, bytes or int'.format(type(key)))
+
+
+def decode_key(data):
+    tag, payload = data[:1], data[1:]
+    if tag == b's':
+        return payload.decode('utf-8')
+    elif tag == b'b':
+        return payload
+    return int(payload)
+
+
+def stable_hash64(key):
+    """64-bit hash code of a key, independent of the process hash seed
+
+    Ints are mixed with mix64 like mix64_array does for NumPy arrays, str
+    and bytes are hashed by a digest of encode_key, tuples combine the codes
+    of their items. Equal keys get equal codes, e.g. 1, 1.0 and True.
+
+    :param key: int, float, str, bytes or a tuple of them
+    :return: int: 0 <= code < 2 ** 64
+    """
+    if isinstance(key, float) and key.is_integer():
+        key = int(key)  # equal keys must get equal codes
+    if isinstance(key, int):
+        return mix64(key & MASK64)
+    elif isinstance(key, float):
+        return mix64(hash(key) & MASK64)  # not salted
+    elif isinstance(key, (str, bytes)):
+        return int.from_bytes(
+            hashlib.sha1(encode_key(key)).digest()[:8], 'little')
+    elif isinstance(key, tuple):
+        code = len(key)
+        for item in key:
+            code = mix64((code * 0x9e3779b97f4a7c15 + stable_hash64(item))
+                         & MASK64)
+        return code
+    raise TypeError('Wrong key type: {}. Must be int, float, str, bytes or '
+                    'tuple'.format(type(key)))
+
+
+def _as_list(items):
+    if numpy is not None and isinstance(items, numpy.ndarray):
+        return items.tolist()
+    if isinstance(items, list):
+        return items
+    return list(items)
+
+
+@contextlib.contextmanager
+def _gc_paused():
+    """Pause the cyclic garbage collector while a batch allocates many
+    nodes: they don't form cycles, but every collection triggered by the
+    allocations would walk all the nodes of the table again"""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _is_int_array(items):
+    """Check if items is a NumPy integer array of keys hashing to themselves,
+    i.e. hash(k) == k for 0 <= k < sys.hash_info.modulus
+
+    :param items: anything
+    :return: bool
+    """
+    if numpy is None or not isinstance(items, numpy.ndarray):
+        return False
+    if items.ndim != 1 or items.dtype.kind not in 'iu':
+        return False
+    return not len(items) or (
+        items.min() >= 0 and items.max() < sys.hash_info.modulus)
+
 
 class AssociativeArray(object):
     def __init__(self):
         self._size = 0
         self.m = 97
+        # Incremented on every structural modification (a key is added or
+        # removed, the table is resized) to detect it during iteration
+        self._version = 0
 
     def put(self, key, value):
         raise NotImplementedError()
@@ -78,17 +198,147 @@ class AssociativeArray(object):
     def size(self):
         return self._size
 
-    def keys(self):
+    def _entries(self):
+        """Iterate over (key, value, hash code) of the stored entries"""
         raise NotImplementedError()
 
-    def hash(self, key):
-        return (hash(key) & 0x7fffffff) % self.m
+    def _iter_entries(self):
+        """Lazy iteration over the entries, raise RuntimeError if the table is
+        structurally modified meanwhile (updating values is fine)"""
+        version = self._version
+        for entry in self._entries():
+            yield entry
+            if self._version != version:
+                raise RuntimeError(
+                    '{} changed during iteration'.format(
+                        self.__class__.__name__))
+
+    def keys(self):
+        """Lazy iteration over the keys, no list of keys is built"""
+        for key, _, _ in self._iter_entries():
+            yield key
+
+    def values(self):
+        for _, value, _ in self._iter_entries():
+            yield value
+
+    def items(self):
+        for key, value, _ in self._iter_entries():
+            yield key, value
+
+    def iter_batches(self, n):
+        """Iterate over (key, value) pairs in lists of up to n pairs, e.g. to
+        stream a dump of a big table with constant extra memory
+
+        :param n: int: batch size
+        """
+        if n < 1:
+            raise ValueError('Wrong batch size: {}. Must be >= 1'.format(n))
+        batch = []
+        for key, value, _ in self._iter_entries():
+            batch.append((key, value))
+            if len(batch) == n:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def __iter__(self):
+        return self.keys()
+
+    def freeze(self):
+        """Build an immutable snapshot of the table with a minimal perfect
+        hash function, see FrozenHashTable
+
+        :return: FrozenHashTable
+        """
+        return FrozenHashTable(self._entries())
+
+    def put_many(self, keys, values):
+        """Put a batch of key-value pairs, the last value wins for duplicate
+        keys
+
+        :param keys: iterable of keys or NumPy array
+        :param values: iterable of values of the same length
+        :return: int: number of new keys
+        """
+        keys, values = _as_list(keys), _as_list(values)
+        self._check_batch(keys, values)
+        return sum(1 for key, value in zip(keys, values)
+                   if not self.put(key, value))
+
+    def get_many(self, keys):
+        """Get values of a batch of keys
+
+        :param keys: iterable of keys or NumPy array
+        :return: list of values, None for missing keys
+        """
+        return [self.get(key) for key in _as_list(keys)]
+
+    def delete_many(self, keys):
+        """Delete a batch of keys
+
+        :param keys: iterable of keys or NumPy array
+        :return: int: number of deleted keys
+        """
+        return sum(1 for key in _as_list(keys) if self.delete(key))
+
+    @staticmethod
+    def _check_batch(keys, values):
+        if len(keys) != len(values):
+            raise ValueError(
+                'Wrong batch: {} keys and {} values. Must be of the same '
+                'length'.format(len(keys), len(values)))
+
+    @staticmethod
+    def hash_code(key):
+        """Non-negative 31-bit hash code of a key. Tables keep it next to the
+        key, so that resizing never has to call hash() again
+
+        :param key: any hashable value
+        :return: int
+        """
+        return hash(key) & 0x7fffffff
+
+    @staticmethod
+    def hash64(key):
+        """64-bit hash code of a key: hash() mixed with the MurmurHash3
+        64-bit finalizer, since hashes of ints are the ints themselves. Use it
+        when the bits of the code are split or used beyond the modulo
+
+        :param key: any hashable value
+        :return: int: 0 <= code < 2 ** 64
+        """
+        return mix64(hash(key) & MASK64)
+
+    def hash(self, key, m=None):
+        return self.hash_code(key) % (m or self.m)
+
+    def hash_many(self, keys, m=None):
+        """Hash a batch of keys. Integer NumPy arrays are hashed and mapped to
+        the slots in one vectorized pass
+
+        :param keys: iterable of keys or NumPy array
+        :param m: int: number of slots, current table size by default
+        :return: tuple of lists: (keys, hash codes, slots)
+        """
+        m = m or self.m
+        if _is_int_array(keys):
+            codes = keys.astype(numpy.int64) & 0x7fffffff
+            return keys.tolist(), codes.tolist(), (codes % m).tolist()
+
+        keys = _as_list(keys)
+        codes = [hash(key) & 0x7fffffff for key in keys]
+        return keys, codes, [code % m for code in codes]
 
 
 class Node(object):
-    def __init__(self, key, value):
+    __slots__ = ('key', 'value', 'hash')
+
+    def __init__(self, key, value, hash_code=None):
         self.key = key
         self.value = value
+        self.hash = hash_code
 
 
 class SeparateChainHashTable(AssociativeArray):
@@ -105,36 +355,297 @@ class SeparateChainHashTable(AssociativeArray):
       * M is too large -> too many empty chains
 
     Hashing chaining is a one of collisions resolution methods
+
+    Resizing:
+      The table doubles M once the load factor N / M exceeds max_load and
+      halves it when the load factor drops below min_load (but never below
+      the initial M).
+
+      With incremental=True (default) the old chains are kept and migrated
+      to the new table a few chains per put / delete, every lookup checks
+      both tables while the migration is in progress. The migration rate
+      is chosen so that it always completes before the next resize may be
+      triggered, so no single operation has to rehash the whole table.
+
+      With incremental=False all the entries are moved at once
+      (stop-the-world rehashing).
     """
 
-    def __init__(self):
+    def __init__(self, m=97, max_load=2.0, min_load=0.125, incremental=True,
+                 migrate_step=4):
         super().__init__()
-        self.m = 97  # number of chains
-        self.chains = [[] for _ in range(self.m)]  # array of chains
+        if not 0 <= min_load < max_load / 2:
+            raise ValueError(
+                'Wrong load factor bounds: min_load={}, max_load={}. '
+                'Must be 0 <= min_load < max_load / 2'.format(
+                    min_load, max_load))
+        self.m = m  # number of chains
+        # array of chains, empty chains are allocated on the first insert
+        self.chains = [None] * self.m
+        self.max_load = max_load
+        self.min_load = min_load
+        self.incremental = incremental
+        self.migrate_step = migrate_step
+        self._initial_m = m
+
+        # Incremental resizing state
+        self._old_chains = None
+        self._old_m = None
+        self._migrate_idx = 0
+        self._migrate_rate = 0
+
+    @property
+    def load_factor(self):
+        return self.size / self.m
+
+    @property
+    def is_resizing(self):
+        return self._old_chains is not None
+
+    def _find(self, key, hash_code):
+        """Find a node and the chain it belongs to
+
+        :return: tuple: (chain, node) or (None, None) if the key is missing
+        """
+        chain = self.chains[hash_code % self.m]
+        if chain is not None:
+            for node in chain:
+                if node.key == key:
+                    return chain, node
+
+        if self._old_chains is not None:
+            i = hash_code % self._old_m
+            if i >= self._migrate_idx and self._old_chains[i] is not None:
+                chain = self._old_chains[i]
+                for node in chain:
+                    if node.key == key:
+                        return chain, node
+        return None, None
 
     def get(self, key):
-        i = self.hash(key)
-        for node in self.chains[i]:
-            if node.key == key:
-                return node.value
-        return None
+        _, node = self._find(key, self.hash_code(key))
+        if node is None:
+            return None
+        return node.value
 
     def put(self, key, value):
-        i = self.hash(key)
+        hash_code = self.hash_code(key)
+        _, node = self._find(key, hash_code)
+        if node is not None:
+            node.value = value
+            return True  # True indicates that the key was found
 
-        for node in self.chains[i]:
-            if node.key == key:
-                node.value = value
-                return True  # True indicates that the key was found
+        # Only inserts and deletes move the migration on, so updating values
+        # never moves nodes between the tables
+        self._migrate()
+        self._version += 1
 
         # Put a new node in the beginning of the chain (linked-list)
-        self.chains[i].insert(0, Node(key, value))
-        if value is not NULL:
-            self._size += 1
+        i = hash_code % self.m
+        if self.chains[i] is None:
+            self.chains[i] = [Node(key, value, hash_code)]
+        else:
+            self.chains[i].insert(0, Node(key, value, hash_code))
+        self._size += 1
+        if self.size > self.max_load * self.m:
+            self._resize(2 * self.m)
 
         # explicitly return None to indicate that the key wasn't found
         return None
 
+    def put_many(self, keys, values):
+        """Put a batch of key-value pairs, the last value wins for duplicate
+        keys. The table is resized at most once for the whole batch, then the
+        batch is grouped by chain and every chain is written once: empty
+        chains take their slice of the new nodes as is, others are checked
+        for the existing keys once
+
+        :param keys: iterable of keys or NumPy array
+        :param values: iterable of values of the same length
+        :return: int: number of new keys
+        """
+        if not _is_int_array(keys):
+            keys, values = _as_list(keys), _as_list(values)
+        elif not isinstance(values, numpy.ndarray):
+            values = _as_list(values)
+        self._check_batch(keys, values)
+        self._reserve(self.size + len(keys))
+        self._version += 1
+
+        keys, values, codes, indexes, starts, ends = self._group_by_chain(
+            keys, values)
+        chains = self.chains
+        updated = 0
+        with _gc_paused():
+            nodes = list(map(Node, keys, values, codes))
+            runs = map(nodes.__getitem__, map(slice, starts, ends))
+            for i, run in zip(indexes, runs):
+                chain = chains[i]
+                if chain is None:
+                    chains[i] = run
+                    continue
+                existing = {node.key: node for node in chain}
+                added = []
+                for node in run:
+                    old = existing.get(node.key)
+                    if old is None:
+                        added.append(node)
+                    else:
+                        old.value = node.value
+                        updated += 1
+                if added:
+                    chains[i] = added + chain
+
+        new_keys = len(nodes) - updated
+        self._size += new_keys
+        return new_keys
+
+    def _group_by_chain(self, keys, values):
+        """Drop the duplicate keys of a batch but the last ones and sort the
+        rest by chain. Integer NumPy arrays are sorted by NumPy
+
+        :return: tuple of lists: (keys, values, hash codes, chain indexes,
+        starts, ends), the last three describe the runs of the same chain
+        """
+        m = self.m
+        if _is_int_array(keys):
+            codes = keys.astype(numpy.int64) & 0x7fffffff
+            slots = codes % m
+            # Stable sort by chain and key: equal keys are adjacent in the
+            # order of the batch, the last one of every run is kept
+            order = numpy.lexsort((keys, slots))
+            keys, codes, slots = keys[order], codes[order], slots[order]
+            last = numpy.append(keys[1:] != keys[:-1], True)
+            order, keys, codes, slots = \
+                order[last], keys[last], codes[last], slots[last]
+            starts = numpy.flatnonzero(
+                numpy.append(True, slots[1:] != slots[:-1]))
+            if isinstance(values, numpy.ndarray):
+                values = values[order].tolist()
+            else:
+                values = [values[j] for j in order.tolist()]
+            keys_list = keys.tolist()
+            # Non-negative keys below 2 ** 31 are their own hash codes
+            if len(keys) and keys.max() > 0x7fffffff:
+                codes_list = codes.tolist()
+            else:
+                codes_list = keys_list
+            return (keys_list, values, codes_list, slots[starts].tolist(),
+                    starts.tolist(), starts[1:].tolist() + [len(slots)])
+
+        batch = dict(zip(keys, values))
+        keys, values = list(batch), list(batch.values())
+        codes = [hash(key) & 0x7fffffff for key in keys]
+        order = sorted(range(len(keys)), key=lambda j: codes[j] % m)
+        keys = [keys[j] for j in order]
+        values = [values[j] for j in order]
+        codes = [codes[j] for j in order]
+        slots = [code % m for code in codes]
+        starts = [j for j in range(len(slots))
+                  if not j or slots[j] != slots[j - 1]]
+        return (keys, values, codes, [slots[j] for j in starts], starts,
+                starts[1:] + [len(slots)])
+
+    def get_many(self, keys):
+        keys, codes, _ = self.hash_many(keys)
+        result = []
+        for key, hash_code in zip(keys, codes):
+            _, node = self._find(key, hash_code)
+            result.append(None if node is None else node.value)
+        return result
+
+    def delete_many(self, keys):
+        keys, codes, _ = self.hash_many(keys)
+        return sum(1 for key, hash_code in zip(keys, codes)
+                   if self._delete(key, hash_code))
+
+    def _reserve(self, n):
+        """Grow the table at once to fit n keys and finish any migration"""
+        self._migrate(steps=self._old_m)
+        new_m = self.m
+        while n > self.max_load * new_m:
+            new_m *= 2
+        if new_m != self.m:
+            self._resize(new_m)
+            self._migrate(steps=self._old_m)
+
+    def delete(self, key):
+        """Remove the key from its chain
+
+        :param key:
+        :return: bool: True if the key was found
+        """
+        return self._delete(key, self.hash_code(key))
+
+    def _delete(self, key, hash_code):
+        chain, node = self._find(key, hash_code)
+        if node is None:
+            return False
+
+        chain.remove(node)
+        self._size -= 1
+        self._version += 1
+        self._migrate()
+        if self.size < self.min_load * self.m and self.m > self._initial_m:
+            self._resize(max(self.m // 2, self._initial_m))
+        return True
+
+    def _entries(self):
+        for chains in (self.chains, self._old_chains or ()):
+            for chain in chains:
+                if chain:
+                    for node in chain:
+                        yield node.key, node.value, node.hash
+
+    def _resize(self, new_m):
+        # Resizing is never nested, an unfinished migration is completed first
+        if self._old_chains is not None:
+            self._migrate(steps=self._old_m)
+
+        self._old_chains, self._old_m = self.chains, self.m
+        self._migrate_idx = 0
+        self.m = new_m
+        self.chains = [None] * new_m
+
+        if not self.incremental:
+            self._migrate(steps=self._old_m)
+            return
+
+        # Number of operations before the next resize may be triggered
+        headroom = min(self.max_load * new_m - self.size,
+                       self.size - self.min_load * new_m)
+        headroom = max(int(headroom), 1)
+        self._migrate_rate = max(self.migrate_step,
+                                 -(-self._old_m // headroom))
+
+    def _migrate(self, steps=None):
+        """Move the next chains of the old table to the new one
+
+        :param steps: int: number of old chains to move, migrate_rate by
+        default
+        """
+        if self._old_chains is None:
+            return
+
+        old_chains, chains, m = self._old_chains, self.chains, self.m
+        end = min(self._migrate_idx + (steps or self._migrate_rate),
+                  self._old_m)
+        for i in range(self._migrate_idx, end):
+            if old_chains[i] is None:
+                continue
+            for node in old_chains[i]:
+                j = node.hash % m
+                if chains[j] is None:
+                    chains[j] = [node]
+                else:
+                    chains[j].append(node)
+            old_chains[i] = None
+        self._migrate_idx = end
+
+        if end == self._old_m:
+            self._old_chains = self._old_m = None
+            self._migrate_idx = 0
+
 
 class LinearProbingHashTable(AssociativeArray):
     """Linear probing is an another technique to tackle key collisions
@@ -143,6 +654,7 @@ class LinearProbingHashTable(AssociativeArray):
       - Hash: Map key to integer i between 0 and M - 1
       - Insert: Put a table index i if free; if not try i + 1, i + 2, etc
       - Search: Search table index i; if occupied but not match , try i + 1, ..
+      - Probes wrap around the end of the array (modulo M)
 
     NOTE: Array size M must be greater than number of key-value pairs N
     --> resize an array if it becomes at least a half full
@@ -155,18 +667,206 @@ class LinearProbingHashTable(AssociativeArray):
     Optimizations:
       - using another hash function to define the next position may help to
       optimize finding a free slot
+      - hash codes are cached in a parallel array, so rehashing and probing
+      don't call hash() and compare keys only when hash codes match
+      - Robin Hood probing (robin_hood=True): on insert a key with a longer
+      probe distance takes the slot of a key with a shorter one ("rob the
+      rich"). It keeps probe lengths short and even, so that the table may
+      be filled up to 0.7 - 0.9 and a search for a missing key stops as
+      soon as it meets a key closer to its home slot
 
     """
 
-    def __init__(self):
+    def __init__(self, m=97, max_load=None, min_load=0.125,
+                 robin_hood=False):
         super().__init__()
-        self.m = 97
+        if max_load is None:
+            max_load = 0.85 if robin_hood else 0.5
+        if not 0 <= min_load < max_load / 2 or max_load >= 1:
+            raise ValueError(
+                'Wrong load factor bounds: min_load={}, max_load={}. '
+                'Must be 0 <= min_load < max_load / 2 < 0.5'.format(
+                    min_load, max_load))
+        self.m = m
+        self.max_load = max_load
+        self.min_load = min_load
+        self.robin_hood = robin_hood
+        self._initial_m = m
         self._keys = [NULL] * self.m
         self._values = [None] * self.m
+        self._hashes = [None] * self.m
+
+    @property
+    def load_factor(self):
+        return self.size / self.m
+
+    def _distance(self, i, hash_code):
+        """Probe distance of the slot i from the home slot of hash_code"""
+        return (i - hash_code) % self.m
+
+    def _lookup(self, key, hash_code):
+        """Find the slot of the key
+
+        :return: int: slot index or -1 if the key is missing
+        """
+        keys, hashes, m = self._keys, self._hashes, self.m
+        i = hash_code % m
+        dist = 0
+        while keys[i] is not NULL:
+            if hashes[i] == hash_code and (keys[i] is key or keys[i] == key):
+                return i
+            if self.robin_hood and (i - hashes[i]) % m < dist:
+                # Key would have displaced this one, so it's not here
+                return -1
+            i = (i + 1) % m
+            dist += 1
+        return -1
+
+    def get(self, key):
+        i = self._lookup(key, self.hash_code(key))
+        if i < 0:
+            return None
+        return self._values[i]
+
+    def put(self, key, value):
+        hash_code = self.hash_code(key)
+        i = self._lookup(key, hash_code)
+        if i >= 0:
+            self._values[i] = value
+            return True  # True indicates that the key was found
+
+        self._insert(key, value, hash_code)
+        self._size += 1
+        self._version += 1
+        if self.size > self.max_load * self.m:
+            self._rehash(2 * self.m)
+        return None
+
+    def put_many(self, keys, values):
+        """Put a batch of key-value pairs. The table is resized at most once
+        for the whole batch.
+
+        Bulk load of integer NumPy keys and NumPy values into an empty table
+        is vectorized: keys are sorted by their home slots and placed with a
+        running maximum, pos[i] = max(home[i], pos[i - 1] + 1), which is
+        exactly the layout of sequential linear probing (and a valid Robin
+        Hood layout as well). Only the keys which wrap around the end of the
+        array are inserted one by one.
+
+        :param keys: iterable of keys or NumPy array
+        :param values: iterable of values of the same length
+        :return: int: number of new keys
+        """
+        if not _is_int_array(keys):
+            keys = _as_list(keys)
+        if numpy is None or not isinstance(values, numpy.ndarray) \
+                or values.ndim != 1:
+            values = _as_list(values)
+        self._check_batch(keys, values)
+        self._reserve(self.size + len(keys))
+        self._version += 1
+
+        if self.size == 0 and _is_int_array(keys) \
+                and not isinstance(values, list):
+            return self._bulk_load(keys, values)
+
+        keys, codes, _ = self.hash_many(keys)
+        values = _as_list(values)
+        new_keys = 0
+        for key, value, hash_code in zip(keys, values, codes):
+            i = self._lookup(key, hash_code)
+            if i >= 0:
+                self._values[i] = value
+            else:
+                self._insert(key, value, hash_code)
+                new_keys += 1
+
+        self._size += new_keys
+        return new_keys
+
+    def _bulk_load(self, keys, values):
+        # Keep the last occurrence of duplicate keys
+        _, last = numpy.unique(keys[::-1], return_index=True)
+        if len(last) != len(keys):
+            last = len(keys) - 1 - last
+            keys, values = keys[last], values[last]
+
+        m = self.m
+        codes = keys.astype(numpy.int64) & 0x7fffffff
+        homes = codes % m
+        order = numpy.argsort(homes, kind='stable')
+        idx = numpy.arange(len(order))
+        pos = numpy.maximum.accumulate(homes[order] - idx) + idx
+        fits = pos < m
+        placed, pos = order[fits], pos[fits]
+
+        slots = numpy.empty(m, dtype=object)
+        slots.fill(NULL)
+        slots[pos] = keys[placed]
+        self._keys = slots.tolist()
+        slots.fill(None)
+        slots[pos] = values[placed]
+        self._values = slots.tolist()
+        slots.fill(None)
+        slots[pos] = codes[placed]
+        self._hashes = slots.tolist()
+
+        wrapped = order[~fits]
+        for key, value, hash_code in zip(keys[wrapped].tolist(),
+                                         values[wrapped].tolist(),
+                                         codes[wrapped].tolist()):
+            self._insert(key, value, hash_code)
+
+        self._size = len(keys)
+        return self._size
+
+    def get_many(self, keys):
+        keys, codes, _ = self.hash_many(keys)
+        result = []
+        for key, hash_code in zip(keys, codes):
+            i = self._lookup(key, hash_code)
+            result.append(None if i < 0 else self._values[i])
+        return result
+
+    def delete_many(self, keys):
+        keys, codes, _ = self.hash_many(keys)
+        return sum(1 for key, hash_code in zip(keys, codes)
+                   if self._delete(key, hash_code))
+
+    def _reserve(self, n):
+        """Grow the table at once to fit n keys"""
+        new_m = self.m
+        while n > self.max_load * new_m:
+            new_m *= 2
+        if new_m != self.m:
+            self._rehash(new_m)
+
+    def _insert(self, key, value, hash_code):
+        """Insert a key which is known to be missing"""
+        keys, values, hashes = self._keys, self._values, self._hashes
+        m = self.m
+        i = hash_code % m
+        dist = 0
+        while keys[i] is not NULL:
+            if self.robin_hood:
+                slot_dist = (i - hashes[i]) % m
+                if slot_dist < dist:
+                    # Swap with the richer entry and carry it on
+                    keys[i], key = key, keys[i]
+                    values[i], value = value, values[i]
+                    hashes[i], hash_code = hash_code, hashes[i]
+                    dist = slot_dist
+            i = (i + 1) % m
+            dist += 1
+
+        keys[i] = key
+        values[i] = value
+        hashes[i] = hash_code
 
     def delete(self, key):
-        """Find and remove key-value pair and then reinsert all of the
-        key-value pairs in the same cluster that appear after the deleted pair.
+        """Find and remove key-value pair and then move back the key-value
+        pairs in the same cluster that appear after the deleted pair
+        (backward-shift deletion), so that no tombstones are needed.
 
         Alternatively flag the deleted entry so that it is skipped over during
         the search but available for insert (default behavior in python)
@@ -174,52 +874,234 @@ class LinearProbingHashTable(AssociativeArray):
         rehash all kv pairs
 
         :param key:
+        :return: bool: True if the key was found
         """
-        i = self.hash(key)
-        while self._keys[i] != key and self._keys[i] is not NULL:
-            i += 1
+        return self._delete(key, self.hash_code(key))
 
-        if self._keys[i] is NULL:
+    def _delete(self, key, hash_code):
+        i = self._lookup(key, hash_code)
+        if i < 0:
             return False
 
-        self._keys[i] = NULL
-        self._values[i] = None
+        if self.robin_hood:
+            self._shift_back_robin_hood(i)
+        else:
+            self._shift_back(i)
         self._size -= 1
+        self._version += 1
 
-        # if self.size / self.m <= 0.125:
-        #     self._rehash(int(self.m / 2))
-
+        if self.size < self.min_load * self.m and self.m > self._initial_m:
+            self._rehash(max(self.m // 2, self._initial_m))
         return True
 
-    def _rehash(self, new_m):
-        new_keys = [NULL] * new_m
-        new_values = [None] * new_m
-        for key, value in zip(self._keys, self._values):
-            if key is NULL:
-                continue
-            i = self.hash(key)
-            new_keys[i] = key
-            new_values[i] = value
+    def _clear_slot(self, i):
+        self._keys[i] = NULL
+        self._values[i] = None
+        self._hashes[i] = None
+
+    def _move_slot(self, src, dst):
+        self._keys[dst] = self._keys[src]
+        self._values[dst] = self._values[src]
+        self._hashes[dst] = self._hashes[src]
+
+    def _shift_back(self, i):
+        """Knuth's algorithm R: fill the hole at i with the first entry of the
+        cluster whose home slot is not in the (i, j] cyclic range"""
+        keys, hashes, m = self._keys, self._hashes, self.m
+        j = i
+        while True:
+            j = (j + 1) % m
+            if keys[j] is NULL:
+                break
+            home = hashes[j] % m
+            # Entry j can be moved to the hole if its home slot is cyclically
+            # outside of (i, j]
+            if (i < j and (home <= i or home > j)) or \
+                    (i > j and home <= i and home > j):
+                self._move_slot(j, i)
+                i = j
+        self._clear_slot(i)
+
+    def _shift_back_robin_hood(self, i):
+        """Shift the following entries one slot back until an empty slot or
+        an entry sitting in its home slot"""
+        keys, hashes, m = self._keys, self._hashes, self.m
+        j = (i + 1) % m
+        while keys[j] is not NULL and (j - hashes[j]) % m != 0:
+            self._move_slot(j, i)
+            i, j = j, (j + 1) % m
+        self._clear_slot(i)
 
+    def _rehash(self, new_m):
+        entries = [
+            (key, value, hash_code)
+            for key, value, hash_code in zip(
+                self._keys, self._values, self._hashes)
+            if key is not NULL
+        ]
         self.m = new_m
-        self._keys = new_keys
-        self._values = new_values
+        self._keys = [NULL] * new_m
+        self._values = [None] * new_m
+        self._hashes = [None] * new_m
+        for key, value, hash_code in entries:
+            self._insert(key, value, hash_code)
+
+    def _entries(self):
+        for key, value, hash_code in zip(
+                self._keys, self._values, self._hashes):
+            if key is not NULL:
+                yield key, value, hash_code
+
+    def probe_lengths(self):
+        """Probe distance of every stored key from its home slot
+
+        :return: list of int
+        """
+        return [self._distance(i, hash_code)
+                for i, hash_code in enumerate(self._hashes)
+                if hash_code is not None]
 
-    def put(self, key, value):
-        i = self.hash(key)
+    def max_probe_length(self):
+        return max(self.probe_lengths() or [0])
 
-        while self._keys[i] is not NULL:
-            i += 1
 
-        self._keys[i] = key
-        self._values[i] = value
-        self._size += 1
-        if self.size / self.m >= 0.5:
-            self._rehash(2 * self.m)
+def _bucket(hash_code, n):
+    """Fibonacci hashing: multiply and take the high bits"""
+    return ((hash_code * 0x9e3779b1) & 0xffffffff) * n >> 32
+
+
+def _displace(hash_code, d, n):
+    return (((hash_code ^ d) * 0x85ebca6b) & 0xffffffff) * n >> 32
+
+
+class FrozenHashTable(AssociativeArray):
+    """Immutable hash table built with a minimal perfect hash function
+    (CHD - "hash, displace and compress" algorithm)
+
+    N keys are spread over N buckets with the first hash function. Then the
+    buckets are processed from the largest to the smallest and for every
+    bucket a displacement d is searched, so that the second hash function
+    seeded with d maps all the keys of the bucket to distinct free slots.
+    Buckets with a single key are placed directly to one of the remaining
+    free slots, the slot index is stored as a negative displacement.
+
+    Lookup: i = hash(key, d[bucket(key)]), compare the key in the i-th slot.
+    It takes exactly one probe, there are no chains or clusters to walk.
+
+    Storage: keys, values and displacements arrays of N elements, i.e. a few
+    machine words per entry instead of a Node object per entry.
+
+    Keys with equal 31-bit hash codes can't be separated by a hash of the
+    code, such keys (a rare case) are kept in a small overflow dict.
+
+    Build it with SeparateChainHashTable.freeze() or
+    LinearProbingHashTable.freeze()
+    """
+
+    def __init__(self, entries):
+        super().__init__()
+        by_code = {}
+        overflow = {}
+        overflow_codes = set()
+        for key, value, hash_code in entries:
+            if hash_code in overflow_codes:
+                overflow[key] = value
+            elif hash_code in by_code:
+                other_key, other_value = by_code.pop(hash_code)
+                overflow[other_key] = other_value
+                overflow[key] = value
+                overflow_codes.add(hash_code)
+            else:
+                by_code[hash_code] = (key, value)
+
+        self._overflow = overflow
+        self._size = len(by_code) + len(overflow)
+        self._build(by_code)
+
+    def _build(self, by_code):
+        n = self.m = max(len(by_code), 1)
+        buckets = [[] for _ in range(n)]
+        for hash_code in by_code:
+            buckets[_bucket(hash_code, n)].append(hash_code)
+
+        self._displacements = array.array('l', [0] * n)
+        self._keys = [NULL] * n
+        self._values = [None] * n
+        is_free = [True] * n
+
+        order = sorted(range(n), key=lambda b: len(buckets[b]), reverse=True)
+        pos = 0
+        # Buckets with several keys: search a displacement
+        while pos < n and len(buckets[order[pos]]) > 1:
+            bucket = buckets[order[pos]]
+            d = 1
+            while True:
+                slots = [_displace(hash_code, d, n) for hash_code in bucket]
+                if all(is_free[i] for i in slots) and \
+                        len(set(slots)) == len(slots):
+                    break
+                d += 1
+            self._displacements[order[pos]] = d
+            for hash_code, i in zip(bucket, slots):
+                is_free[i] = False
+                self._keys[i], self._values[i] = by_code[hash_code]
+            pos += 1
+
+        # Buckets with a single key: take free slots directly
+        free_slots = (i for i, free in enumerate(is_free) if free)
+        while pos < n and buckets[order[pos]]:
+            i = next(free_slots)
+            self._displacements[order[pos]] = -i - 1
+            self._keys[i], self._values[i] = by_code[buckets[order[pos]][0]]
+            pos += 1
+
+    def _slot(self, hash_code):
+        n = self.m
+        d = self._displacements[
+            ((hash_code * 0x9e3779b1) & 0xffffffff) * n >> 32]
+        if d < 0:
+            return -d - 1
+        return (((hash_code ^ d) * 0x85ebca6b) & 0xffffffff) * n >> 32
 
     def get(self, key):
-        i = self.hash(key)
+        # _slot() inlined, this is the hot path
+        hash_code = hash(key) & 0x7fffffff
+        n = self.m
+        i = self._displacements[
+            ((hash_code * 0x9e3779b1) & 0xffffffff) * n >> 32]
+        if i < 0:
+            i = -i - 1
+        else:
+            i = (((hash_code ^ i) * 0x85ebca6b) & 0xffffffff) * n >> 32
+        if self._keys[i] == key:
+            return self._values[i]
+        if self._overflow:
+            return self._overflow.get(key)
+        return None
 
-        while self._keys[i] != key and self._keys[i] is not NULL:
-            i += 1
-        return self._values[i]
+    def get_many(self, keys):
+        keys, codes, _ = self.hash_many(keys)
+        result = []
+        for key, hash_code in zip(keys, codes):
+            i = self._slot(hash_code)
+            if self._keys[i] == key:
+                result.append(self._values[i])
+            else:
+                result.append(self._overflow.get(key))
+        return result
+
+    def put(self, key, value):
+        raise TypeError('{} is immutable'.format(self.__class__.__name__))
+
+    def delete(self, key):
+        raise TypeError('{} is immutable'.format(self.__class__.__name__))
+
+    def _entries(self):
+        for key, value in zip(self._keys, self._values):
+            if key is not NULL:
+                yield key, value, self.hash_code(key)
+        for key, value in self._overflow.items():
+            yield key, value, self.hash_code(key)
+
+    def __repr__(self):
+        return '%s(size=%d)' % (self.__class__.__name__, self.size)
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""Shortest path results cache
+
+Results of dijkstra_search are cached by source vertex (a full shortest
+path tree, it answers any target) or by (source, target) for point-to-point
+searches which stop at the target. The entries live in an LRU Cache bounded
+by the number of entries and by the approximate memory of the results.
+
+Every lookup compares the graph version with the version the entries were
+computed for: adding a vertex or an edge changes Graph.version, and the
+whole cache is dropped, so a stale result is never returned.
+
+Example:
+    paths = ShortestPathCache(graph, max_bytes=64 * 1024 ** 2)
+    distances, path = paths.search('A', 'D')
+    paths.stats()['hit_rate']
+"""
+import array
+import sys
+
+from structures.cache import Cache
+from structures.graph import _Adapter, dijkstra_search
+
+
+def result_size(result):
+    """Approximate memory of a dijkstra_search result in bytes: the sizes of
+    its containers, the vertices and values are shared with the graph
+
+    :param result: tuple: (distances dict, Path or CSRPath)
+    :return: int
+    """
+    distances, path = result
+    return sys.getsizeof(distances) + sum(
+        sys.getsizeof(item) for item in vars(path).values()
+        if isinstance(item, (dict, array.array)))
+
+
+class ShortestPathCache(object):
+    """LRU cache of dijkstra_search results over a Graph or a CSRGraph
+
+    Cached results are shared between the callers and must not be modified.
+
+    :param graph: Graph or CSRGraph
+    :param max_entries: int: max number of cached results
+    :param max_bytes: int: memory budget for the results, see result_size
+    """
+
+    def __init__(self, graph, max_entries=1024, max_bytes=None):
+        self.graph = graph
+        self._adapter = _Adapter(graph)
+        self._cache = Cache(max_entries=max_entries, max_bytes=max_bytes,
+                            sizeof=result_size)
+        self._version = graph.version
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _check_version(self):
+        if self.graph.version != self._version:
+            self._cache.clear()
+            self._version = self.graph.version
+            self.invalidations += 1
+
+    def search(self, src, dst=None):
+        """Cached dijkstra_search
+
+        :param src: src vertex value
+        :param dst: dst vertex value: the search stops at it, a cached full
+        search from src is used if there is one
+        :return: tuple: (dict: vertex value -> distance, Path)
+        """
+        self._check_version()
+        result = self._cache.get((src, None))
+        if result is None and dst is not None:
+            result = self._cache.get((src, dst))
+        if result is not None:
+            self.hits += 1
+            return result
+
+        self.misses += 1
+        adapter = self._adapter
+        vertex = adapter.vertex(adapter.key(src))
+        target = None if dst is None else adapter.vertex(adapter.key(dst))
+        result = dijkstra_search(vertex, target=target)
+        self._cache.put((src, dst), result)
+        return result
+
+    def distance(self, src, dst):
+        """Shortest path distance, None if dst isn't reachable"""
+        distances, _ = self.search(src, dst)
+        return distances.get(dst)
+
+    def get_path(self, src, dst):
+        """Shortest path vertices, KeyError if dst isn't reachable"""
+        _, path = self.search(src, dst)
+        return path.get_path(src, dst)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        """Cache counters
+
+        :return: dict
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self._cache.evictions,
+            'invalidations': self.invalidations,
+            'size': self._cache.size,
+            'bytes': self._cache.bytes,
+        }
+
+    def __len__(self):
+        return self._cache.size
+
+    def __repr__(self):
+        return '%s(size=%d, hits=%d, misses=%d)' % (
+            self.__class__.__name__, self._cache.size, self.hits,
+            self.misses)
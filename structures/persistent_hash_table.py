@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+"""Persistent linear probing hash table stored in a memory-mapped file
+
+File layout (native byte order):
+
+    +--------------------------------------------------------------+
+    | header: magic, M, N, data start, data end, garbage bytes     |
+    +--------------------------------------------------------------+
+    | slots: M x (hash code, record offset), offset 0 = empty slot |
+    +--------------------------------------------------------------+
+    | data: append-only records (key length, value length,         |
+    |       key bytes, pickled value bytes)                        |
+    +--------------------------------------------------------------+
+
+The slots region is the LinearProbingHashTable layout, where the keys and
+values arrays are replaced with offsets into the data region. Opening a table
+maps the file and reads only the header, lookups probe the mapped slots
+directly, so both startup time and resident memory don't depend on the table
+size, and processes mapping the same file (e.g. forked workers) share the
+pages through the OS page cache.
+
+Writes append a new record and re-point the slot, the old record becomes
+garbage. Once the garbage takes a large part of the data region, the live
+records are copied to a new file which atomically replaces the old one
+(compaction). The same procedure is used to resize the slots region.
+
+Keys must be str, bytes or int: they are stored in a canonical encoding and
+hashed with CRC32, since the built-in hash() of str is randomized per
+process. Values are pickled.
+
+NOTE: one writer at a time. Readers which opened the file before a compaction
+or resize keep reading the old snapshot until they call reload(). Other
+writes go to the same file, readers see them; when the writer grows the data
+region, a reader maps the file again as soon as a slot points past the end
+of its mapping.
+"""
+import mmap
+import os
+import pickle
+import struct
+import zlib
+
+from structures.hash_table import (
+    AssociativeArray, FrozenHashTable, decode_key, encode_key)
+
+
+MAGIC = b'DSPHT001'
+HEADER = struct.Struct('=8sQQQQQ')
+HEADER_SIZE = 64
+RECORD = struct.Struct('=II')
+SLOT_SIZE = 16  # hash code and record offset, two unsigned 64-bit integers
+
+
+class PersistentHashTable(AssociativeArray):
+    """Memory-mapped persistent linear probing hash table
+
+    Example:
+        with PersistentHashTable('/tmp/table.dat') as t:
+            t.put('key', {'any': 'picklable value'})
+
+        # In another process
+        t = PersistentHashTable('/tmp/table.dat', readonly=True)
+        t.get('key')
+    """
+
+    # Compact when garbage exceeds compact_ratio of the data region and
+    # this absolute number of bytes
+    COMPACT_MIN_BYTES = 1 << 16
+
+    def __init__(self, path, m=97, max_load=0.5, compact_ratio=0.5,
+                 readonly=False):
+        super().__init__()
+        self.path = path
+        self.max_load = max_load
+        self.compact_ratio = compact_ratio
+        self.readonly = readonly
+        self._file = None
+        self._mm = None
+        self._slots = None
+
+        if not os.path.exists(path):
+            if readonly:
+                raise IOError('No such table file: {}'.format(path))
+            self._create(path, m)
+        self._open()
+
+    @staticmethod
+    def _create(path, m, data_capacity=0):
+        data_start = HEADER_SIZE + m * SLOT_SIZE
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, m, 0, data_start, data_start, 0))
+            f.truncate(data_start + max(data_capacity, mmap.PAGESIZE))
+
+    def _open(self):
+        self._file = open(self.path, 'rb' if self.readonly else 'r+b')
+        self._map()
+
+        magic, m, size, data_start, data_end, garbage = \
+            HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(
+                'Wrong table file: {}, bad magic {!r}'.format(
+                    self.path, magic))
+        self.m, self._size = m, size
+        self._data_start, self._data_end = data_start, data_end
+        self._garbage = garbage
+        self._slots = memoryview(self._mm)[
+            HEADER_SIZE:data_start].cast('Q')
+
+    def _map(self):
+        access = mmap.ACCESS_READ if self.readonly else mmap.ACCESS_WRITE
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=access)
+
+    def _remap(self, end):
+        """Map the file again if the position is past the end of the mapping:
+        another process grew the file in place since it was mapped"""
+        if end <= len(self._mm):
+            return
+        self._slots.release()
+        self._mm.close()
+        self._map()
+        self._slots = memoryview(self._mm)[
+            HEADER_SIZE:self._data_start].cast('Q')
+        if end > len(self._mm):
+            raise ValueError('Wrong table file: {}, record at {} is past '
+                             'the end of the file'.format(self.path, end))
+
+    def close(self):
+        if self._slots is not None:
+            self._slots.release()
+            self._slots = None
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def reload(self):
+        """Re-open the file, e.g. to see a compacted or resized table"""
+        self.close()
+        self._open()
+
+    def flush(self):
+        self._mm.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @staticmethod
+    def hash_code(key):
+        return zlib.crc32(encode_key(key))
+
+    def _record_lengths(self, offset):
+        """Key and value lengths of the record, the whole record is mapped
+
+        :return: tuple: (key length, value length)
+        """
+        self._remap(offset + RECORD.size)
+        key_len, value_len = RECORD.unpack_from(self._mm, offset)
+        self._remap(offset + RECORD.size + key_len + value_len)
+        return key_len, value_len
+
+    def _read_key(self, offset):
+        key_len, _ = self._record_lengths(offset)
+        start = offset + RECORD.size
+        return self._mm[start:start + key_len]
+
+    def _read_record(self, offset):
+        key_len, value_len = self._record_lengths(offset)
+        return self._mm[offset:offset + RECORD.size + key_len + value_len]
+
+    def _record_size(self, offset):
+        key_len, value_len = self._record_lengths(offset)
+        return RECORD.size + key_len + value_len
+
+    def _lookup(self, key_bytes, hash_code):
+        """Find the slot of the key or the empty slot to insert it
+
+        :return: tuple: (slot index, bool: is found)
+        """
+        m = self.m
+        i = hash_code % m
+        # self._slots is re-read on every step, _read_key may remap
+        while self._slots[2 * i + 1]:
+            if self._slots[2 * i] == hash_code \
+                    and self._read_key(self._slots[2 * i + 1]) == key_bytes:
+                return i, True
+            i = (i + 1) % m
+        return i, False
+
+    def get(self, key):
+        key_bytes = encode_key(key)
+        i, found = self._lookup(key_bytes, zlib.crc32(key_bytes))
+        if not found:
+            return None
+        offset = self._slots[2 * i + 1]
+        key_len, value_len = self._record_lengths(offset)
+        start = offset + RECORD.size + key_len
+        return pickle.loads(self._mm[start:start + value_len])
+
+    def put(self, key, value):
+        self._check_writable()
+        key_bytes = encode_key(key)
+        hash_code = zlib.crc32(key_bytes)
+        i, found = self._lookup(key_bytes, hash_code)
+
+        if found:
+            self._garbage += self._record_size(self._slots[2 * i + 1])
+        value_bytes = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        offset = self._append(
+            RECORD.pack(len(key_bytes), len(value_bytes))
+            + key_bytes + value_bytes)
+        self._slots[2 * i] = hash_code
+        self._slots[2 * i + 1] = offset
+        if not found:
+            self._size += 1
+            self._version += 1
+        self._write_header()
+
+        if self.size > self.max_load * self.m:
+            self._rebuild(2 * self.m)
+        else:
+            self._maybe_compact()
+        return True if found else None
+
+    def delete(self, key):
+        """Remove the key with backward-shift deletion in the slots region,
+        the record itself becomes garbage
+
+        :param key:
+        :return: bool: True if the key was found
+        """
+        self._check_writable()
+        key_bytes = encode_key(key)
+        i, found = self._lookup(key_bytes, zlib.crc32(key_bytes))
+        if not found:
+            return False
+
+        slots, m = self._slots, self.m
+        self._garbage += self._record_size(slots[2 * i + 1])
+        j = i
+        while True:
+            j = (j + 1) % m
+            if not slots[2 * j + 1]:
+                break
+            home = slots[2 * j] % m
+            if (i < j and (home <= i or home > j)) or \
+                    (i > j and home <= i and home > j):
+                slots[2 * i], slots[2 * i + 1] = slots[2 * j], slots[2 * j + 1]
+                i = j
+        slots[2 * i] = slots[2 * i + 1] = 0
+
+        self._size -= 1
+        self._version += 1
+        self._write_header()
+        self._maybe_compact()
+        return True
+
+    def _entries(self):
+        for i in range(self.m):
+            # self._slots is re-read on every step, it's replaced on remap
+            offset = self._slots[2 * i + 1]
+            if not offset:
+                continue
+            key_len, value_len = self._record_lengths(offset)
+            start = offset + RECORD.size
+            key = decode_key(self._mm[start:start + key_len])
+            start += key_len
+            value = pickle.loads(self._mm[start:start + value_len])
+            yield key, value, self._slots[2 * i]
+
+    def freeze(self):
+        # Stored hash codes are CRC32 ones, the frozen table uses hash()
+        return FrozenHashTable(
+            (key, value, AssociativeArray.hash_code(key))
+            for key, value, _ in self._entries())
+
+    def _check_writable(self):
+        if self.readonly:
+            raise IOError('Table {} is opened read-only'.format(self.path))
+
+    def _write_header(self):
+        HEADER.pack_into(self._mm, 0, MAGIC, self.m, self._size,
+                         self._data_start, self._data_end, self._garbage)
+
+    def _append(self, record):
+        """Append a record to the data region, grow the file if needed
+
+        :return: int: offset of the record
+        """
+        offset = self._data_end
+        end = offset + len(record)
+        if end > len(self._mm):
+            self._grow_file(end)
+        self._mm[offset:end] = record
+        self._data_end = end
+        return offset
+
+    def _grow_file(self, min_size):
+        # Grow geometrically to amortize re-mapping
+        new_size = max(min_size, 2 * len(self._mm))
+        self._write_header()
+        self.close()
+        with open(self.path, 'r+b') as f:
+            f.truncate(new_size)
+        self._open()
+
+    @property
+    def garbage_ratio(self):
+        used = self._data_end - self._data_start
+        return self._garbage / used if used else 0.0
+
+    def _maybe_compact(self):
+        if self._garbage >= self.COMPACT_MIN_BYTES \
+                and self.garbage_ratio > self.compact_ratio:
+            self.compact()
+
+    def compact(self):
+        """Copy live records to a new file and replace the old one"""
+        self._rebuild(self.m)
+
+    def _rebuild(self, new_m):
+        """Write all the live records into a new file with new_m slots and
+        atomically replace the current file. Cached hash codes are reused,
+        so no key is re-hashed"""
+        self._check_writable()
+        self._version += 1
+        tmp_path = self.path + '.tmp'
+        live_bytes = self._data_end - self._data_start - self._garbage
+        self._create(tmp_path, new_m, data_capacity=live_bytes)
+
+        new = PersistentHashTable(tmp_path, max_load=self.max_load,
+                                  compact_ratio=self.compact_ratio)
+        try:
+            slots = self._slots
+            for i in range(self.m):
+                offset = slots[2 * i + 1]
+                if not offset:
+                    continue
+                hash_code = slots[2 * i]
+                new_offset = new._append(self._read_record(offset))
+                j = hash_code % new_m
+                while new._slots[2 * j + 1]:
+                    j = (j + 1) % new_m
+                new._slots[2 * j] = hash_code
+                new._slots[2 * j + 1] = new_offset
+            new._size = self._size
+            new._write_header()
+            new.flush()
+        finally:
+            new.close()
+
+        self.close()
+        os.replace(tmp_path, self.path)
+        self._open()
+
+    def __repr__(self):
+        return '%s(path=%r, size=%d, m=%d)' % (
+            self.__class__.__name__, self.path, self.size, self.m)
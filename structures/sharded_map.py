@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+"""Consistent hashing and a hash map sharded over worker processes
+
+Consistent hashing:
+  * every node (shard) is placed on a ring of 2^64 positions several times
+    (virtual nodes), which evens out the ranges owned by the nodes
+  * a key belongs to the first node clockwise from the key position
+  * adding or removing a node moves only the keys of the ranges it takes or
+    gives away, i.e. about 1/N of the keys
+
+ShardedMap keeps an AssociativeArray-like put / get / delete / contains API,
+while the data lives in N worker processes, each one holding its own
+SeparateChainHashTable. So the map isn't limited by the memory and the GIL of
+a single interpreter. The coordinating process keeps only the ring and talks
+to the workers over pipes, batched calls send one message per shard and wait
+for the shards in parallel.
+
+NOTE: ring positions are AssociativeArray.hash64 codes, i.e. hash() mixed
+with the MurmurHash3 finalizer. hash() of str and bytes is salted per
+process, but the ring lives in the coordinating process only, so keys and
+values only have to be picklable and hashable.
+"""
+import bisect
+import multiprocessing
+
+from structures.hash_table import AssociativeArray, SeparateChainHashTable
+
+
+def ring_position(value):
+    """Position of a value on the ring
+
+    :param value: any hashable value
+    :return: int: 0 <= position < 2 ** 64
+    """
+    return AssociativeArray.hash64(value)
+
+
+class HashRing(object):
+    """Consistent hash ring with virtual nodes
+
+    :param nodes: iterable of hashable node names
+    :param replicas: int: number of virtual nodes per node
+    """
+
+    def __init__(self, nodes=(), replicas=100):
+        self.replicas = replicas
+        self._positions = []
+        self._owners = []
+        self._nodes = set()
+        for node in nodes:
+            self.add_node(node)
+
+    @property
+    def nodes(self):
+        return set(self._nodes)
+
+    def add_node(self, node):
+        if node in self._nodes:
+            raise ValueError('Node {!r} is already on the ring'.format(node))
+        self._nodes.add(node)
+        for replica in range(self.replicas):
+            position = ring_position((node, replica))
+            i = bisect.bisect(self._positions, position)
+            self._positions.insert(i, position)
+            self._owners.insert(i, node)
+
+    def remove_node(self, node):
+        if node not in self._nodes:
+            raise ValueError('Node {!r} is not on the ring'.format(node))
+        self._nodes.remove(node)
+        keep = [i for i, owner in enumerate(self._owners) if owner != node]
+        self._positions = [self._positions[i] for i in keep]
+        self._owners = [self._owners[i] for i in keep]
+
+    def get_node(self, key):
+        """Node which owns the key
+
+        :param key: any hashable value
+        :return: node name
+        """
+        if not self._positions:
+            raise LookupError('The ring is empty')
+        i = bisect.bisect(self._positions, ring_position(key))
+        if i == len(self._positions):
+            i = 0  # wrap around the ring
+        return self._owners[i]
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __repr__(self):
+        return '%s(nodes=%d, replicas=%d)' % (
+            self.__class__.__name__, len(self._nodes), self.replicas)
+
+
+def _shard_worker(conn):
+    """Worker process loop: apply commands to a local hash table"""
+    table = SeparateChainHashTable()
+    while True:
+        command, args = conn.recv()
+        if command == 'close':
+            conn.close()
+            return
+        elif command == 'iter_keys':
+            # Keys are streamed in chunks, None marks the end
+            chunk = []
+            for key, _, _ in table._entries():
+                chunk.append(key)
+                if len(chunk) == args[0]:
+                    conn.send(chunk)
+                    chunk = []
+            if chunk:
+                conn.send(chunk)
+            result = None
+        elif command == 'items':
+            result = [(key, value) for key, value, _ in table._entries()]
+        elif command == 'size':
+            result = table.size
+        else:
+            result = getattr(table, command)(*args)
+        conn.send(result)
+
+
+class _Shard(object):
+    def __init__(self, name, context):
+        self.name = name
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_shard_worker, args=(child_conn, ), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def send(self, command, *args):
+        self.conn.send((command, args))
+
+    def recv(self):
+        return self.conn.recv()
+
+    def call(self, command, *args):
+        self.send(command, *args)
+        return self.recv()
+
+    def close(self):
+        self.send('close')
+        self.process.join()
+        self.conn.close()
+
+
+class ShardedMap(AssociativeArray):
+    """Hash map sharded over worker processes with consistent hashing
+
+    Example:
+        with ShardedMap(shards=4) as m:
+            m.put_many(range(1000), range(1000))
+            m.add_shard()  # moves about 1/5 of the keys
+            m.get_many([1, 2, 3])
+
+    :param shards: int: initial number of shards
+    :param replicas: int: number of virtual nodes per shard
+    :param context: multiprocessing context, the default one if None
+    """
+
+    def __init__(self, shards=2, replicas=100, context=None):
+        super().__init__()
+        self._context = context or multiprocessing.get_context()
+        self._ring = HashRing(replicas=replicas)
+        self._shards = {}
+        self._next_id = 0
+        for _ in range(shards):
+            self.add_shard()
+
+    @property
+    def shards(self):
+        return sorted(self._shards)
+
+    @property
+    def size(self):
+        return sum(self.shard_sizes().values())
+
+    def shard_sizes(self):
+        """Number of keys per shard
+
+        :return: dict: shard name -> size
+        """
+        return self._broadcast('size')
+
+    def _broadcast(self, command):
+        for shard in self._shards.values():
+            shard.send(command)
+        return {name: shard.recv() for name, shard in self._shards.items()}
+
+    def _shard_of(self, key):
+        return self._shards[self._ring.get_node(key)]
+
+    def put(self, key, value):
+        return self._shard_of(key).call('put', key, value)
+
+    def get(self, key):
+        return self._shard_of(key).call('get', key)
+
+    def delete(self, key):
+        return self._shard_of(key).call('delete', key)
+
+    def _group(self, keys):
+        """Group key positions by shard
+
+        :return: dict: shard name -> list of indexes of the keys
+        """
+        groups = {}
+        get_node = self._ring.get_node
+        for i, key in enumerate(keys):
+            groups.setdefault(get_node(key), []).append(i)
+        return groups
+
+    def put_many(self, keys, values):
+        keys, values = list(keys), list(values)
+        self._check_batch(keys, values)
+        groups = self._group(keys)
+        for name, idx in groups.items():
+            self._shards[name].send(
+                'put_many', [keys[i] for i in idx], [values[i] for i in idx])
+        return sum(self._shards[name].recv() for name in groups)
+
+    def get_many(self, keys):
+        keys = list(keys)
+        groups = self._group(keys)
+        for name, idx in groups.items():
+            self._shards[name].send('get_many', [keys[i] for i in idx])
+
+        result = [None] * len(keys)
+        for name, idx in groups.items():
+            for i, value in zip(idx, self._shards[name].recv()):
+                result[i] = value
+        return result
+
+    def delete_many(self, keys):
+        keys = list(keys)
+        groups = self._group(keys)
+        for name, idx in groups.items():
+            self._shards[name].send('delete_many', [keys[i] for i in idx])
+        return sum(self._shards[name].recv() for name in groups)
+
+    def _entries(self):
+        # Shard by shard, so that only one shard is held in memory
+        for name in self.shards:
+            for key, value in self._shards[name].call('items'):
+                yield key, value, self.hash_code(key)
+
+    # Keys per message when a shard streams its keys
+    KEYS_CHUNK_SIZE = 10000
+
+    def add_shard(self):
+        """Start a new shard worker and move to it the keys of the ring
+        ranges it takes over
+
+        :return: str: name of the new shard
+        """
+        name = 'shard-{}'.format(self._next_id)
+        self._next_id += 1
+        new_shard = _Shard(name, self._context)
+        sources = list(self._shards.values())
+        self._shards[name] = new_shard
+        self._ring.add_node(name)
+
+        # Shard by shard, the keys are streamed in chunks and only the moved
+        # ones are kept, so the coordinator never holds all the keys
+        get_node = self._ring.get_node
+        for source in sources:
+            source.send('iter_keys', self.KEYS_CHUNK_SIZE)
+            keys = []
+            for chunk in iter(source.recv, None):
+                keys.extend(key for key in chunk if get_node(key) == name)
+            if keys:
+                values = source.call('get_many', keys)
+                source.call('delete_many', keys)
+                new_shard.call('put_many', keys, values)
+        return name
+
+    def remove_shard(self, name):
+        """Stop the shard worker, its keys are spread over the other shards
+
+        :param name: str: shard name
+        """
+        if len(self._shards) == 1:
+            raise ValueError('Can not remove the last shard')
+        shard = self._shards[name]
+        items = shard.call('items')
+        self._ring.remove_node(name)
+        del self._shards[name]
+        shard.close()
+        if items:
+            self.put_many([key for key, _ in items],
+                          [value for _, value in items])
+
+    def close(self):
+        for shard in self._shards.values():
+            shard.close()
+        self._shards = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __repr__(self):
+        return '%s(shards=%d)' % (self.__class__.__name__, len(self._shards))
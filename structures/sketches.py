@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""Probabilistic structures to answer "is it there?" and "how often?" in
+a fixed amount of memory, e.g. to filter out most misses before looking up
+an expensive table.
+
+Both structures use double hashing on top of a 64-bit hash code which is
+the same in every process, so filters and sketches can be saved and merged
+across processes: hash() of str and bytes is salted per process, they're
+hashed by a digest of their canonical encoding instead. The code is split
+into h1 and h2 and the i-th hash function is
+
+    g(i) = (h1 + i * h2) mod M
+
+which is as good as k independent hash functions for these structures
+(Kirsch, Mitzenmacher "Less hashing, same performance").
+
+Bloom filter
+  * bit array of M bits, every key sets k bits
+  * a key is possibly there if all its k bits are set, definitely not there
+    otherwise: no false negatives, false positives with probability p
+  * M = -N * ln(p) / ln(2)^2 and k = M / N * ln(2) for N keys
+
+Count-min sketch
+  * d rows of w counters, every key increments one counter per row
+  * estimated count is the minimum over the rows: never underestimates,
+    overestimates by at most eps * total count with probability 1 - delta
+  * w = e / eps, d = ln(1 / delta)
+
+Filters and sketches of the same shape built by parallel workers can be
+merged: union of the bits or a sum of the counters.
+"""
+import array
+import math
+import struct
+
+from structures.hash_table import (
+    MASK64, _as_list, mix64_array, numpy, stable_hash64)
+
+
+def _double_hashes(key):
+    code = stable_hash64(key)
+    return code & 0xffffffff, (code >> 32) | 1
+
+
+def _is_int_array(keys):
+    """Check if keys is a NumPy integer array. Any of them is hashed by the
+    vectorized path: stable_hash64 mixes the 64-bit two's complement of an
+    int, which is what astype(uint64) gives for negative keys too"""
+    return numpy is not None and isinstance(keys, numpy.ndarray) \
+        and keys.ndim == 1 and keys.dtype.kind in 'iu'
+
+
+def _double_hashes_array(keys):
+    """Vectorized _double_hashes for NumPy integer arrays of keys"""
+    codes = mix64_array(keys.astype(numpy.uint64))
+    return (codes & numpy.uint64(0xffffffff),
+            (codes >> numpy.uint64(32)) | numpy.uint64(1))
+
+
+def _indexes_array(keys, k, m):
+    """Matrix of the k indexes of every key, shape (len(keys), k)"""
+    h1, h2 = _double_hashes_array(keys)
+    i = numpy.arange(k, dtype=numpy.uint64)
+    return (h1[:, None] + i[None, :] * h2[:, None]) % numpy.uint64(m)
+
+
+class BloomFilter(object):
+    """Bloom filter over a compact bytearray
+
+    :param capacity: int: expected number of keys N
+    :param error_rate: float: target false positive probability p
+    :param m: int: number of bits, derived from capacity and error_rate
+    :param k: int: number of hash functions, derived from m and capacity
+    """
+
+    HEADER = struct.Struct('<4sQQQ')
+    MAGIC = b'BLM2'
+
+    def __init__(self, capacity=1000, error_rate=0.01, m=None, k=None):
+        if capacity < 1 or not 0 < error_rate < 1:
+            raise ValueError(
+                'Wrong filter parameters: capacity={}, error_rate={}'.format(
+                    capacity, error_rate))
+        if m is None:
+            m = int(math.ceil(
+                -capacity * math.log(error_rate) / math.log(2) ** 2))
+        if k is None:
+            k = max(int(round(m / capacity * math.log(2))), 1)
+        self.m = m
+        self.k = k
+        self.count = 0  # number of added keys, duplicates included
+        self._bits = bytearray((m + 7) // 8)
+
+    def _indexes(self, key):
+        h1, h2 = _double_hashes(key)
+        m = self.m
+        return [(h1 + i * h2) % m for i in range(self.k)]
+
+    def add(self, key):
+        bits = self._bits
+        for i in self._indexes(key):
+            bits[i >> 3] |= 1 << (i & 7)
+        self.count += 1
+
+    def contains(self, key):
+        bits = self._bits
+        return all(bits[i >> 3] & (1 << (i & 7)) for i in self._indexes(key))
+
+    def __contains__(self, key):
+        return self.contains(key)
+
+    def add_many(self, keys):
+        """Add a batch of keys. Integer NumPy arrays are hashed and set in
+        one vectorized pass
+
+        :param keys: iterable of keys or NumPy array
+        """
+        if _is_int_array(keys):
+            idx = _indexes_array(keys, self.k, self.m).ravel()
+            bits = numpy.frombuffer(self._bits, dtype=numpy.uint8)
+            numpy.bitwise_or.at(
+                bits, idx >> numpy.uint64(3),
+                (1 << (idx & numpy.uint64(7))).astype(numpy.uint8))
+            self.count += len(keys)
+            return
+        for key in _as_list(keys):
+            self.add(key)
+
+    def contains_many(self, keys):
+        """Check a batch of keys
+
+        :param keys: iterable of keys or NumPy array
+        :return: list of bool
+        """
+        if _is_int_array(keys):
+            idx = _indexes_array(keys, self.k, self.m)
+            bits = numpy.frombuffer(self._bits, dtype=numpy.uint8)
+            is_set = (bits[idx >> numpy.uint64(3)]
+                      >> (idx & numpy.uint64(7)).astype(numpy.uint8)) & 1
+            return is_set.all(axis=1).tolist()
+        return [self.contains(key) for key in _as_list(keys)]
+
+    def estimated_error_rate(self):
+        """False positive probability for the current number of keys"""
+        return (1 - math.exp(-self.k * self.count / self.m)) ** self.k
+
+    def _check_compatible(self, other):
+        if not isinstance(other, BloomFilter) \
+                or (self.m, self.k) != (other.m, other.k):
+            raise ValueError(
+                'Filters of different shapes can not be merged: '
+                '{!r} and {!r}'.format(self, other))
+
+    def update(self, other):
+        """Merge another filter into this one (union of the key sets)
+
+        :param other: BloomFilter of the same m and k
+        """
+        self._check_compatible(other)
+        merged = int.from_bytes(self._bits, 'little') \
+            | int.from_bytes(other._bits, 'little')
+        self._bits = bytearray(merged.to_bytes(len(self._bits), 'little'))
+        self.count += other.count
+
+    def __or__(self, other):
+        result = self.copy()
+        result.update(other)
+        return result
+
+    def copy(self):
+        result = BloomFilter(m=self.m, k=self.k)
+        result._bits = bytearray(self._bits)
+        result.count = self.count
+        return result
+
+    def to_bytes(self):
+        return self.HEADER.pack(self.MAGIC, self.m, self.k, self.count) \
+            + bytes(self._bits)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, m, k, count = cls.HEADER.unpack_from(data, 0)
+        if magic != cls.MAGIC:
+            raise ValueError('Wrong bloom filter data, bad magic '
+                             '{!r}'.format(magic))
+        bloom = cls(m=m, k=k)
+        bloom._bits = bytearray(data[cls.HEADER.size:])
+        bloom.count = count
+        return bloom
+
+    def __repr__(self):
+        return '%s(m=%d, k=%d, count=%d)' % (
+            self.__class__.__name__, self.m, self.k, self.count)
+
+
+class CountMinSketch(object):
+    """Count-min sketch over an array of unsigned 64-bit counters
+
+    :param epsilon: float: overestimation bound relative to the total count
+    :param delta: float: probability to exceed the bound
+    :param width: int: counters per row, derived from epsilon
+    :param depth: int: number of rows, derived from delta
+    """
+
+    HEADER = struct.Struct('<4sQQQ')
+    MAGIC = b'CMS2'
+
+    def __init__(self, epsilon=0.001, delta=0.01, width=None, depth=None):
+        if width is None:
+            width = int(math.ceil(math.e / epsilon))
+        if depth is None:
+            depth = max(int(math.ceil(math.log(1 / delta))), 1)
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self._counters = array.array('Q', [0]) * (width * depth)
+
+    def _indexes(self, key):
+        h1, h2 = _double_hashes(key)
+        w = self.width
+        return [row * w + (h1 + row * h2) % w for row in range(self.depth)]
+
+    def add(self, key, count=1):
+        counters = self._counters
+        for i in self._indexes(key):
+            counters[i] = (counters[i] + count) & MASK64
+        self.total += count
+
+    def estimate(self, key):
+        counters = self._counters
+        return min(counters[i] for i in self._indexes(key))
+
+    def _indexes_array(self, keys):
+        rows = numpy.arange(self.depth, dtype=numpy.uint64)
+        w = numpy.uint64(self.width)
+        return rows[None, :] * w + _indexes_array(keys, self.depth, w)
+
+    def add_many(self, keys, counts=None):
+        """Add a batch of keys
+
+        :param keys: iterable of keys or NumPy array
+        :param counts: iterable of counts, 1 for every key by default
+        """
+        if _is_int_array(keys):
+            counts = numpy.ones(len(keys), dtype=numpy.uint64) \
+                if counts is None else numpy.asarray(counts, numpy.uint64)
+            idx = self._indexes_array(keys)
+            counters = numpy.frombuffer(self._counters, dtype=numpy.uint64)
+            numpy.add.at(counters, idx.ravel(),
+                         numpy.repeat(counts, self.depth))
+            self.total += int(counts.sum())
+            return
+        keys = _as_list(keys)
+        if counts is None:
+            for key in keys:
+                self.add(key)
+        else:
+            for key, count in zip(keys, _as_list(counts)):
+                self.add(key, count)
+
+    def estimate_many(self, keys):
+        if _is_int_array(keys):
+            counters = numpy.frombuffer(self._counters, dtype=numpy.uint64)
+            return counters[self._indexes_array(keys)].min(axis=1).tolist()
+        return [self.estimate(key) for key in _as_list(keys)]
+
+    def update(self, other):
+        """Merge another sketch into this one (sum of the counters)
+
+        :param other: CountMinSketch of the same width and depth
+        """
+        if not isinstance(other, CountMinSketch) \
+                or (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError(
+                'Sketches of different shapes can not be merged: '
+                '{!r} and {!r}'.format(self, other))
+        counters = self._counters
+        for i, value in enumerate(other._counters):
+            if value:
+                counters[i] = (counters[i] + value) & MASK64
+        self.total += other.total
+
+    def to_bytes(self):
+        return self.HEADER.pack(self.MAGIC, self.width, self.depth,
+                                self.total) + self._counters.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, width, depth, total = cls.HEADER.unpack_from(data, 0)
+        if magic != cls.MAGIC:
+            raise ValueError('Wrong count-min sketch data, bad magic '
+                             '{!r}'.format(magic))
+        sketch = cls(width=width, depth=depth)
+        sketch._counters = array.array('Q')
+        sketch._counters.frombytes(data[cls.HEADER.size:])
+        sketch.total = total
+        return sketch
+
+    def __repr__(self):
+        return '%s(width=%d, depth=%d, total=%d)' % (
+            self.__class__.__name__, self.width, self.depth, self.total)
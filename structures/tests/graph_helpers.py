@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+import random
+
+from structures.graph import Graph
+
+
+def random_graph(n, edges, seed, directed=True, min_distance=1):
+    """Graph of vertices 0..n-1 and random edges, loops and parallel edges
+    included
+
+    :param n: int: number of vertices
+    :param edges: int: number of edges
+    :param seed: random seed
+    :param directed: bool
+    :param min_distance: int: edge distances are in [min_distance, 20]
+    :return: Graph
+    """
+    rnd = random.Random(seed)
+    g = Graph(directed=directed)
+    vertices = [g.add_vertex(i) for i in range(n)]
+    for _ in range(edges):
+        g.add_edge(rnd.choice(vertices), rnd.choice(vertices),
+                   distance=rnd.randint(min_distance, 20))
+    return g
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
+import random
 import unittest
-from structures.binary_heap import MinHeap
+
+from structures.binary_heap import IndexedMinHeap, MinHeap
 
 
 class BinaryHeapTestCase(unittest.TestCase):
@@ -58,3 +60,101 @@ class BinaryHeapTestCase(unittest.TestCase):
         self.assertTrue(heap.validate())
         self.assertEqual(heap.extract_all(), [2, 3, 4, 5, 6, 7])
         self.assertEqual(heap.size, 0)
+
+    def test_remove(self):
+        heap = MinHeap.heapify([6, 1, 5, 4, 3, 2, 7])
+        heap.remove(4)
+        heap.remove(1)
+        self.assertTrue(heap.validate())
+        self.assertEqual(heap.extract_all(), [2, 3, 5, 6, 7])
+        self.assertRaises(ValueError, heap.remove, 4)
+
+    def test_zero_values(self):
+        heap = MinHeap.heapify([3, 0, 2, 0, -1, 1, 0])
+        self.assertTrue(heap.validate())
+        heap.insert(0)
+        self.assertEqual(heap.extract_all(), [-1, 0, 0, 0, 0, 1, 2, 3])
+
+        heap = MinHeap.heapify([0, 5, 0, 0, 4])
+        heap.remove(5)
+        self.assertEqual(heap.extract_all(), [0, 0, 0, 4])
+
+    def test_parent_of_even_index(self):
+        heap = MinHeap(list(range(10)))
+        self.assertEqual(heap.get_parent(4), (1, 1))
+        self.assertEqual(heap.get_parent(8), (3, 3))
+
+    def test_key(self):
+        words = ['pear', 'fig', 'banana', 'kiwi', 'apple', 'plum']
+        heap = MinHeap.heapify(words, key=len)
+        self.assertTrue(heap.validate())
+        heap.insert('cherry')
+        self.assertEqual([len(w) for w in heap.extract_all()],
+                         sorted(len(w) for w in words + ['cherry']))
+
+        # Items with equal keys are never compared themselves
+        heap = MinHeap.heapify([(1, {}), (0, {}), (1, {})],
+                               key=lambda item: item[0])
+        self.assertEqual(heap.extract_min(), (0, {}))
+
+    def test_large_heap(self):
+        values = list(range(100000))
+        random.Random(1).shuffle(values)
+        heap = MinHeap.heapify(values)
+        self.assertTrue(heap.validate())
+        self.assertEqual(heap.extract_all(), sorted(values))
+
+
+class IndexedMinHeapTestCase(unittest.TestCase):
+
+    def test_heapify(self):
+        items = {'a': 6, 'b': 1, 'c': 5, 'd': 4, 'e': 3, 'f': 2, 'g': 7}
+        heap = IndexedMinHeap(items)
+        self.assertTrue(heap.validate())
+        self.assertEqual(heap.peek(), ('b', 1))
+        self.assertEqual(len(heap), 7)
+        self.assertEqual([heap.extract_min() for _ in items],
+                         sorted(items.items(), key=lambda item: item[1]))
+        self.assertIsNone(heap.extract_min())
+        self.assertIsNone(heap.peek())
+
+    def test_change_priority(self):
+        heap = IndexedMinHeap([('a', 5), ('b', 3)])
+        heap.insert('c', 4)
+        self.assertIn('c', heap)
+        self.assertRaises(KeyError, heap.insert, 'c', 1)
+
+        heap.decrease_key('a', 1)
+        self.assertEqual(heap.peek(), ('a', 1))
+        heap.increase_key('a', 10)
+        self.assertEqual(heap.peek(), ('b', 3))
+        self.assertEqual(heap.priority('a'), 10)
+        self.assertRaises(ValueError, heap.decrease_key, 'a', 11)
+        self.assertRaises(ValueError, heap.increase_key, 'a', 9)
+
+        heap.push('a', 0)
+        heap.push('d', 2)
+        self.assertEqual(heap.remove('c'), 4)
+        self.assertFalse(heap.contains('c'))
+        self.assertRaises(KeyError, heap.remove, 'c')
+        self.assertEqual([heap.extract_min() for _ in range(len(heap))],
+                         [('a', 0), ('d', 2), ('b', 3)])
+
+    def test_random_operations(self):
+        rnd = random.Random(1)
+        heap, expected = IndexedMinHeap(), {}
+        for _ in range(3000):
+            item = rnd.randrange(200)
+            action = rnd.random()
+            if item in expected and action < 0.3:
+                self.assertEqual(heap.remove(item), expected.pop(item))
+            elif action < 0.9:
+                # Equal priorities of different items are fine
+                expected[item] = rnd.randrange(50)
+                heap.push(item, expected[item])
+            elif expected:
+                item, priority = heap.extract_min()
+                self.assertEqual(priority, min(expected.values()))
+                self.assertEqual(expected.pop(item), priority)
+        self.assertTrue(heap.validate())
+        self.assertEqual(len(heap), len(expected))
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from structures.bk_tree import levenshtein_distance
+from structures.cache import Cache, memoize
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CacheTest(unittest.TestCase):
+
+    def test_lru(self):
+        cache = Cache(max_entries=3)
+        for key in 'abc':
+            cache.put(key, key.upper())
+        self.assertEqual(cache.get('a'), 'A')  # a is the most recent now
+
+        cache.put('d', 'D')  # evicts b
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 'C')
+        self.assertTrue(cache.put('c', 'CC'))
+        cache.put('e', 'E')  # evicts a
+        self.assertFalse(cache.contains('a'))
+        self.assertEqual(cache.get('c'), 'CC')
+        self.assertEqual(cache.size, 3)
+
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 3)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['evictions'], 2)
+        self.assertEqual(stats['hit_rate'], 0.75)
+
+    def test_lfu(self):
+        cache = Cache(max_entries=3, policy='lfu')
+        for key in 'abc':
+            cache.put(key, key)
+        for _ in range(3):
+            cache.get('a')
+        cache.get('b')
+
+        cache.put('d', 'd')  # c is the least frequently used
+        self.assertFalse(cache.contains('c'))
+        cache.put('e', 'e')  # d has frequency 1
+        self.assertFalse(cache.contains('d'))
+        self.assertTrue(cache.contains('a'))
+        self.assertTrue(cache.contains('b'))
+
+        # Deleting the least frequent entries
+        cache.delete('e')
+        cache.delete('b')
+        cache.put('f', 'f')
+        cache.put('g', 'g')
+        cache.put('h', 'h')  # f is evicted, a stays
+        self.assertEqual(sorted(k for k in 'afgh' if cache.contains(k)),
+                         ['a', 'g', 'h'])
+        self.assertRaises(ValueError, Cache, policy='fifo')
+
+    def test_max_bytes(self):
+        cache = Cache(max_bytes=10, sizeof=len)
+        cache.put('a', 'x' * 4)
+        cache.put('b', 'x' * 4)
+        cache.put('c', 'x' * 4)  # evicts a
+        self.assertEqual(cache.bytes, 8)
+        self.assertFalse(cache.contains('a'))
+
+        cache.put('b', 'x' * 9)  # grows and evicts c
+        self.assertEqual(cache.bytes, 9)
+        self.assertEqual(cache.size, 1)
+
+        self.assertIsNone(cache.put('huge', 'x' * 11))
+        self.assertFalse(cache.contains('huge'))
+        self.assertTrue(cache.contains('b'))
+
+    def test_never_fits(self):
+        cache = Cache(max_entries=0)
+        self.assertIsNone(cache.put('a', 1))
+        self.assertFalse(cache.contains('a'))
+        self.assertEqual(cache.size, 0)
+
+        cache = Cache(max_bytes=3, sizeof=len)
+        cache.put('a', 'xx')
+        cache.put('a', 'xxxx')  # the old value is dropped as well
+        self.assertFalse(cache.contains('a'))
+        self.assertEqual((cache.size, cache.bytes), (0, 0))
+
+    def test_ttl(self):
+        clock = FakeClock()
+        cache = Cache(ttl=10, clock=clock)
+        cache.put('a', 1)
+        cache.put('b', 2, ttl=100)
+        clock.now = 50
+        self.assertFalse(cache.contains('a'))
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('b'), 2)
+        self.assertEqual(cache.expirations, 1)
+        self.assertEqual(cache.size, 1)
+
+        cache.put('a', 3)
+        clock.now = 55
+        self.assertEqual(cache.get('a'), 3)
+
+    def test_iteration(self):
+        clock = FakeClock()
+        cache = Cache(max_entries=3, clock=clock)
+        cache.put('a', 1, ttl=10)
+        cache.put('b', 2)
+        cache.put('c', 3)
+        self.assertEqual(sorted(cache.items()), [('a', 1), ('b', 2),
+                                                 ('c', 3)])
+        clock.now = 20
+        self.assertEqual(sorted(cache.keys()), ['b', 'c'])
+        self.assertEqual(sorted(cache.values()), [2, 3])
+        self.assertEqual(sorted(cache), ['b', 'c'])
+        self.assertEqual(sum(len(b) for b in cache.iter_batches(1)), 2)
+
+        # Iteration isn't a hit: 'b' is still the least recently used
+        self.assertEqual(cache.hits, 0)
+        cache.put('d', 4)
+        cache.put('e', 5)
+        self.assertEqual(sorted(cache.keys()), ['c', 'd', 'e'])
+        with self.assertRaises(RuntimeError):
+            for key in cache.keys():
+                cache.delete(key)
+
+    def test_memoize(self):
+        calls = []
+
+        @memoize(max_entries=2)
+        def distance(s, t):
+            calls.append((s, t))
+            return levenshtein_distance(s, t)
+
+        self.assertEqual(distance('row', 'roar'), 2)
+        self.assertEqual(distance('row', 'roar'), 2)
+        self.assertEqual(distance(s='row', t='roar'), 2)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(distance.cache.hits, 1)
+        self.assertEqual(distance.__name__, 'distance')
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import sys
+import unittest
+import warnings
+
+from structures.centrality import betweenness_centrality, pagerank
+from structures.csr_graph import CSRGraph
+from structures.graph import Graph
+from structures.hash_table import numpy
+from structures.tests.graph_helpers import random_graph
+
+
+def simple_pagerank(graph, damping=0.85, iterations=200):
+    vertices = list(graph.vertices.values())
+    n = len(vertices)
+    rank = {v: 1.0 / n for v in vertices}
+    for _ in range(iterations):
+        dangling = sum(rank[v] for v in vertices if not v.get_neighbors())
+        new_rank = {v: (1 - damping) / n + damping * dangling / n
+                    for v in vertices}
+        for v in vertices:
+            neighbors = v.get_neighbors()
+            for u, _ in neighbors:
+                new_rank[u] += damping * rank[v] / len(neighbors)
+        rank = new_rank
+    return {v.value: r for v, r in rank.items()}
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class PageRankTest(unittest.TestCase):
+
+    def test_pagerank(self):
+        g = Graph.build_graph({'A': [('B', 1), ('C', 1)],
+                               'B': [('C', 1)],
+                               'C': [('A', 1)],
+                               'D': [('C', 1)],
+                               'E': []})
+        ranks = pagerank(g, tol=1e-12)
+        self.assertAlmostEqual(sum(ranks.values()), 1)
+        for value, rank in simple_pagerank(g).items():
+            self.assertAlmostEqual(ranks[value], rank)
+        self.assertEqual(max(ranks, key=ranks.get), 'C')
+
+    def test_cycle(self):
+        g = CSRGraph.from_edges([(i, (i + 1) % 4) for i in range(4)])
+        self.assertEqual(pagerank(g), {i: 0.25 for i in range(4)})
+        self.assertEqual(pagerank(Graph()), {})
+        self.assertRaises(ValueError, pagerank, g, damping=1)
+
+    def test_not_converged(self):
+        g = random_graph(30, 60, seed=2)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            pagerank(g, max_iter=2)
+        self.assertEqual(caught[0].category, RuntimeWarning)
+
+
+class BetweennessCentralityTest(unittest.TestCase):
+
+    def test_path(self):
+        g = CSRGraph.from_edges([('A', 'B'), ('B', 'C'), ('C', 'D')],
+                                directed=False)
+        self.assertEqual(betweenness_centrality(g, normalized=False),
+                         {'A': 0, 'B': 2, 'C': 2, 'D': 0})
+        self.assertEqual(betweenness_centrality(g),
+                         {'A': 0, 'B': 2 / 3, 'C': 2 / 3, 'D': 0})
+
+    def test_shortest_paths_count(self):
+        # Two shortest paths S -> T, via A and via B, the longer one via C
+        g = Graph.build_graph({'S': [('A', 1), ('B', 1), ('C', 2)],
+                               'A': [('T', 1)],
+                               'B': [('T', 1)],
+                               'C': [('T', 1)]})
+        scores = betweenness_centrality(g, normalized=False)
+        self.assertEqual(scores, {'S': 0, 'A': 0.5, 'B': 0.5, 'C': 0,
+                                  'T': 0})
+
+    def test_sampled(self):
+        g = CSRGraph.from_graph(random_graph(60, 240, seed=3))
+        exact = betweenness_centrality(g)
+        self.assertEqual(betweenness_centrality(g, samples=60), exact)
+        self.assertRaises(ValueError, betweenness_centrality, g, samples=0)
+
+    @unittest.skipIf(sys.version_info < (3, 8),
+                     'Shared memory needs Python 3.8+')
+    def test_sampled_with_workers(self):
+        g = CSRGraph.from_graph(random_graph(60, 240, seed=3))
+        sampled = betweenness_centrality(g, samples=20, seed=1)
+        parallel = betweenness_centrality(g, samples=20, seed=1, workers=2,
+                                          chunk_size=3)
+        for value, score in sampled.items():
+            self.assertAlmostEqual(parallel[value], score)
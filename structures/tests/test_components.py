@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import random
+import unittest
+
+from structures.components import (
+    components, connected_components, strongly_connected_components)
+from structures.csr_graph import CSRGraph
+from structures.disjoint_set import UnionFind
+from structures.graph import Graph, bfs
+
+
+def groups(graph, component):
+    """Components as a set of frozensets of vertex values"""
+    values = list(graph.vertices) if isinstance(graph, Graph) \
+        else graph.values
+    result = {}
+    for value, c in zip(values, component):
+        result.setdefault(c, set()).add(value)
+    return {frozenset(group) for group in result.values()}
+
+
+class UnionFindTest(unittest.TestCase):
+
+    def test_union_find(self):
+        sets = UnionFind(6)
+        self.assertTrue(sets.union(0, 1))
+        self.assertTrue(sets.union(1, 4))
+        self.assertFalse(sets.union(4, 0))
+        self.assertTrue(sets.connected(0, 4))
+        self.assertFalse(sets.connected(0, 2))
+        self.assertEqual(sets.size(4), 3)
+        self.assertEqual(sets.count, 4)
+
+
+class ComponentsTest(unittest.TestCase):
+
+    def test_strongly_connected_components(self):
+        g = Graph.build_graph({'A': ['B'], 'B': ['C', 'E'], 'C': ['A', 'D'],
+                               'D': [], 'E': ['F'], 'F': ['E']})
+        component, sizes = strongly_connected_components(g)
+        self.assertEqual(groups(g, component), {
+            frozenset('ABC'), frozenset('D'), frozenset('EF')})
+        self.assertEqual(sorted(sizes), [1, 2, 3])
+
+        # Reverse topological order: edges lead to lower component ids
+        csr = CSRGraph.from_graph(g)
+        for v in range(csr.size):
+            for w, _ in csr.neighbors(v):
+                self.assertLessEqual(component[w], component[v])
+
+    def test_scc_matches_reachability(self):
+        rnd = random.Random(2)
+        g = Graph()
+        vertices = [g.add_vertex(i) for i in range(80)]
+        for _ in range(120):
+            g.add_edge(rnd.choice(vertices), rnd.choice(vertices))
+        component, sizes = components(g)
+        reachable = {v.value: set(bfs(v)) for v in vertices}
+        for a in range(80):
+            for b in range(80):
+                mutual = b in reachable[a] and a in reachable[b]
+                self.assertEqual(component[a] == component[b], mutual)
+        self.assertEqual(sum(sizes), 80)
+
+    def test_deep_graph(self):
+        n = 100000
+        edges = [(i, i + 1) for i in range(n)] + [(n, 0)]
+        component, sizes = strongly_connected_components(
+            CSRGraph.from_edges(edges))
+        self.assertEqual(sizes, [n + 1])
+
+    def test_connected_components(self):
+        g = Graph.build_graph({'A': ['B'], 'B': ['C'], 'D': ['E'], 'F': []},
+                              directed=False)
+        component, sizes = components(g)
+        self.assertEqual(groups(g, component), {
+            frozenset('ABC'), frozenset('DE'), frozenset('F')})
+        self.assertEqual(sizes, [3, 2, 1])
+
+        csr = CSRGraph.from_edges([(1, 2), (3, 2), (4, 5)])
+        component, sizes = connected_components(csr)
+        self.assertEqual(list(component), [0, 0, 0, 1, 1])
+        self.assertEqual(sizes, [3, 2])
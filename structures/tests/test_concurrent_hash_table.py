@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import threading
+import unittest
+
+from structures.concurrent_hash_table import ConcurrentHashTable
+
+
+class ConcurrentHashTableTest(unittest.TestCase):
+
+    def test_put_get_delete(self):
+        t = ConcurrentHashTable(stripes=4, m=8)
+        self.assertIsNone(t.put('a', 1))
+        self.assertTrue(t.put('a', 2))
+        self.assertEqual(t.get('a'), 2)
+        self.assertEqual(t.size, 1)
+
+        for i in range(1000):
+            t.put(i, i)
+        self.assertEqual(t.size, 1001)
+        self.assertGreater(t.m, 500)
+        self.assertTrue(all(t.get(i) == i for i in range(1000)))
+
+        for i in range(1000):
+            self.assertTrue(t.delete(i))
+        self.assertFalse(t.delete(0))
+        self.assertEqual(t.size, 1)
+        self.assertLess(t.m, 50)
+        self.assertEqual(t.get('a'), 2)
+
+    def test_freeze(self):
+        t = ConcurrentHashTable(stripes=3)
+        for i in range(100):
+            t.put('key-%d' % i, i)
+        frozen = t.freeze()
+        self.assertEqual(frozen.size, 100)
+        self.assertEqual(frozen.get('key-42'), 42)
+
+    def test_concurrent_writers_and_readers(self):
+        t = ConcurrentHashTable(stripes=8, m=8)
+        # Keys which are never modified, they must be always visible
+        for i in range(100):
+            t.put(('stable', i), i)
+
+        errors = []
+
+        def writer(n):
+            for i in range(2000):
+                t.put((n, i), i)
+            for i in range(0, 2000, 2):
+                t.delete((n, i))
+
+        def reader():
+            for _ in range(20):
+                for i in range(100):
+                    if t.get(('stable', i)) != i:
+                        errors.append(i)
+
+        threads = [threading.Thread(target=writer, args=(n, ))
+                   for n in range(4)]
+        threads += [threading.Thread(target=reader) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(t.size, 100 + 4 * 1000)
+        for n in range(4):
+            self.assertIsNone(t.get((n, 0)))
+            self.assertEqual(t.get((n, 1999)), 1999)
+
+    def test_iterate_while_writing(self):
+        t = ConcurrentHashTable(stripes=4, m=4)
+        for i in range(100):
+            t.put(i, i)
+        for key in t.keys():
+            # Puts and deletes resize the stripes, iteration doesn't fail
+            t.put(key + 1000, key)
+            t.delete(key)
+        self.assertNotIn(0, list(t.keys()))
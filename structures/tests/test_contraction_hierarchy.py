@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+from structures.contraction_hierarchy import ContractionHierarchy
+from structures.csr_graph import CSRGraph
+from structures.graph import dijkstra_search
+from structures.tests.graph_helpers import random_graph
+
+
+class ContractionHierarchyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def assert_shortest_paths(self, g, ch):
+        for src in g.vertices.values():
+            expected, _ = dijkstra_search(src)
+            for dst in g.vertices:
+                distance, path = ch.query(src.value, dst)
+                if dst not in expected:
+                    self.assertEqual(distance, float('inf'))
+                    self.assertRaises(KeyError, path.get_path, src.value, dst)
+                    continue
+
+                self.assertEqual(distance, expected[dst])
+                p = [v.value for v in path.get_path(src.value, dst)]
+                self.assertEqual((p[0], p[-1]), (src.value, dst))
+                length = sum(
+                    min(d for v, d in g.vertices[a].get_neighbors(True)
+                        if v == b)
+                    for a, b in zip(p, p[1:]))
+                self.assertEqual(length, distance)
+
+    def test_query_directed(self):
+        g = random_graph(60, 180, seed=1, directed=True, min_distance=0)
+        self.assert_shortest_paths(g, ContractionHierarchy(g))
+
+    def test_query_undirected(self):
+        g = random_graph(60, 120, seed=2, directed=False, min_distance=0)
+        ch = ContractionHierarchy(CSRGraph.from_graph(g))
+        self.assertGreater(ch.shortcuts_count, 0)
+        self.assert_shortest_paths(g, ch)
+        self.assertEqual(ch.distance(0, 0), 0)
+
+    def test_save_load(self):
+        g = random_graph(40, 120, seed=3, directed=True, min_distance=0)
+        path = os.path.join(self.tmp_dir, 'graph.ch')
+        ContractionHierarchy(g).save(path)
+        ch = ContractionHierarchy.load(path)
+        self.assert_shortest_paths(g, ch)
+
+        with open(path, 'r+b') as f:
+            f.write(b'XXXX')
+        self.assertRaises(ValueError, ContractionHierarchy.load, path)
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+import io
+import random
+import unittest
+
+from structures.csr_graph import CSRGraph, CSRGraphBuilder, CSRVertex
+from structures.graph import Graph, bfs, dijkstra_search
+
+
+STRUCT = {'S': [('A', 7), ('B', 3)],
+          'A': [('B', 2), ('C', 2)],
+          'B': [('C', 1)],
+          'D': [('C', 2), ('A', 3)]}
+
+
+class CSRGraphTest(unittest.TestCase):
+
+    def test_build_graph_from_dict(self):
+        struct = {'A': [('B', 1)], 'C': [], 'B': [('C', 2)]}
+        g = CSRGraph.build_graph(struct)
+        self.assertEqual(g.size, 3)
+        self.assertEqual(g.edges_count, 2)
+        self.assertEqual(g.as_dict(), struct)
+        self.assertEqual(g.as_dict(), Graph.build_graph(struct).as_dict())
+
+    def test_undirected_graph(self):
+        g = CSRGraph.from_edges([('A', 'B'), ('B', 'C', 2)], directed=False)
+        self.assertEqual(g.as_dict(), {'A': [('B', 1)],
+                                       'B': [('A', 1), ('C', 2)],
+                                       'C': [('B', 2)]})
+
+    def test_from_graph_and_back(self):
+        g = Graph.build_graph(STRUCT, directed=False)
+        csr = CSRGraph.from_graph(g)
+        self.assertEqual(csr.as_dict(), g.as_dict())
+        self.assertFalse(csr.is_directed)
+        self.assertEqual(csr.to_graph().as_dict(), g.as_dict())
+
+    def test_wrong_distance(self):
+        with self.assertRaises(ValueError):
+            CSRGraph.from_edges([('A', 'B', -1)])
+
+    def test_compact_arrays(self):
+        g = CSRGraph.from_edges(
+            ((i, i + 1, 1.5) for i in range(1000)), weight_type='f')
+        self.assertEqual(g.offsets.itemsize, 4)
+        self.assertEqual(g.targets.itemsize, 4)
+        self.assertEqual(g.nbytes, 1002 * 4 + 1000 * 4 + 1000 * 4)
+
+    def test_vertex(self):
+        g = CSRGraph.build_graph(STRUCT)
+        v = g.vertex('A')
+        self.assertIsInstance(v, CSRVertex)
+        self.assertEqual(v.value, 'A')
+        self.assertEqual(v, g.vertex('A'))
+        self.assertIn(v, g)
+        self.assertIn('D', g)
+        self.assertNotIn('X', g)
+        self.assertEqual(v.get_neighbors(values_list=True),
+                         [('B', 2), ('C', 2)])
+        self.assertEqual([u.value for u, _ in v.get_neighbors()], ['B', 'C'])
+
+
+class CSRTraversalTest(unittest.TestCase):
+
+    def test_dijkstra_search(self):
+        g = CSRGraph.build_graph(STRUCT, directed=False)
+        distances, path = dijkstra_search(g.vertex('S'))
+        self.assertEqual(distances, {'S': 0, 'A': 5, 'B': 3, 'C': 4, 'D': 6})
+
+        p = path.get_path('S', 'D')
+        self.assertEqual([v.value for v in p], ['S', 'B', 'C', 'D'])
+        self.assertEqual([v.value for v in path.get_path('S', 'S')], ['S'])
+
+    def test_dijkstra_search_unreachable(self):
+        g = CSRGraph.build_graph(STRUCT)
+        distances, path = dijkstra_search(g.vertex('S'))
+        self.assertNotIn('D', distances)
+        with self.assertRaises(KeyError):
+            path.get_path('S', 'D')
+
+    def test_bfs(self):
+        g = CSRGraph.build_graph(STRUCT)
+        self.assertEqual(bfs(g.vertex('S')), {'S': 0, 'A': 1, 'B': 1, 'C': 2})
+
+    def test_dijkstra_search_bounded(self):
+        g = CSRGraph.build_graph(STRUCT, directed=False)
+        distances, path = dijkstra_search(g.vertex('S'),
+                                          target=g.vertex('C'))
+        self.assertEqual(distances['C'], 4)
+        self.assertNotIn('D', distances)
+        self.assertEqual([v.value for v in path.get_path('S', 'C')],
+                         ['S', 'B', 'C'])
+
+        distances, _ = dijkstra_search(g.vertex('S'), max_distance=4)
+        self.assertEqual(distances, {'S': 0, 'B': 3, 'C': 4})
+
+    def test_dijkstra_search_bidirectional(self):
+        for directed in (True, False):
+            g = CSRGraph.build_graph(STRUCT, directed=directed)
+            full, _ = dijkstra_search(g.vertex('S'))
+            distances, path = dijkstra_search(
+                g.vertex('S'), target=g.vertex('C'), bidirectional=True)
+            self.assertEqual(distances['C'], full['C'])
+            self.assertEqual([v.value for v in path.get_path('S', 'C')],
+                             ['S', 'B', 'C'])
+
+    def test_reverse(self):
+        g = CSRGraph.build_graph(STRUCT)
+        self.assertEqual(g.reverse().vertex('C').get_neighbors(True),
+                         [('A', 2), ('B', 1), ('D', 2)])
+        self.assertIs(g.reverse().reverse(), g)
+
+
+class CSRGraphBuilderTest(unittest.TestCase):
+
+    def test_add_edges(self):
+        reports = []
+        builder = CSRGraphBuilder(directed=False, progress=reports.append,
+                                  progress_every=3)
+        builder.add_vertices(['Z'])
+        builder.add_edges(iter([('A', 'B'), ('B', 'C', 2), ('C', 'A', 5),
+                                ('A', 'D', 1)]), chunk_size=2)
+        builder.add_edge('D', 'Z', 3)
+        self.assertEqual(reports, [4])
+        self.assertEqual(builder.edges_count, 5)
+
+        g = builder.build()
+        self.assertEqual(g.values, ['Z', 'A', 'B', 'C', 'D'])
+        self.assertEqual(g.vertex('A').get_neighbors(values_list=True),
+                         [('B', 1), ('C', 5), ('D', 1)])
+        self.assertEqual(g.edges_count, 10)
+        self.assertRaises(ValueError, CSRGraphBuilder().add_edge, 1, 2, -1)
+
+    def test_add_edge_list_csv(self):
+        data = io.StringIO('# src,dst,distance\n'
+                           'A,B,1.5\n'
+                           '\n'
+                           'B,C,2\n'
+                           'A,C,4\n')
+        builder = CSRGraphBuilder()
+        builder.add_edge_list(data)
+        g = builder.build()
+        self.assertEqual(g.as_dict(), {'A': [('B', 1.5), ('C', 4)],
+                                       'B': [('C', 2)], 'C': []})
+
+    def test_add_edge_list_numeric(self):
+        rnd = random.Random(1)
+        lines = ['# comment']
+        for _ in range(3000):
+            lines.append('{}\t{}\t{}'.format(
+                rnd.randrange(500), rnd.randrange(500), rnd.randint(0, 9)))
+        data = '\n'.join(lines) + '\n'
+
+        graphs = []
+        # int is parsed with NumPy if it's installed, the lambda never is
+        for value_type in (int, lambda x: int(x)):
+            for directed in (True, False):
+                builder = CSRGraphBuilder(directed=directed)
+                builder.add_edge_list(io.StringIO(data), delimiter='\t',
+                                      value_type=value_type, chunk_size=700)
+                self.assertEqual(builder.edges_count, 3000)
+                graphs.append(builder.build())
+
+        for a, b in zip(graphs[:2], graphs[2:]):
+            self.assertEqual(a.values, b.values)
+            self.assertEqual(a.offsets, b.offsets)
+            self.assertEqual(a.targets, b.targets)
+            self.assertEqual(a.weights, b.weights)
+
+    def test_add_edge_list_two_columns(self):
+        builder = CSRGraphBuilder()
+        builder.add_edge_list(io.StringIO('1 2\n2 3\n3 1\n'),
+                              delimiter=' ', value_type=int)
+        self.assertEqual(builder.build().as_dict(),
+                         {1: [(2, 1)], 2: [(3, 1)], 3: [(1, 1)]})
+
+    def test_negative_distance_in_file(self):
+        builder = CSRGraphBuilder()
+        self.assertRaises(ValueError, builder.add_edge_list,
+                          io.StringIO('1,2,3\n2,3,-1\n'), value_type=int)
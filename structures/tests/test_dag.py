@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import random
+import unittest
+
+from structures.csr_graph import CSRGraph
+from structures.dag import (CycleError, critical_path, dag_longest_paths,
+                            dag_shortest_paths, topological_levels,
+                            topological_sort)
+from structures.graph import Graph, dijkstra_search
+
+
+# Build steps, edge distances are durations of the source steps
+STRUCT = {'fetch': [('configure', 2), ('docs', 2)],
+          'configure': [('compile', 1)],
+          'compile': [('test', 8), ('package', 8)],
+          'docs': [('package', 3)],
+          'test': [('release', 4)],
+          'package': [('release', 1)],
+          'release': []}
+
+
+class TopologicalSortTest(unittest.TestCase):
+
+    def assert_order(self, graph, order):
+        self.assertEqual(sorted(order), sorted(graph.as_dict()))
+        position = {value: i for i, value in enumerate(order)}
+        for value, neighbors in graph.as_dict().items():
+            for neighbor, _ in neighbors:
+                self.assertLess(position[value], position[neighbor])
+
+    def test_topological_sort(self):
+        for g in (Graph.build_graph(STRUCT), CSRGraph.build_graph(STRUCT)):
+            self.assert_order(g, topological_sort(g))
+
+    def test_random_dag(self):
+        rnd = random.Random(1)
+        edges = []
+        for _ in range(2000):
+            u, v = sorted(rnd.sample(range(300), 2))
+            edges.append((v, u) if u % 2 else (u, v))
+        # Vertices are ranked by a random permutation, edges go upwards
+        rank = list(range(300))
+        rnd.shuffle(rank)
+        g = CSRGraph.from_edges(
+            (u, v) if rank[u] < rank[v] else (v, u) for u, v in edges)
+        self.assert_order(g, topological_sort(g))
+
+    def test_cycle(self):
+        struct = dict(STRUCT, release=[('configure', 1)])
+        g = Graph.build_graph(struct)
+        with self.assertRaises(CycleError) as context:
+            topological_sort(g)
+        cycle = context.exception.cycle
+        self.assertEqual(len(cycle), 4)
+        self.assertIn('configure', cycle)
+        for value, next_value in zip(cycle, cycle[1:] + cycle[:1]):
+            self.assertIn(next_value, dict(struct[value]))
+
+        self.assertEqual(
+            CycleError(['A']).args[0], "Graph has a cycle: 'A' -> 'A'")
+        self.assertRaises(CycleError, topological_sort,
+                          CSRGraph.from_edges([(1, 2), (2, 2)]))
+        self.assertRaises(ValueError, topological_sort,
+                          Graph.build_graph(STRUCT, directed=False))
+
+    def test_levels(self):
+        g = Graph.build_graph(STRUCT)
+        self.assertEqual(topological_levels(g), [['fetch'],
+                                                 ['configure', 'docs'],
+                                                 ['compile'],
+                                                 ['test', 'package'],
+                                                 ['release']])
+        self.assertEqual(topological_levels(CSRGraph.from_edges([])), [])
+
+
+class DAGPathsTest(unittest.TestCase):
+
+    def test_shortest_paths(self):
+        for g in (Graph.build_graph(STRUCT), CSRGraph.build_graph(STRUCT)):
+            expected, _ = dijkstra_search(g.vertices['configure']
+                                          if isinstance(g, Graph)
+                                          else g.vertex('configure'))
+            distances, path = dag_shortest_paths(g, 'configure')
+            self.assertEqual(distances, expected)
+            self.assertEqual(
+                [v.value for v in path.get_path('configure', 'release')],
+                ['configure', 'compile', 'package', 'release'])
+
+    def test_longest_paths(self):
+        g = Graph.build_graph(STRUCT)
+        distances, path = dag_longest_paths(g, 'fetch')
+        self.assertEqual(distances['release'], 15)
+        self.assertEqual(distances['package'], 11)
+        self.assertEqual(
+            [v.value for v in path.get_path('fetch', 'release')],
+            ['fetch', 'configure', 'compile', 'test', 'release'])
+        self.assertEqual(dag_shortest_paths(g, 'fetch')[0]['release'], 6)
+
+    def test_critical_path(self):
+        g = CSRGraph.build_graph(STRUCT)
+        self.assertEqual(critical_path(g), (15, ['fetch', 'configure',
+                                                 'compile', 'test',
+                                                 'release']))
+        self.assertEqual(critical_path(Graph()), (0, []))
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import sys
+import unittest
+from unittest import mock
+
+from structures import distance_matrix as distance_matrix_module
+from structures.csr_graph import CSRGraph
+from structures.distance_matrix import distance_matrix, iter_distance_rows
+from structures.graph import dijkstra_search
+from structures.hash_table import numpy
+from structures.tests.graph_helpers import random_graph
+
+
+class DistanceMatrixTest(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = random_graph(50, 150, seed=1)
+        self.sources = list(range(0, 50, 3))
+        self.targets = [49, 0, 7, 7, 21]
+
+    def expected_rows(self):
+        rows = []
+        for src in self.sources:
+            distances, _ = dijkstra_search(self.graph.vertices[src])
+            rows.append([distances.get(t, float('inf'))
+                         for t in self.targets])
+        return rows
+
+    def test_iter_rows(self):
+        expected = self.expected_rows()
+        rows = dict(iter_distance_rows(self.graph, self.sources,
+                                       self.targets, workers=1))
+        self.assertEqual(sorted(rows), list(range(len(self.sources))))
+        for i, row in rows.items():
+            self.assertEqual(list(row), expected[i])
+
+    def test_no_shared_memory(self):
+        # Before Python 3.8 the default workers compute in process
+        with mock.patch.object(distance_matrix_module, 'shared_memory',
+                               None):
+            rows = dict(iter_distance_rows(self.graph, self.sources,
+                                           self.targets))
+        self.assertEqual([list(rows[i]) for i in sorted(rows)],
+                         self.expected_rows())
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    @unittest.skipIf(sys.version_info < (3, 8),
+                     'Shared memory needs Python 3.8+')
+    def test_matrix_with_workers(self):
+        csr = CSRGraph.from_graph(self.graph, weight_type='f')
+        matrix = distance_matrix(csr, self.sources, self.targets,
+                                 workers=2, chunk_size=4)
+        self.assertEqual(matrix.shape, (len(self.sources), 5))
+        self.assertEqual(matrix.tolist(), self.expected_rows())
@@ -1,6 +1,10 @@
 # -*- coding: utf-8 -*-
+import random
 import unittest
-from structures.graph import Graph, dijkstra_search
+from structures.graph import (
+    Graph, LandmarkHeuristic, Vertex, astar_search, bfs, dijkstra_search,
+    euclidean_distance, find_path, haversine_distance, k_shortest_paths,
+    multi_source_bfs)
 
 
 class BasicGraphTest(unittest.TestCase):
@@ -48,6 +52,53 @@ class BasicGraphTest(unittest.TestCase):
         self.assertEqual(Graph.build_graph(g.as_dict()).as_dict(), struct)
 
 
+class BFSTest(unittest.TestCase):
+
+    def test_bfs(self):
+        g = Graph.build_graph({'A': ['B', 'C'], 'B': ['D'], 'C': ['D'],
+                               'D': ['E'], 'F': ['A']})
+        self.assertEqual(bfs(g.vertices['A']),
+                         {'A': 0, 'B': 1, 'C': 1, 'D': 2, 'E': 3})
+        self.assertEqual(bfs(g.vertices['A'], max_depth=1),
+                         {'A': 0, 'B': 1, 'C': 1})
+        self.assertFalse(any(v.is_visited for v in g.vertices.values()))
+
+    def test_multi_source_bfs(self):
+        g = Graph.build_graph({'A': ['B'], 'B': ['C'], 'C': ['D'],
+                               'D': ['E'], 'E': [], 'F': ['E']})
+        ids = {value: i for i, value in enumerate(g.vertices)}
+        hops, parents = multi_source_bfs(g, ['A', 'F'])
+        self.assertEqual([hops[ids[v]] for v in 'ABCDEF'],
+                         [0, 1, 2, 3, 1, 0])
+        self.assertEqual(parents[ids['E']], ids['F'])
+        self.assertEqual(parents[ids['A']], ids['A'])
+
+        hops, parents = multi_source_bfs(g, ['A'], max_depth=2)
+        self.assertEqual([hops[ids[v]] for v in 'ABCDEF'],
+                         [0, 1, 2, -1, -1, -1])
+        self.assertEqual(parents[ids['D']], -1)
+
+    def test_direction_optimizing_bfs(self):
+        rnd = random.Random(5)
+        for directed in (True, False):
+            g = Graph(directed=directed)
+            vertices = [g.add_vertex(i) for i in range(300)]
+            for _ in range(3000):
+                g.add_edge(rnd.choice(vertices), rnd.choice(vertices))
+
+            sources = [0, 150]
+            expected, _ = multi_source_bfs(g, sources,
+                                           direction_optimizing=False)
+            hops, parents = multi_source_bfs(g, sources)
+            self.assertEqual(hops, expected)
+            for i, parent in enumerate(parents):
+                if i in sources or parent < 0:
+                    continue
+                self.assertEqual(hops[parent], hops[i] - 1)
+                self.assertIn(vertices[i], [v for v, _ in
+                              vertices[parent].get_neighbors()])
+
+
 class DijkstraSearchTest(unittest.TestCase):
 
     def test_search(self):
@@ -65,3 +116,193 @@ class DijkstraSearchTest(unittest.TestCase):
 
         p = path.get_path('S', 'D')
         self.assertEqual([v.value for v in p], ['S', 'B', 'C', 'D'])
+
+    def test_search_is_repeatable(self):
+        struct = {'S': [('A', 7), ('B', 3)],
+                  'A': [('B', 2), ('C', 2)],
+                  'B': [('C', 1)],
+                  'D': [('C', 2), ('A', 3)]}
+        g = Graph.build_graph(struct, directed=False)
+        expected = {'S': 0, 'A': 5, 'B': 3, 'C': 4, 'D': 6}
+        self.assertEqual(dijkstra_search(g.vertices['S'])[0], expected)
+        # The graph isn't left dirty by the previous search
+        self.assertEqual(dijkstra_search(g.vertices['S'])[0], expected)
+        self.assertEqual(dijkstra_search(g.vertices['D'])[0]['S'], 6)
+
+    def test_search_target_and_max_distance(self):
+        g = Graph.build_graph({'A': [('B', 1)], 'B': [('C', 1)],
+                               'C': [('D', 1)], 'D': [('E', 1)]})
+        distances, path = dijkstra_search(g.vertices['A'],
+                                          target=g.vertices['C'])
+        self.assertEqual(distances, {'A': 0, 'B': 1, 'C': 2})
+        self.assertEqual([v.value for v in path.get_path('A', 'C')],
+                         ['A', 'B', 'C'])
+
+        distances, _ = dijkstra_search(g.vertices['A'], max_distance=3)
+        self.assertEqual(distances, {'A': 0, 'B': 1, 'C': 2, 'D': 3})
+
+    def test_bidirectional_search(self):
+        rnd = random.Random(7)
+        for directed in (True, False):
+            g = Graph(directed=directed)
+            vertices = [g.add_vertex(i) for i in range(60)]
+            for _ in range(200):
+                g.add_edge(rnd.choice(vertices), rnd.choice(vertices),
+                           distance=rnd.randint(0, 10))
+
+            for _ in range(30):
+                src, dst = rnd.choice(vertices), rnd.choice(vertices)
+                expected, _ = dijkstra_search(src)
+                distances, path = dijkstra_search(src, target=dst,
+                                                  bidirectional=True)
+                if dst.value not in expected:
+                    self.assertNotIn(dst.value, distances)
+                    continue
+                self.assertEqual(distances[dst.value], expected[dst.value])
+                p = path.get_path(src.value, dst.value)
+                self.assertEqual((p[0], p[-1]), (src, dst))
+                length = sum(
+                    min(d for v, d in a.get_neighbors() if v is b)
+                    for a, b in zip(p, p[1:]))
+                self.assertEqual(length, expected[dst.value])
+
+    def test_in_neighbors(self):
+        g = Graph.build_graph({'A': [('B', 2)], 'C': [('B', 3)]})
+        a, b, c = (g.vertices[value] for value in 'ABC')
+        self.assertEqual(sorted(g.in_neighbors(b), key=lambda e: e[1]),
+                         [(a, 2), (c, 3)])
+        reverse = g._reverse
+        self.assertEqual(g.in_neighbors(a), ())
+        self.assertIs(g._reverse, reverse)  # kept between calls
+
+        g.add_edge(b, a, distance=4)
+        self.assertEqual(g.in_neighbors(a), [(b, 4)])
+        distances, _ = dijkstra_search(c, target=a, bidirectional=True)
+        self.assertEqual(distances['A'], 7)
+
+    def test_bidirectional_search_requires_target(self):
+        g = Graph.build_graph({'A': ['B']})
+        with self.assertRaises(ValueError):
+            dijkstra_search(g.vertices['A'], bidirectional=True)
+
+
+class AStarSearchTest(unittest.TestCase):
+
+    def setUp(self):
+        # Grid with coordinates as values, edge lengths >= euclidean ones
+        rnd = random.Random(3)
+        self.graph = Graph(directed=False)
+        for x in range(12):
+            for y in range(12):
+                v = self.graph.add_vertex((x, y))
+                if x:
+                    self.graph.add_edge(self.graph.vertices[(x - 1, y)], v,
+                                        distance=rnd.randint(1, 5))
+                if y:
+                    self.graph.add_edge(self.graph.vertices[(x, y - 1)], v,
+                                        distance=rnd.randint(1, 5))
+
+    def assert_shortest(self, heuristic):
+        src, dst = (0, 0), (11, 7)
+        expected, _ = dijkstra_search(self.graph.vertices[src])
+        distances, path = astar_search(self.graph, src, dst, heuristic)
+        self.assertEqual(distances[dst], expected[dst])
+        p = [v.value for v in path.get_path(src, dst)]
+        self.assertEqual((p[0], p[-1]), (src, dst))
+        # Goal direction settles fewer vertices than plain Dijkstra
+        self.assertLess(len(distances), len(expected))
+        return distances
+
+    def test_euclidean(self):
+        self.assert_shortest(euclidean_distance)
+
+    def test_landmarks(self):
+        heuristic = LandmarkHeuristic(self.graph, count=4)
+        self.assertEqual(len(heuristic.landmarks), 4)
+        self.assert_shortest(heuristic)
+
+    def test_landmarks_csr_graph(self):
+        from structures.csr_graph import CSRGraph
+        g = CSRGraph.from_graph(self.graph)
+        heuristic = LandmarkHeuristic(g, landmarks=[(11, 11), (0, 11)])
+        distances, path = astar_search(g, (0, 0), (11, 7), heuristic)
+        expected, _ = dijkstra_search(self.graph.vertices[(0, 0)])
+        self.assertEqual(distances[(11, 7)], expected[(11, 7)])
+        self.assertEqual(path.get_path((0, 0), (11, 7))[-1].value, (11, 7))
+
+    def test_landmarks_directed(self):
+        g = Graph.build_graph({'A': [('B', 1)], 'B': [('C', 1)],
+                               'C': [('A', 5), ('D', 1)], 'D': []})
+        heuristic = LandmarkHeuristic(g, landmarks=['D', 'A'])
+        distances, _ = astar_search(g, 'A', 'D', heuristic)
+        self.assertEqual(distances['D'], 3)
+
+    def test_haversine(self):
+        berlin, paris = Vertex('BER', (52.52, 13.405)), Vertex('PAR')
+        paris.weight = (48.8566, 2.3522)
+        self.assertAlmostEqual(haversine_distance(berlin, paris), 877.5,
+                               delta=1)
+        g = Graph(directed=False)
+        a, b = g.add_vertex('BER'), g.add_vertex('PAR')
+        a.weight, b.weight = berlin.weight, paris.weight
+        g.add_edge(a, b, distance=1050)
+        distances, _ = astar_search(g, 'BER', 'PAR', haversine_distance)
+        self.assertEqual(distances['PAR'], 1050)
+
+
+class FindPathTest(unittest.TestCase):
+
+    def test_find_path(self):
+        graph = {'A': ['B', 'C'],
+                 'B': ['C', 'D'],
+                 'C': ['D'],
+                 'D': ['C'],
+                 'E': ['F'],
+                 'F': ['C']}
+        self.assertEqual(find_path(graph, 'A', 'D'), ['A', 'B', 'C', 'D'])
+        self.assertEqual(find_path(graph, 'A', 'A'), ['A'])
+        self.assertIsNone(find_path(graph, 'A', 'E'))
+
+    def test_find_path_after_dead_end(self):
+        # The first neighbor leads to a dead end
+        graph = {'A': ['X', 'B'], 'X': ['Y'], 'B': ['C']}
+        self.assertEqual(find_path(graph, 'A', 'C'), ['A', 'B', 'C'])
+
+    def test_find_path_long_chain(self):
+        n = 100000
+        graph = {i: [i + 1] for i in range(n)}
+        self.assertEqual(find_path(graph, 0, n), list(range(n + 1)))
+
+
+class KShortestPathsTest(unittest.TestCase):
+
+    def test_k_shortest_paths(self):
+        # Example graph of the Yen's algorithm article
+        g = Graph.build_graph({'C': [('D', 3), ('E', 2)],
+                               'D': [('F', 4)],
+                               'E': [('D', 1), ('F', 2), ('G', 3)],
+                               'F': [('G', 2), ('H', 1)],
+                               'G': [('H', 2)]})
+        paths = k_shortest_paths(g, 'C', 'H', 3)
+        self.assertEqual(
+            [(d, ''.join(v.value for v in p)) for d, p in paths],
+            [(5, 'CEFH'), (7, 'CEGH'), (8, 'CDFH')])
+
+        self.assertEqual(len(k_shortest_paths(g, 'C', 'H', 10)), 7)
+        self.assertEqual(k_shortest_paths(g, 'H', 'C', 3), [])
+
+    def test_paths_are_loopless_and_sorted(self):
+        rnd = random.Random(11)
+        g = Graph(directed=False)
+        vertices = [g.add_vertex(i) for i in range(30)]
+        for _ in range(80):
+            g.add_edge(rnd.choice(vertices), rnd.choice(vertices),
+                       distance=rnd.randint(1, 9))
+        paths = k_shortest_paths(g, 0, 29, 12)
+        distances = [d for d, _ in paths]
+        self.assertEqual(distances, sorted(distances))
+        self.assertEqual(distances[0], dijkstra_search(vertices[0])[0][29])
+        for _, path in paths:
+            self.assertEqual(len(set(path)), len(path))
+            self.assertEqual((path[0].value, path[-1].value), (0, 29))
+        self.assertEqual(len({tuple(p) for _, p in paths}), len(paths))
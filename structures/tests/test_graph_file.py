@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+from structures.csr_graph import CSRGraph
+from structures.graph import Graph, dijkstra_search
+from structures.graph_file import MappedGraph, MappedVertex
+
+
+STRUCT = {'S': [('A', 7), ('B', 3)],
+          'A': [('B', 2), ('C', 2)],
+          'B': [('C', 1)],
+          'D': [('C', 2), ('A', 3)],
+          'E': []}
+
+
+class GraphFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'graph.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_save_load(self):
+        for directed in (True, False):
+            g = Graph.build_graph(STRUCT, directed=directed)
+            g.save(self.path)
+            for use_mmap in (True, False):
+                loaded = Graph.load(self.path, mmap=use_mmap)
+                self.assertIsInstance(loaded, MappedGraph)
+                self.assertEqual(loaded.is_directed, directed)
+                self.assertEqual(loaded.size, 6)
+                self.assertEqual(loaded.as_dict(), g.as_dict())
+
+    def test_lazy_vertices(self):
+        Graph.build_graph(STRUCT).save(self.path)
+        g = Graph.load(self.path)
+        self.assertEqual(g._cache, {})
+        self.assertIn('D', g)
+        self.assertNotIn('X', g)
+        self.assertNotIn(42, g)
+
+        s = g.vertices['S']
+        self.assertIsInstance(s, MappedVertex)
+        self.assertIs(g.vertices['S'], s)
+        self.assertEqual(len(g._cache), 1)
+        self.assertEqual(s.get_neighbors(values_list=True),
+                         [('A', 7), ('B', 3)])
+        self.assertEqual(len(g._cache), 3)
+
+    def test_search(self):
+        Graph.build_graph(STRUCT, directed=False).save(self.path)
+        g = Graph.load(self.path)
+        distances, path = dijkstra_search(g.vertices['S'],
+                                          target=g.vertices['D'],
+                                          bidirectional=True)
+        self.assertEqual(distances['D'], 6)
+        self.assertEqual([v.value for v in path.get_path('S', 'D')],
+                         ['S', 'B', 'C', 'D'])
+
+    def test_modify_loaded_graph(self):
+        Graph.build_graph(STRUCT).save(self.path)
+        g = Graph.load(self.path)
+        f = g.add_vertex('F')
+        self.assertIs(g.add_vertex('S'), g.vertices['S'])
+        g.add_edge(g.vertices['E'], f, distance=4)
+        g.add_edge(g.vertices['C'], g.vertices['E'])
+        self.assertEqual(g.size, 7)
+        self.assertEqual(dijkstra_search(g.vertices['S'])[0]['F'], 9)
+        distances, _ = dijkstra_search(g.vertices['S'], g.vertices['F'],
+                                       bidirectional=True)
+        self.assertEqual(distances['F'], 9)
+
+    def test_values_and_weights(self):
+        csr = CSRGraph.from_edges(
+            [((0, 0), (0, 1), 1.5), (b'x', -7), ('y', (0, 0), 2)],
+            weight_type='f')
+        csr.save(self.path)
+        g = Graph.load(self.path)
+        self.assertEqual(g.as_dict(), csr.as_dict())
+        self.assertEqual(g.vertices[(0, 0)].get_neighbors(True),
+                         [((0, 1), 1.5)])
+
+    def test_equal_values(self):
+        name = ''.join(['no', 'de'])  # equal to 'node', not the same object
+        csr = CSRGraph.from_edges([(1, ('node', name)), (2.5, 'z'),
+                                   ((b'x', 3.0), 'y')])
+        csr.save(self.path)
+        with Graph.load(self.path) as g:
+            self.assertIn(1.0, g)
+            self.assertIn(('node', 'node'), g)
+            self.assertIn((b'x', 3), g)
+            self.assertNotIn(3, g)
+            self.assertEqual(g.vertices[1].get_neighbors(True),
+                             [(('node', 'node'), 1)])
+            self.assertEqual(g.vertices[2.5].get_neighbors(True), [('z', 1)])
+
+        csr = CSRGraph.from_edges([(False, 1.5)])
+        csr.save(self.path)
+        with Graph.load(self.path) as g:
+            self.assertEqual([type(v) for v in g.vertices], [bool, float])
+
+        self.assertRaises(TypeError, CSRGraph.from_edges(
+            [(frozenset(), 1)]).save, self.path)
+
+    def test_close(self):
+        Graph.build_graph(STRUCT).save(self.path)
+        with Graph.load(self.path) as g:
+            s = g.vertices['S']
+            s.get_neighbors()
+        self.assertEqual(s.get_neighbors(True), [('A', 7), ('B', 3)])
+        self.assertRaises(ValueError, g.vertices.__getitem__, 'C')
+        g.close()
+
+    def test_bad_magic(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'\0' * 128)
+        self.assertRaises(ValueError, Graph.load, self.path)
@@ -1,4 +1,16 @@
-from structures.hash_table import LinearProbingHashTable
+import gc
+
+import pytest
+
+from structures.hash_table import (
+    FrozenHashTable, LinearProbingHashTable, SeparateChainHashTable)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+requires_numpy = pytest.mark.skipif(numpy is None, reason='requires numpy')
 
 
 def test_linear_probing_ht():
@@ -15,3 +27,279 @@ def test_linear_probing_ht():
     assert t.size == 2
     for i in range(5000):
         t.put(i, i)
+
+
+def test_separate_chain_ht():
+    t = SeparateChainHashTable()
+    t.put('z', 1)
+    t.put('b', 2)
+    assert t.put('b', 3) is True
+    assert t.size == 2
+    assert t.get('b') == 3
+
+    assert t.delete('b') is True
+    assert t.delete('b') is False
+    assert t.get('b') is None
+    assert not t.contains('b')
+    assert t.size == 1
+
+
+def test_separate_chain_ht_incremental_resizing():
+    t = SeparateChainHashTable(m=7, max_load=2.0, min_load=0.25)
+    for i in range(5000):
+        t.put(i, i)
+        # Every key is reachable while migration is in progress
+        assert t.get(i // 2) == i // 2
+
+    assert t.size == 5000
+    assert t.m > 7
+    assert t.load_factor <= 2.0
+    for i in range(5000):
+        assert t.get(i) == i
+
+    for i in range(4990):
+        assert t.delete(i) is True
+        assert t.get(4995) == 4995
+
+    assert t.size == 10
+    assert t.m < 5000 // 2
+    assert [t.get(i) for i in range(4990, 5000)] == list(range(4990, 5000))
+    assert t.get(0) is None
+
+
+def test_separate_chain_ht_stop_the_world_resizing():
+    t = SeparateChainHashTable(m=7, incremental=False)
+    for i in range(1000):
+        t.put(str(i), i)
+        assert not t.is_resizing
+
+    assert t.load_factor <= t.max_load
+    assert all(t.get(str(i)) == i for i in range(1000))
+
+
+class CollidingKey(object):
+    """Key with a controlled hash to produce collisions"""
+
+    def __init__(self, name, hash_code):
+        self.name = name
+        self.hash_code = hash_code
+
+    def __hash__(self):
+        return self.hash_code
+
+    def __eq__(self, other):
+        return isinstance(other, CollidingKey) and self.name == other.name
+
+
+def test_linear_probing_ht_update_existing_key():
+    t = LinearProbingHashTable()
+    assert t.put('a', 1) is None
+    assert t.put('a', 2) is True
+    assert t.size == 1
+    assert t.get('a') == 2
+
+
+def test_linear_probing_ht_wrap_around_and_collisions():
+    for robin_hood in (False, True):
+        t = LinearProbingHashTable(m=11, robin_hood=robin_hood)
+        # All the keys have the last slot as a home slot
+        keys = [CollidingKey(str(i), 10) for i in range(4)]
+        for i, key in enumerate(keys):
+            t.put(key, i)
+        assert t.m == 11
+        assert [t.get(key) for key in keys] == [0, 1, 2, 3]
+
+        assert t.delete(keys[1]) is True
+        assert t.get(keys[1]) is None
+        assert [t.get(keys[i]) for i in (0, 2, 3)] == [0, 2, 3]
+
+        # Rehash keeps colliding entries
+        for i in range(20):
+            t.put(i, i)
+        assert t.m > 11
+        assert [t.get(keys[i]) for i in (0, 2, 3)] == [0, 2, 3]
+        assert all(t.get(i) == i for i in range(20))
+
+
+def test_linear_probing_ht_against_dict():
+    import random
+    rnd = random.Random(42)
+    for robin_hood in (False, True):
+        t = LinearProbingHashTable(m=7, robin_hood=robin_hood)
+        expected = {}
+        for _ in range(20000):
+            key = rnd.randint(0, 2000)
+            if rnd.random() < 0.6:
+                t.put(key, -key)
+                expected[key] = -key
+            else:
+                assert t.delete(key) is (key in expected)
+                expected.pop(key, None)
+        assert t.size == len(expected)
+        for key in range(2001):
+            assert t.get(key) == expected.get(key)
+
+
+def test_robin_hood_probe_length():
+    t = LinearProbingHashTable(m=1024, max_load=0.9, robin_hood=True)
+    for i in range(900):
+        t.put(str(i), i)
+    assert t.m == 1024
+    assert t.load_factor > 0.85
+    assert t.max_probe_length() < 64
+    assert all(t.get(str(i)) == i for i in range(900))
+
+
+def test_batch_api():
+    for table in (SeparateChainHashTable(m=7),
+                  LinearProbingHashTable(m=7),
+                  LinearProbingHashTable(m=7, robin_hood=True)):
+        table.put('x', 0)
+        keys = ['a', 'b', 'x', 'a'] + list(range(100))
+        values = [1, 2, 3, 4] + list(range(100))
+        assert table.put_many(keys, values) == 102
+        assert table.size == 103
+        assert table.get_many(['a', 'b', 'x', 'missing']) == [4, 2, 3, None]
+        assert table.get_many(range(100)) == list(range(100))
+
+        assert table.delete_many(['a', 'missing'] + list(range(50))) == 51
+        assert table.size == 52
+        assert table.get_many(['a', 'b', 0, 50]) == [None, 2, None, 50]
+
+    with pytest.raises(ValueError):
+        SeparateChainHashTable().put_many([1, 2], [1])
+
+
+@requires_numpy
+def test_batch_api_int_arrays():
+    keys = numpy.arange(10000, dtype=numpy.int64) * 7
+    keys = numpy.concatenate([keys, keys[:10]])
+    values = numpy.arange(len(keys))
+    for table in (SeparateChainHashTable(),
+                  LinearProbingHashTable(),
+                  LinearProbingHashTable(robin_hood=True)):
+        assert table.put_many(keys, values) == 10000
+        assert table.size == 10000
+
+        # Duplicate keys take the last value
+        assert table.get(0) == 10000
+        assert table.get(7 * 9999) == 9999
+        assert table.get_many(keys[10:20]) == list(range(10, 20))
+        for key in range(0, 70000, 7):
+            assert table.contains(key)
+
+        assert table.delete_many(keys[:5000]) == 5000
+        assert table.size == 5000
+        assert table.get_many(keys[4999:5001]) == [None, 5000]
+
+
+@requires_numpy
+def test_chain_batch_into_filled_table():
+    table = SeparateChainHashTable(m=7)
+    for key in range(0, 100, 2):
+        table.put(key, 'old')
+    # Keys 2 ** 31 apart share a hash code, equal keys must still be adjacent
+    keys = numpy.array([1, 2, 2 ** 31 + 1, 4, 1, 2 ** 31 + 1], numpy.int64)
+    assert table.put_many(keys, ['a', 'b', 'c', 'd', 'e', 'f']) == 2
+    assert table.size == 52
+    assert table.get_many([1, 2, 2 ** 31 + 1, 4, 6]) == \
+        ['e', 'b', 'f', 'd', 'old']
+    assert all(len(chain) == len({node.key for node in chain})
+               for chain in table.chains if chain)
+    assert gc.isenabled()
+
+
+@requires_numpy
+def test_bulk_load_wraps_around():
+    for robin_hood in (False, True):
+        table = LinearProbingHashTable(m=11, robin_hood=robin_hood)
+        # Home slots at the end of the array make the cluster wrap around
+        keys = numpy.array([10, 21, 32, 9, 0], dtype=numpy.int64)
+        assert table.put_many(keys, keys * 2) == 5
+        assert table.m == 11
+        assert table.get_many(keys) == [20, 42, 64, 18, 0]
+        table.put(43, 1)
+        assert table.get(43) == 1
+
+
+def test_freeze():
+    for table in (SeparateChainHashTable(m=7),
+                  LinearProbingHashTable(m=7, robin_hood=True)):
+        for i in range(3000):
+            table.put('key-%d' % i, i)
+        # Keys with equal hash codes go to the overflow dict
+        table.put(CollidingKey('x', 12345), 'x')
+        table.put(CollidingKey('y', 12345), 'y')
+        table.put(-1, 'minus one')
+        table.put(-2, 'minus two')
+
+        frozen = table.freeze()
+        assert isinstance(frozen, FrozenHashTable)
+        assert frozen.size == table.size == 3004
+        for i in range(3000):
+            assert frozen.get('key-%d' % i) == i
+        assert frozen.get(CollidingKey('x', 12345)) == 'x'
+        assert frozen.get(CollidingKey('y', 12345)) == 'y'
+        assert frozen.get(-2) == 'minus two'
+        assert frozen.get('missing') is None
+        assert frozen.get_many(['key-1', -1, 'missing']) == \
+            [1, 'minus one', None]
+
+        with pytest.raises(TypeError):
+            frozen.put('key-1', 2)
+        with pytest.raises(TypeError):
+            frozen.delete('key-1')
+
+    assert SeparateChainHashTable().freeze().get('a') is None
+
+
+def test_freeze_while_resizing():
+    table = SeparateChainHashTable(m=7)
+    for i in range(15):
+        table.put(i, i)
+    assert table.is_resizing
+    frozen = table.freeze()
+    assert [frozen.get(i) for i in range(15)] == list(range(15))
+
+
+def test_iteration_views():
+    for table in (SeparateChainHashTable(m=7),
+                  LinearProbingHashTable(m=7),
+                  LinearProbingHashTable(m=7, robin_hood=True)):
+        assert list(table.keys()) == []
+        for i in range(100):
+            table.put(i, -i)
+        table.delete(50)
+
+        assert sorted(table.keys()) == sorted(set(range(100)) - {50})
+        assert sorted(table) == sorted(table.keys())
+        assert sorted(table.values()) == sorted(-i for i in table.keys())
+        assert dict(table.items()) == {i: -i for i in range(100) if i != 50}
+        assert sorted(table.freeze().keys()) == sorted(table.keys())
+
+        batches = list(table.iter_batches(30))
+        assert [len(batch) for batch in batches] == [30, 30, 30, 9]
+        assert dict(pair for batch in batches for pair in batch) == \
+            dict(table.items())
+        with pytest.raises(ValueError):
+            next(table.iter_batches(0))
+
+        # Updating values during iteration is fine
+        for key in table.keys():
+            table.put(key, 0)
+        assert set(table.values()) == {0}
+
+        with pytest.raises(RuntimeError):
+            for key in table.keys():
+                table.put('new', 1)
+        with pytest.raises(RuntimeError):
+            for key in table.keys():
+                table.delete(key)
+
+
+def test_iteration_while_resizing():
+    table = SeparateChainHashTable(m=7)
+    for i in range(15):
+        table.put(i, i)
+    assert table.is_resizing
+    assert sorted(table.keys()) == list(range(15))
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from structures.csr_graph import CSRGraph
+from structures.graph import Graph, dijkstra_search
+from structures.path_cache import ShortestPathCache, result_size
+
+
+STRUCT = {'S': [('A', 7), ('B', 3)],
+          'A': [('B', 2), ('C', 2)],
+          'B': [('C', 1)],
+          'D': [('C', 2), ('A', 3)]}
+
+
+class ShortestPathCacheTest(unittest.TestCase):
+
+    def test_search(self):
+        for g in (Graph.build_graph(STRUCT, directed=False),
+                  CSRGraph.build_graph(STRUCT, directed=False)):
+            paths = ShortestPathCache(g)
+            distances, path = paths.search('S')
+            self.assertEqual(distances,
+                             {'S': 0, 'A': 5, 'B': 3, 'C': 4, 'D': 6})
+            self.assertIs(paths.search('S')[1], path)
+            # The full tree of S answers the point-to-point queries too
+            self.assertEqual(paths.distance('S', 'D'), 6)
+            self.assertEqual([v.value for v in paths.get_path('S', 'D')],
+                             ['S', 'B', 'C', 'D'])
+            self.assertEqual(paths.distance('D', 'B'), 3)
+            self.assertEqual(paths.distance('D', 'B'), 3)
+
+            stats = paths.stats()
+            self.assertEqual((stats['hits'], stats['misses']), (4, 2))
+            self.assertEqual(stats['hit_rate'], 4 / 6)
+            self.assertEqual(len(paths), 2)
+
+    def test_graph_changes(self):
+        g = Graph.build_graph(STRUCT)
+        paths = ShortestPathCache(g)
+        self.assertEqual(paths.distance('S', 'C'), 4)
+        self.assertRaises(KeyError, paths.distance, 'S', 'E')
+
+        e = g.add_vertex('E')
+        self.assertIsNone(paths.distance('S', 'E'))
+        g.add_edge(g.vertices['C'], e, 1)
+        self.assertEqual(paths.distance('S', 'E'), 5)
+        g.add_edge(g.vertices['S'], g.vertices['C'], 1)
+        self.assertEqual(paths.distance('S', 'E'), 2)
+        self.assertEqual(paths.stats()['invalidations'], 3)
+
+        version = g.version
+        g.add_vertex('E')  # Already exists
+        self.assertEqual(g.version, version)
+
+    def test_eviction(self):
+        g = Graph.build_graph(STRUCT, directed=False)
+        paths = ShortestPathCache(g, max_entries=2)
+        for src in ('S', 'A', 'B', 'S'):
+            paths.search(src)
+        self.assertEqual(paths.stats()['evictions'], 2)
+        self.assertEqual(paths.stats()['misses'], 4)
+
+        size = result_size(dijkstra_search(g.vertices['S']))
+        paths = ShortestPathCache(g, max_bytes=size * 2)
+        for src in ('S', 'A', 'B', 'C'):
+            paths.search(src)
+        self.assertLessEqual(paths.stats()['bytes'], size * 2)
+        self.assertGreater(paths.stats()['evictions'], 0)
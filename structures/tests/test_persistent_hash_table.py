@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+from structures.persistent_hash_table import (
+    PersistentHashTable, encode_key, decode_key)
+
+
+class PersistentHashTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'table.dat')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_key_encoding(self):
+        for key in ['abc', '', b'abc', 0, -15, 2 ** 70]:
+            self.assertEqual(decode_key(encode_key(key)), key)
+        self.assertNotEqual(encode_key('1'), encode_key(1))
+        self.assertNotEqual(encode_key('a'), encode_key(b'a'))
+        self.assertRaises(TypeError, encode_key, 1.5)
+
+    def test_put_get_delete(self):
+        with PersistentHashTable(self.path, m=11) as t:
+            self.assertIsNone(t.put('a', [1, 2]))
+            self.assertTrue(t.put('a', {'x': 1}))
+            t.put(b'b', None)
+            t.put(3, 'three')
+            self.assertEqual(t.size, 3)
+            self.assertEqual(t.get('a'), {'x': 1})
+            self.assertEqual(t.get(3), 'three')
+            self.assertIsNone(t.get('3'))
+
+            self.assertTrue(t.delete('a'))
+            self.assertFalse(t.delete('a'))
+            self.assertIsNone(t.get('a'))
+            self.assertEqual(t.size, 2)
+
+            # Grow slots and the data region
+            for i in range(1000):
+                t.put(i, 'value-%d' % i)
+            self.assertGreater(t.m, 11)
+            for i in range(0, 1000, 2):
+                self.assertTrue(t.delete(i))
+            self.assertEqual(t.size, 501)
+
+        with PersistentHashTable(self.path, readonly=True) as t:
+            self.assertEqual(t.size, 501)
+            self.assertEqual(t.get(3), 'value-3')
+            self.assertIsNone(t.get(4))
+            self.assertEqual(t.get(b'b'), None)
+            self.assertRaises(IOError, t.put, 'x', 1)
+
+    def test_compaction(self):
+        t = PersistentHashTable(self.path)
+        t.COMPACT_MIN_BYTES = 1024
+        for _ in range(50):
+            for i in range(40):
+                t.put('key-%d' % i, 'x' * 100)
+        self.assertLessEqual(t.garbage_ratio, t.compact_ratio)
+
+        file_size = os.path.getsize(self.path)
+        t.compact()
+        self.assertEqual(t.garbage_ratio, 0)
+        self.assertLessEqual(os.path.getsize(self.path), file_size)
+        self.assertEqual(t.size, 40)
+        self.assertEqual(t.get('key-39'), 'x' * 100)
+        t.close()
+
+    def test_reader_reload(self):
+        writer = PersistentHashTable(self.path)
+        writer.put('a', 1)
+        writer.flush()
+
+        reader = PersistentHashTable(self.path, readonly=True)
+        self.assertEqual(reader.get('a'), 1)
+
+        # Resize replaces the file, the reader sees the old snapshot
+        for i in range(100):
+            writer.put(i, i)
+        self.assertIsNone(reader.get(99))
+        reader.reload()
+        self.assertEqual(reader.get(99), 99)
+        reader.close()
+        writer.close()
+
+    def test_reader_while_writer_grows_file(self):
+        writer = PersistentHashTable(self.path, m=97)
+        writer.put('a', 1)
+        reader = PersistentHashTable(self.path, readonly=True)
+        self.assertEqual(reader.get('a'), 1)
+
+        # The data region grows in place, no resize: same file
+        file_size = os.path.getsize(self.path)
+        for i in range(20):
+            writer.put(i, 'x' * 2000)
+        writer.flush()
+        self.assertGreater(os.path.getsize(self.path), file_size)
+        self.assertEqual(writer.m, 97)
+
+        self.assertEqual(reader.get(19), 'x' * 2000)
+        self.assertEqual(reader.get('a'), 1)
+        self.assertEqual(len(list(reader.items())), 21)
+        reader.close()
+        writer.close()
+
+    def test_iteration(self):
+        with PersistentHashTable(self.path) as t:
+            for i in range(50):
+                t.put('key-%d' % i, i)
+            self.assertEqual(dict(t.items()),
+                             {'key-%d' % i: i for i in range(50)})
+            self.assertEqual(sum(len(b) for b in t.iter_batches(7)), 50)
+            self.assertEqual(t.freeze().get('key-7'), 7)
+            with self.assertRaises(RuntimeError):
+                for key in t.keys():
+                    t.delete(key)
+
+    def test_wrong_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'x' * 100)
+        self.assertRaises(ValueError, PersistentHashTable, self.path)
+        self.assertRaises(IOError, PersistentHashTable,
+                          self.path + '.missing', readonly=True)
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from structures.sharded_map import HashRing, ShardedMap
+
+
+class HashRingTest(unittest.TestCase):
+
+    def test_get_node(self):
+        ring = HashRing(['a', 'b', 'c'])
+        self.assertEqual(len(ring), 3)
+        owners = [ring.get_node(key) for key in range(3000)]
+        # Virtual nodes spread the keys evenly enough
+        for node in 'abc':
+            self.assertGreater(owners.count(node), 600)
+        self.assertEqual(owners, [ring.get_node(key) for key in range(3000)])
+
+        self.assertRaises(ValueError, ring.add_node, 'a')
+        self.assertRaises(ValueError, ring.remove_node, 'x')
+        self.assertRaises(LookupError, HashRing().get_node, 'key')
+
+    def test_minimal_movement(self):
+        ring = HashRing(['a', 'b', 'c'])
+        before = {key: ring.get_node(key) for key in range(4000)}
+        ring.add_node('d')
+        after = {key: ring.get_node(key) for key in range(4000)}
+
+        moved = [key for key in before if before[key] != after[key]]
+        # Keys move only to the new node, about 1/4 of them
+        self.assertTrue(all(after[key] == 'd' for key in moved))
+        self.assertLess(abs(len(moved) / 4000.0 - 0.25), 0.1)
+
+        ring.remove_node('d')
+        self.assertEqual(
+            before, {key: ring.get_node(key) for key in range(4000)})
+
+
+class ShardedMapTest(unittest.TestCase):
+
+    def test_api(self):
+        with ShardedMap(shards=3) as m:
+            self.assertEqual(m.shards, ['shard-0', 'shard-1', 'shard-2'])
+            self.assertIsNone(m.put('a', 1))
+            self.assertTrue(m.put('a', 2))
+            self.assertEqual(m.get('a'), 2)
+            self.assertTrue(m.contains('a'))
+            self.assertTrue(m.delete('a'))
+            self.assertFalse(m.delete('a'))
+
+            self.assertEqual(m.put_many(range(1000), range(1000)), 1000)
+            self.assertEqual(m.size, 1000)
+            self.assertTrue(all(m.shard_sizes().values()))
+            self.assertEqual(m.get_many([0, 999, 'missing']),
+                             [0, 999, None])
+            self.assertEqual(m.delete_many(range(500)), 500)
+            self.assertEqual(m.size, 500)
+            self.assertEqual(dict(m.items()),
+                             {i: i for i in range(500, 1000)})
+
+    def test_add_remove_shard(self):
+        with ShardedMap(shards=3) as m:
+            m.put_many(range(2000), range(2000))
+            before = m.shard_sizes()
+
+            m.KEYS_CHUNK_SIZE = 64  # keys are streamed in several chunks
+            name = m.add_shard()
+            after = m.shard_sizes()
+            self.assertEqual(sum(after.values()), 2000)
+            self.assertLess(abs(after[name] / 2000.0 - 0.25), 0.1)
+            for shard, size in before.items():
+                self.assertLessEqual(after[shard], size)
+            self.assertEqual(m.get_many(range(2000)), list(range(2000)))
+
+            m.remove_shard('shard-0')
+            self.assertEqual(len(m.shards), 3)
+            self.assertEqual(m.size, 2000)
+            self.assertEqual(m.get_many(range(2000)), list(range(2000)))
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+import os
+import subprocess
+import sys
+import unittest
+
+from structures.sketches import BloomFilter, CountMinSketch, stable_hash64
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class BloomFilterTest(unittest.TestCase):
+
+    def test_sizing(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        self.assertEqual(bloom.m, 9586)
+        self.assertEqual(bloom.k, 7)
+        self.assertRaises(ValueError, BloomFilter, capacity=0)
+        self.assertRaises(ValueError, BloomFilter, error_rate=1)
+
+    def test_add_contains(self):
+        bloom = BloomFilter(capacity=2000, error_rate=0.01)
+        keys = ['key-%d' % i for i in range(2000)]
+        bloom.add_many(keys)
+        self.assertTrue(all(bloom.contains_many(keys)))
+        self.assertIn('key-5', bloom)
+
+        false_positives = sum(bloom.contains_many(
+            ['missing-%d' % i for i in range(10000)]))
+        self.assertLess(false_positives / 10000.0, 0.02)
+        self.assertLess(bloom.estimated_error_rate(), 0.02)
+
+    def test_merge_and_serialization(self):
+        a = BloomFilter(capacity=100)
+        b = BloomFilter(capacity=100)
+        a.add_many(range(50))
+        b.add_many(range(50, 100))
+
+        merged = a | b
+        self.assertTrue(all(merged.contains_many(range(100))))
+        self.assertEqual(merged.count, 100)
+        self.assertFalse(all(a.contains_many(range(100))))
+
+        restored = BloomFilter.from_bytes(merged.to_bytes())
+        self.assertEqual((restored.m, restored.k, restored.count),
+                         (merged.m, merged.k, merged.count))
+        self.assertTrue(all(restored.contains_many(range(100))))
+
+        self.assertRaises(ValueError, a.update, BloomFilter(capacity=10))
+        self.assertRaises(ValueError, BloomFilter.from_bytes, b'x' * 40)
+
+    @unittest.skipIf(numpy is None, 'requires numpy')
+    def test_vectorized(self):
+        keys = numpy.arange(5000, dtype=numpy.int64) * 3
+        scalar = BloomFilter(capacity=5000)
+        scalar.add_many(keys.tolist())
+        vectorized = BloomFilter(capacity=5000)
+        vectorized.add_many(keys)
+        self.assertEqual(scalar.to_bytes(), vectorized.to_bytes())
+
+        probe = numpy.arange(20000, dtype=numpy.int64)
+        self.assertEqual(vectorized.contains_many(probe),
+                         scalar.contains_many(probe.tolist()))
+
+    @unittest.skipIf(numpy is None, 'requires numpy')
+    def test_negative_keys(self):
+        keys = numpy.array([-5, 3, -(2 ** 63)], dtype=numpy.int64)
+        for batch in (keys, keys.astype(numpy.int8), keys.astype(float)):
+            f = BloomFilter(capacity=10)
+            f.add_many(batch)
+            self.assertTrue(all(f.contains_many(batch)))
+            self.assertTrue(all(f.contains(key) for key in batch.tolist()))
+
+    def test_other_hash_seed(self):
+        # The filter is built by a process with another str hash salt
+        script = ('import sys\n'
+                  'from structures.sketches import BloomFilter\n'
+                  'bloom = BloomFilter(capacity=1000)\n'
+                  'bloom.add_many(["key-%d" % i for i in range(1000)])\n'
+                  'bloom.add((b"bytes", 1.0, -5))\n'
+                  'sys.stdout.buffer.write(bloom.to_bytes())\n')
+        root = os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__))))
+        filters = []
+        for seed in ('1', '2'):
+            env = dict(os.environ, PYTHONHASHSEED=seed)
+            filters.append(subprocess.check_output(
+                [sys.executable, '-c', script], cwd=root, env=env))
+        self.assertEqual(filters[0], filters[1])
+
+        bloom = BloomFilter.from_bytes(filters[0])
+        self.assertTrue(all(bloom.contains_many(
+            ['key-%d' % i for i in range(1000)])))
+        self.assertIn((b'bytes', 1, -5), bloom)
+
+    def test_stable_hash64(self):
+        self.assertEqual(stable_hash64(1), stable_hash64(1.0))
+        self.assertEqual(stable_hash64(True), stable_hash64(1))
+        self.assertNotEqual(stable_hash64('1'), stable_hash64(b'1'))
+        self.assertNotEqual(stable_hash64((1, 2)), stable_hash64((2, 1)))
+        self.assertRaises(TypeError, stable_hash64, None)
+
+
+class CountMinSketchTest(unittest.TestCase):
+
+    def test_estimate(self):
+        sketch = CountMinSketch(epsilon=0.01, delta=0.01)
+        self.assertEqual((sketch.width, sketch.depth), (272, 5))
+        for i in range(100):
+            sketch.add('key-%d' % i, count=i)
+        sketch.add_many(['hot'] * 500)
+
+        self.assertEqual(sketch.total, 4950 + 500)
+        self.assertGreaterEqual(sketch.estimate('hot'), 500)
+        self.assertLessEqual(sketch.estimate('hot'), 500 + 0.01 * 5450)
+        for i in range(100):
+            self.assertGreaterEqual(sketch.estimate('key-%d' % i), i)
+
+    @unittest.skipIf(numpy is None, 'requires numpy')
+    def test_negative_keys(self):
+        keys = numpy.array([-5, 3, -5], dtype=numpy.int64)
+        scalar = CountMinSketch(width=50, depth=3)
+        for key in keys.tolist():
+            scalar.add(key)
+        for batch in (keys, keys.astype(numpy.int16)):
+            sketch = CountMinSketch(width=50, depth=3)
+            sketch.add_many(batch)
+            self.assertEqual(sketch.to_bytes(), scalar.to_bytes())
+            self.assertEqual(sketch.estimate_many(batch), [2, 1, 2])
+        sketch = CountMinSketch(width=50, depth=3)
+        sketch.add_many(keys.astype(float), counts=numpy.ones(3, int))
+        self.assertEqual(sketch.estimate(-5), 2)
+
+    def test_merge_and_serialization(self):
+        a = CountMinSketch(width=100, depth=4)
+        b = CountMinSketch(width=100, depth=4)
+        a.add_many(['x', 'y'], counts=[3, 4])
+        b.add_many(['x'], counts=[10])
+        a.update(b)
+        self.assertGreaterEqual(a.estimate('x'), 13)
+        self.assertEqual(a.total, 17)
+
+        restored = CountMinSketch.from_bytes(a.to_bytes())
+        self.assertEqual(restored.estimate_many(['x', 'y']),
+                         a.estimate_many(['x', 'y']))
+        self.assertRaises(ValueError, a.update, CountMinSketch(width=10))
+
+    @unittest.skipIf(numpy is None, 'requires numpy')
+    def test_vectorized(self):
+        keys = numpy.arange(1000, dtype=numpy.int64) % 100
+        scalar = CountMinSketch(width=50, depth=3)
+        scalar.add_many(keys.tolist())
+        vectorized = CountMinSketch(width=50, depth=3)
+        vectorized.add_many(keys)
+        self.assertEqual(scalar.to_bytes(), vectorized.to_bytes())
+        self.assertEqual(vectorized.estimate_many(keys[:100]),
+                         scalar.estimate_many(range(100)))